@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import pickle
+import time
+from pathlib import Path
+
+import descriptive_stats
+from data_loader import (read_csv_typed, add_derived_columns, CATEGORICAL_COLS, SCORE_COLS, CATEGORY_LABELS,
+                         CACHE_DIRNAME, DATA_FILE)
+from decision import FAILING_CUTOFF
+from fairness_aggregates import partial_aggregates, merge_partials, finalize_fair_table
+from sensitivity_analysis import DIMENSIONS, BASELINE_DESCRIPTION, aggregate_metrics, summary_row
+from streaming_stats import KLLSketch, ColumnMoments, CoMoments
+from instrument import log_run, instrumented
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Persisted aggregate state of an append-only dataset. The state records how
+# far into the CSV it has read (byte offset of the end of the last consumed
+# line + row watermark) and keeps only mergeable aggregates: fairness partials
+# for every categorical column, per-column moments and co-moments, exact value
+# counts (which give exact quartiles and nunique while a column has at most
+# MAX_DISTINCT values; a KLL sketch covers columns past that), overall category
+# counts, and the few rows the descriptive report shows (top/bottom k, the
+# first k rows, the first k underperforming rows). An update parses only the
+# bytes appended since the offset, so the summaries below are regenerated in
+# time proportional to the new rows. If the file shrank or the bytes before
+# the offset changed, the state is rebuilt from scratch.
+
+SEED = 42  # set once for reproducibility
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parent
+OUT_DIR = ROOT / "outputs" / "incremental"
+FAIRNESS_CSV = OUT_DIR / "fairness_metrics.csv"
+SENSITIVITY_CSV = OUT_DIR / "sensitivity_summary.csv"
+DESCRIPTIVE_TXT = OUT_DIR / "descriptive_stats.txt"
+DESCRIPTIVE_JSON = OUT_DIR / "descriptive_stats.json"
+GROUP_MEANS_CSV = OUT_DIR / "descriptive_group_means.csv"
+
+STATE_VERSION = 1
+MAX_DISTINCT = 10_000  # value counts per column kept exactly up to this many distinct values
+TAIL_BYTES = 4096      # bytes before the offset compared on update to detect a rewritten file
+BLOCK_BYTES = 64 << 20  # CSV bytes parsed at a time
+DERIVED_COLS = ["total_score", "average_score", "performance_category"]
+ALL_COLS = CATEGORICAL_COLS + SCORE_COLS + DERIVED_COLS
+NUMERIC_COLS = SCORE_COLS + ["total_score", "average_score"]
+
+
+class StaleState(Exception):
+    """The file no longer extends the bytes the state was built from."""
+
+
+def state_path(path: Path) -> Path:
+    path = Path(path)
+    return path.parent / CACHE_DIRNAME / f"{path.stem}.state.pkl"
+
+
+# ---------- state ----------
+class AggregateState:
+    def __init__(self, path: Path, k: int = descriptive_stats.TOP_K, sketch_k: int = 200):
+        self.version = STATE_VERSION
+        self.path = str(Path(path).resolve())
+        self.k = k
+        self.offset = 0      # bytes consumed (header included), always at a line end
+        self.rows = 0        # rows consumed: the next row's global index
+        self.header = b""
+        self.tail = b""      # last TAIL_BYTES consumed
+        self.open_line = False  # consumed up to EOF without a trailing newline
+        self.partial = None
+        self.moments = ColumnMoments(len(NUMERIC_COLS))
+        # one co-moment pair per score pair: correlations use pairwise-complete rows, as DataFrame.corr does
+        self.pairs = {(i, j): CoMoments(2) for i in range(len(SCORE_COLS)) for j in range(i + 1, len(SCORE_COLS))}
+        self.counts = {c: pd.Series(dtype=np.float64) for c in ALL_COLS}  # None once past MAX_DISTINCT
+        self.sketches = {c: KLLSketch(sketch_k, seed=SEED + j) for j, c in enumerate(NUMERIC_COLS)}
+        self.top = self.bottom = self.head = self.under = None
+
+    # ----- aggregation -----
+    def update_frame(self, frame: pd.DataFrame) -> "AggregateState":
+        """Fold in rows whose index is their global row number."""
+        part = partial_aggregates(frame, CATEGORICAL_COLS)
+        self.partial = part if self.partial is None else merge_partials(self.partial, part)
+        values = frame[NUMERIC_COLS].to_numpy(dtype=np.float64)
+        self.moments.update(values)
+        for (i, j), pair in self.pairs.items():
+            pair.update(values[:, [i, j]])
+        for j, c in enumerate(NUMERIC_COLS):
+            self.sketches[c].update(values[:, j])
+        for c in ALL_COLS:
+            if self.counts[c] is None:
+                continue
+            vc = frame[c].value_counts(dropna=True)
+            vc.index = vc.index.astype(object)
+            merged = self.counts[c].add(vc, fill_value=0)
+            self.counts[c] = merged if len(merged) <= MAX_DISTINCT else None
+
+        k = self.k
+        ranked = frame[descriptive_stats.RANK_COLS]
+        self.top = _concat(self.top, ranked).nlargest(k, "total_score", keep="first")
+        self.bottom = _concat(self.bottom, ranked).nsmallest(k, "total_score", keep="first")
+        if self.head is None or len(self.head) < k:
+            self.head = _concat(self.head, frame[SCORE_COLS]).head(k)
+        if self.under is None or len(self.under) < k:
+            under = frame.loc[frame["total_score"].to_numpy() < FAILING_CUTOFF, descriptive_stats.UNDER_COLS]
+            self.under = _concat(self.under, under).head(k)
+        self.rows += len(frame)
+        return self
+
+    # ----- reading -----
+    def read_new_rows(self, path: Path = None, block_bytes: int = BLOCK_BYTES) -> int:
+        """Parse and fold in the rows appended since the last update; returns how many."""
+        path = Path(path or self.path)
+        size = path.stat().st_size
+        added = 0
+        with open(path, "rb") as f:
+            if self.offset:
+                if size < self.offset or (self.open_line and size > self.offset):
+                    raise StaleState(f"{path} was rewritten")
+                f.seek(self.offset - len(self.tail))
+                if f.read(len(self.tail)) != self.tail:
+                    raise StaleState(f"{path} changed before the last update's offset")
+            else:
+                self.header = f.readline()
+                self.offset = len(self.header)
+                self.tail = self.header[-TAIL_BYTES:]
+            while self.offset < size:
+                block = f.read(min(block_bytes, size - self.offset))
+                if f.tell() < size:  # more to come: stop at the last complete line
+                    end = block.rfind(b"\n") + 1
+                    if end:
+                        f.seek(end - len(block), 1)
+                        block = block[:end]
+                    else:  # one line longer than block_bytes
+                        block += f.readline()
+                frame = read_csv_typed(io.BytesIO(self.header + block))
+                frame.index = pd.RangeIndex(self.rows, self.rows + len(frame))
+                self.update_frame(add_derived_columns(frame))
+                added += len(frame)
+                self.offset += len(block)
+                self.tail = (self.tail + block)[-TAIL_BYTES:]
+                self.open_line = not block.endswith(b"\n")
+        return added
+
+    # ----- finalize -----
+    def quantiles(self, column: str, qs) -> np.ndarray:
+        """Exact linear-interpolation quantiles from the value counts, else from the KLL sketch."""
+        vc = self.counts[column]
+        if vc is None:
+            return np.asarray(self.sketches[column].quantile(list(qs)), dtype=np.float64)
+        vc = vc.sort_index()
+        v, cum = vc.index.to_numpy(dtype=np.float64), np.cumsum(vc.to_numpy(dtype=np.int64))
+        if not len(v):
+            return np.full(len(qs), np.nan)
+        pos = (cum[-1] - 1) * np.asarray(qs, dtype=np.float64)
+        lo = np.floor(pos)
+        hi = np.minimum(lo + 1, cum[-1] - 1)
+        a, b = v[np.searchsorted(cum, lo, side="right")], v[np.searchsorted(cum, hi, side="right")]
+        t = pos - lo
+        diff = b - a
+        return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+    def summary(self) -> dict:
+        """The dict descriptive_stats.summarize returns, from the state."""
+        idx = [NUMERIC_COLS.index(c) for c in SCORE_COLS]
+        q = np.array([self.quantiles(c, [0.25, 0.5, 0.75]) for c in SCORE_COLS]).T
+        m = self.moments
+        describe = pd.DataFrame([m.n[idx], m.mean[idx], m.std[idx], m.min[idx], *q, m.max[idx]],
+                                index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"],
+                                columns=SCORE_COLS)
+        nunique = pd.Series([np.nan if self.counts[c] is None else int((self.counts[c] > 0).sum())
+                             for c in ALL_COLS], index=ALL_COLS)
+        if not nunique.isna().any():
+            nunique = nunique.astype(np.int64)
+        cats = self.counts["performance_category"].reindex(CATEGORY_LABELS, fill_value=0).astype(np.int64)
+        cats = cats[cats > 0].sort_values(ascending=False, kind="stable")
+        cats.index = pd.CategoricalIndex(cats.index, categories=CATEGORY_LABELS, name="performance_category")
+        head = self.head
+        return {
+            "records": self.rows,
+            "columns": list(ALL_COLS),
+            "nunique": nunique,
+            "describe": describe,
+            "corr": pd.DataFrame(self.corr(), index=SCORE_COLS, columns=SCORE_COLS),
+            "top": self.top,
+            "bottom": self.bottom,
+            "subjects": head.assign(best_subject=head.idxmax(axis=1), worst_subject=head.idxmin(axis=1)),
+            "categories": cats.rename("count"),
+            "group_means": self.group_means(),
+            "underperforming": self.under,
+        }
+
+    def corr(self) -> np.ndarray:
+        out = np.eye(len(SCORE_COLS))
+        for (i, j), pair in self.pairs.items():
+            out[i, j] = out[j, i] = pair.corr()[0, 1]
+        return out
+
+    def group_means(self) -> pd.DataFrame:
+        frames = []
+        for c in CATEGORICAL_COLS:
+            p = self.partial.xs(c, level="dimension")
+            p = p.loc[sorted(v for v in p.index if not pd.isna(v))]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = (p["sum_total"] / p["n_total"]).to_numpy()
+            frames.append(pd.DataFrame({"dimension": c, "group": p.index, "count": p["count"].astype(np.int64),
+                                        "n_total": p["n_total"].astype(np.int64), "mean_total": mean}))
+        return pd.concat(frames, ignore_index=True)
+
+    def baseline_metrics(self, dimensions=DIMENSIONS, min_cell_size: int = 0) -> dict:
+        """The baseline row of sensitivity_summary.csv (rounded as run_scenarios writes it)."""
+        m = aggregate_metrics(self.partial, dict(zip(NUMERIC_COLS, self.moments.mean)),
+                              self.counts["performance_category"], self.rows, "baseline", dimensions, min_cell_size)
+        m["description"] = BASELINE_DESCRIPTION
+        return summary_row(m, dimensions)
+
+
+def _concat(old, new):
+    return new if old is None else pd.concat([old, new])
+
+
+# ---------- persistence ----------
+def load_state(path: Path):
+    target = state_path(path)
+    try:
+        with open(target, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    return state if getattr(state, "version", None) == STATE_VERSION else None
+
+
+def save_state(state: AggregateState, path: Path):
+    target = state_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(target)
+
+
+@instrumented()
+def update_state(path: Path = DATA_FILE, rebuild: bool = False):
+    """Load the persisted state, fold in the appended rows and save it; returns (state, new rows, rebuilt)."""
+    state = None if rebuild else load_state(path)
+    rebuilt = state is None
+    if state is None:
+        state = AggregateState(path)
+    try:
+        added = state.read_new_rows(path)
+    except StaleState:
+        state, rebuilt = AggregateState(path), True
+        added = state.read_new_rows(path)
+    save_state(state, path)
+    return state, added, rebuilt
+
+
+def write_outputs(state: AggregateState, dimensions=DIMENSIONS, min_cell_size: int = 0):
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    finalize_fair_table(state.partial, dimensions, min_cell_size).to_csv(FAIRNESS_CSV, index=False)
+    pd.DataFrame([state.baseline_metrics(dimensions, min_cell_size)]).to_csv(SENSITIVITY_CSV, index=False)
+    summary = state.summary()
+    DESCRIPTIVE_TXT.write_text(descriptive_stats.format_text(summary), encoding="utf-8")
+    DESCRIPTIVE_JSON.write_text(json.dumps(descriptive_stats.to_json(summary), indent=2), encoding="utf-8")
+    summary["group_means"].to_csv(GROUP_MEANS_CSV, index=False)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Update the persisted aggregates from appended rows "
+                                                 "and regenerate the summaries from them.")
+    parser.add_argument("--data", type=Path, default=DATA_FILE, help="append-only dataset CSV")
+    parser.add_argument("--rebuild", action="store_true", help="discard the saved state and read the whole file")
+    parser.add_argument("--min-cell-size", type=int, default=0, help="leave out subgroups with fewer rows than this")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    state, added, rebuilt = update_state(args.data, args.rebuild)
+    if not state.rows:
+        raise SystemExit(f"{args.data} has no data rows")
+    write_outputs(state, DIMENSIONS, args.min_cell_size)
+    how = "rebuilt from the whole file" if rebuilt else f"{added} new rows"
+    print(f"✅ Aggregate state at row {state.rows} ({how}, {time.perf_counter() - start:.2f}s): {state_path(args.data)}")
+    print(f"✅ Wrote fairness metrics, sensitivity baseline and descriptive summaries to: {OUT_DIR}")
+    log_run("aggregate_state.py", f"rows={state.rows} added={added} rebuilt={rebuilt}", seed=SEED)
+
+
+if __name__ == "__main__":
+    main()
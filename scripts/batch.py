@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import glob
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+from pathlib import Path
+
+import pipeline
+from groupby_kernel import INTERSECTION_SEP
+from instrument import log_run
+from sensitivity_analysis import dimension_key
+from lazy_imports import lazy_import
+
+pd = lazy_import("pandas")
+
+# Batch mode: the pipeline's analysis stages for every cohort CSV in a
+# directory or glob, one process per cohort with at most --jobs at a time.
+# Each cohort writes to its own outputs/cohorts/<name>/ folder (the same
+# file names as a single run, including its own logs and stage manifest, so
+# unchanged cohorts are reused on the next batch). A cohort that fails or
+# runs past --timeout is recorded and killed without holding up the rest.
+# cohort_summary.csv collects one row per cohort across all of them.
+
+SEED = 42  # stages seed themselves; recorded here for the run log
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parent
+OUT_DIR = ROOT / "outputs"
+COHORT_DIR = OUT_DIR / "cohorts"
+SUMMARY_NAME = "cohort_summary.csv"
+RESULT_NAME = "batch_result.json"
+ERROR_NAME = "error.txt"
+STDOUT_NAME = "stdout.log"
+STAGES = ["descriptive_stats", "sanity_checks", "bias_fairness", "uncertainty_bootstrap", "sensitivity_analysis"]
+
+
+# ---------- cohorts ----------
+def find_cohorts(specs) -> list:
+    """CSV files from directories (searched recursively) and glob patterns, sorted and de-duplicated."""
+    found = set()
+    for spec in specs:
+        if Path(spec).is_dir():
+            found.update(Path(spec).rglob("*.csv"))
+        else:
+            found.update(Path(p) for p in glob.glob(spec, recursive=True) if p.endswith(".csv"))
+    return sorted(p.resolve() for p in found if p.parent.name != ".cache")
+
+
+def cohort_names(paths: list) -> list:
+    """Path of each CSV relative to their common folder, without the suffix: school_a/2023.csv -> school_a/2023."""
+    common = Path(os.path.commonpath([p.parent for p in paths]))
+    return [p.relative_to(common).with_suffix("").as_posix() for p in paths]
+
+
+def redirect_outputs(out_dir: Path):
+    """Point every loaded script module's outputs/ paths (files, logs, manifest) at out_dir."""
+    for mod in list(sys.modules.values()):
+        path = getattr(mod, "__file__", None)
+        if not path or Path(path).resolve().parent != SCRIPT_DIR or mod.__name__ in ("__main__", __name__):
+            continue
+        for name, value in list(vars(mod).items()):
+            if isinstance(value, Path) and value.is_relative_to(OUT_DIR):
+                setattr(mod, name, out_dir / value.relative_to(OUT_DIR))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+
+# ---------- one cohort (child process) ----------
+def run_cohort(path: Path, out_dir: Path, stages=STAGES, force: bool = False) -> dict:
+    redirect_outputs(out_dir)
+    selected = [s for s in pipeline.build_stages(path, force=force) if s.name == "load" or s.name in stages]
+    start = time.perf_counter()
+    with open(out_dir / STDOUT_NAME, "w", encoding="utf-8") as f, contextlib.redirect_stdout(f):
+        timings, recomputed, reused, data_hash = pipeline.run_memoized(selected, path, jobs=1, force=force)
+    result = {"data": str(path), "data_hash": data_hash, "seconds": time.perf_counter() - start,
+              "recomputed": recomputed, "reused": reused, "timings": timings}
+    (out_dir / RESULT_NAME).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return result
+
+
+def _cohort_process(path: Path, out_dir: Path, stages, force: bool):
+    (out_dir / ERROR_NAME).unlink(missing_ok=True)
+    try:
+        run_cohort(path, out_dir, stages, force)
+    except BaseException:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / ERROR_NAME).write_text(traceback.format_exc(), encoding="utf-8")
+        sys.exit(1)
+
+
+# ---------- consolidation ----------
+def cohort_row(name: str, out_dir: Path, status: str, seconds: float) -> dict:
+    """One summary row from a cohort's output files (whatever of them exist)."""
+    row = {"cohort": name, "status": status, "seconds": round(seconds, 3)}
+    error = out_dir / ERROR_NAME
+    if status == "failed" and error.exists():
+        row["error"] = error.read_text(encoding="utf-8").strip().splitlines()[-1]
+    result = out_dir / RESULT_NAME
+    if status == "ok" and result.exists():
+        r = json.loads(result.read_text(encoding="utf-8"))
+        row["reused"] = len(r["reused"])
+    if status != "ok":
+        return row
+
+    sens = out_dir / "sensitivity_summary.csv"
+    if sens.exists():
+        base = pd.read_csv(sens).set_index("scenario").loc["baseline"]
+        row.update({"n": int(base["n"]), "mean_total": base["mean_total"],
+                    "rate_excellent": base["rate_overall_excellent"], "rate_failing": base["rate_overall_failing"]})
+    fairness = out_dir / "fairness_metrics.csv"
+    if fairness.exists():
+        di = pd.read_csv(fairness).groupby("dimension", sort=False)["disparate_impact_vs_max_excellent"].min()
+        row.update({f"min_DI_{dimension_key(tuple(d.split(INTERSECTION_SEP)))}": v for d, v in di.items()})
+    cis = out_dir / "uncertainty_cis.csv"
+    if cis.exists():
+        ci = pd.read_csv(cis, index_col=0)
+        row.update({f"ci_width_{k.replace(' ', '_')}": v for k, v in (ci["ci_high"] - ci["ci_low"]).items()})
+    outliers = out_dir / "outliers_indices.csv"
+    if outliers.exists():
+        row["n_outliers"] = len(pd.read_csv(outliers))
+    return row
+
+
+# ---------- scheduler ----------
+def run_batch(paths: list, out_root: Path = COHORT_DIR, jobs: int = 4, timeout: float = None,
+              stages=STAGES, force: bool = False) -> pd.DataFrame:
+    """
+    Run every cohort in its own process, at most `jobs` at once. A process
+    that exits non-zero is "failed" (traceback in its error.txt); one still
+    running after `timeout` seconds is killed as "timeout". Neither stops
+    the other cohorts. Returns the cross-cohort table, also written to
+    out_root/cohort_summary.csv.
+    """
+    pending = list(zip(cohort_names(paths), paths))[::-1]
+    running = {}  # sentinel -> (process, name, out_dir, start)
+    rows = []
+    while pending or running:
+        while pending and len(running) < max(1, jobs):
+            name, path = pending.pop()
+            out_dir = out_root / name
+            out_dir.mkdir(parents=True, exist_ok=True)
+            proc = mp.Process(target=_cohort_process, args=(path, out_dir, list(stages), force), name=name)
+            proc.start()
+            running[proc.sentinel] = (proc, name, out_dir, time.perf_counter())
+
+        now = time.perf_counter()
+        deadlines = [start + timeout - now for _, _, _, start in running.values()] if timeout else []
+        ready = wait(list(running), timeout=max(0.0, min(deadlines)) if deadlines else None)
+        now = time.perf_counter()
+        for sentinel, (proc, name, out_dir, start) in list(running.items()):
+            if sentinel in ready:
+                proc.join()
+                status = "ok" if proc.exitcode == 0 else "failed"
+            elif timeout and now - start >= timeout:
+                proc.kill()
+                proc.join()
+                status = "timeout"
+            else:
+                continue
+            del running[sentinel]
+            rows.append(cohort_row(name, out_dir, status, now - start))
+            mark = "✅" if status == "ok" else "❌"
+            print(f"{mark} {name}: {status} ({now - start:.1f}s) [{len(rows)}/{len(paths)}]")
+
+    table = pd.DataFrame(rows).sort_values("cohort", kind="stable").reset_index(drop=True)
+    table = table.astype({c: "Int64" for c in ("reused", "n", "n_outliers") if c in table})
+    out_root.mkdir(parents=True, exist_ok=True)
+    table.to_csv(out_root / SUMMARY_NAME, index=False)
+    return table
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the analyses for every cohort CSV in parallel.")
+    parser.add_argument("cohorts", nargs="+", help="directories (searched recursively) or globs of cohort CSVs")
+    parser.add_argument("--out-dir", type=Path, default=COHORT_DIR, help="root of the per-cohort output folders")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1),
+                        help="maximum number of cohorts running at once")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="kill a cohort still running after this many seconds")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, metavar="STAGE",
+                        help=f"stages to run per cohort (default: all of {', '.join(STAGES)})")
+    parser.add_argument("--force", action="store_true",
+                        help="recompute every stage even if a cohort's data and code are unchanged")
+    args = parser.parse_args(argv)
+    args.paths = find_cohorts(args.cohorts)
+    if not args.paths:
+        parser.error(f"no CSV files found in {args.cohorts}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    table = run_batch(args.paths, args.out_dir, args.jobs, args.timeout, args.stages, args.force)
+    counts = table["status"].value_counts()
+    print(f"✅ Wrote cross-cohort summary ({len(table)} cohorts) to: {args.out_dir / SUMMARY_NAME}")
+    log_run("batch.py", f"cohorts={len(table)} " + " ".join(f"{k}={v}" for k, v in counts.items())
+            + f" jobs={args.jobs} timeout={args.timeout}", seed=SEED)
+    if counts.get("ok", 0) < len(table):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
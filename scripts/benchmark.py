@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import bias_fairness
+import sanity_checks
+import sensitivity_analysis
+import visuals
+from bootstrap_engine import bootstrap_means
+from data_loader import load_dataset
+from decision import FAILING_CUTOFF, EXCELLENT_CUTOFF
+from figure_aggregates import summarize
+from figure_render import render_all
+from synth_data import synthetic_file, fit_profile, parse_size
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Scaling benchmarks on synthetic data (synth_data.py). Every stage is timed
+# (best of --repeat, wall clock) and memory-profiled (tracemalloc peak of one
+# extra run); results are appended to a JSON-lines history and compared with
+# a stored baseline. The exit status is 1 when any stage is slower (or, with
+# --mem-tolerance, bigger) than baseline * (1 + tolerance).
+#
+#   python scripts/benchmark.py --sizes 10k 1M
+#   python scripts/benchmark.py --sizes 10k 1M 50M --stages loader group_table
+#   python scripts/benchmark.py --update-baseline
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / "outputs" / "benchmarks"
+HISTORY_FILE = BENCH_DIR / "history.jsonl"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+SEED = 42
+BOOT_RESAMPLES = 200
+
+
+# ---------- stages ----------
+# each stage: (setup(path, df) -> args, run(*args)); only run() is measured
+def _figures(df, out_dir):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    specs = [dataclasses.replace(s, path=out_dir / s.path.name)
+             for s in visuals.figure_specs(summarize(df, visuals.score_cols))]
+    render_all(specs, workers=1, force=True, manifest_path=out_dir / "manifest.json")
+
+
+STAGES = {
+    "loader": (lambda path, df: (path,), lambda path: load_dataset(path, use_cache=False)),
+    "loader_cached": (lambda path, df: (path,), lambda path: load_dataset(path)),
+    "group_table": (lambda path, df: (df,), lambda df: bias_fairness.group_table(df, "race/ethnicity")),
+    "compute_metrics": (lambda path, df: (df,),
+                        lambda df: sensitivity_analysis.compute_metrics(df, FAILING_CUTOFF, EXCELLENT_CUTOFF,
+                                                                        "bench")),
+    "bootstrap": (lambda path, df: (df["math score"].to_numpy(dtype=np.float64),),
+                  lambda v: bootstrap_means(v, BOOT_RESAMPLES, np.random.default_rng(SEED))),
+    "outliers": (lambda path, df: (df,), lambda df: sanity_checks.find_outliers(df, sanity_checks.score_cols)),
+    "figures": (lambda path, df: (df, BENCH_DIR / "figures"), _figures),
+}
+
+
+def measure(func, args, repeat: int) -> dict:
+    wall = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        wall.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"wall_s": min(wall), "peak_mb": peak / 2**20}
+
+
+def run_benchmarks(sizes: list, stages: list, repeat: int = 3) -> list:
+    profile = fit_profile()
+    results = []
+    for n_rows in sizes:
+        path = synthetic_file(n_rows, SEED, profile)
+        load_dataset(path)  # build the binary cache so loader_cached measures a warm read
+        df = load_dataset(path)
+        for name in stages:
+            setup, func = STAGES[name]
+            r = measure(func, setup(path, df), repeat)
+            r.update({"stage": name, "rows": n_rows})
+            results.append(r)
+            print(f"{name:<18}{n_rows:>12,}{r['wall_s']:>12.4f}s{r['peak_mb']:>12.1f} MB")
+        del df
+    return results
+
+
+# ---------- history / baseline ----------
+def _commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, timeout=10)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def append_history(results: list, path: Path = HISTORY_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    context = {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": _commit(),
+               "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+               "machine": platform.machine()}
+    with open(path, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({**context, **r}) + "\n")
+
+
+def _key(r: dict) -> str:
+    return f"{r['stage']}@{r['rows']}"
+
+
+def load_baseline(path: Path = BASELINE_FILE) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(results: list, path: Path = BASELINE_FILE):
+    baseline = load_baseline(path)
+    baseline.update({_key(r): {"wall_s": r["wall_s"], "peak_mb": r["peak_mb"]} for r in results})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def regressions(results: list, baseline: dict, tolerance: float, mem_tolerance: float = None) -> list:
+    """Human-readable lines for every stage beyond baseline * (1 + tolerance)."""
+    out = []
+    for r in results:
+        base = baseline.get(_key(r))
+        if not base:
+            continue
+        if r["wall_s"] > base["wall_s"] * (1 + tolerance):
+            out.append(f"{_key(r)}: {r['wall_s']:.4f}s vs baseline {base['wall_s']:.4f}s "
+                       f"({r['wall_s'] / base['wall_s'] - 1:+.0%})")
+        if mem_tolerance is not None and r["peak_mb"] > base["peak_mb"] * (1 + mem_tolerance):
+            out.append(f"{_key(r)}: peak {r['peak_mb']:.1f} MB vs baseline {base['peak_mb']:.1f} MB")
+    return out
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time and memory-profile every analysis stage on synthetic data.")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "1M"], help="row counts, e.g. 10k 1M 50M")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES), metavar="STAGE",
+                        help=f"stages to run (default: all of {', '.join(STAGES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (the best is kept)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fail when a stage is this much slower than the baseline (0.25 = 25%%)")
+    parser.add_argument("--mem-tolerance", type=float, default=None,
+                        help="also fail when peak memory grows by more than this fraction")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--history", type=Path, default=HISTORY_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline instead of comparing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [parse_size(s) for s in args.sizes]
+    print(f"{'stage':<18}{'rows':>12}{'wall':>13}{'peak':>15}")
+    results = run_benchmarks(sizes, args.stages, args.repeat)
+    append_history(results, args.history)
+    print(f"✅ Appended {len(results)} results to: {args.history}")
+
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f"✅ Baseline updated: {args.baseline}")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"ℹ️ No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    failed = regressions(results, baseline, args.tolerance, args.mem_tolerance)
+    for line in failed:
+        print(f"❌ Regression: {line}")
+    if not failed:
+        print(f"✅ No stage regressed beyond {args.tolerance:.0%} of the baseline")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
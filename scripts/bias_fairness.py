@@ -1,45 +1,39 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-from datetime import datetime
+from __future__ import annotations
 
+import argparse
+import glob
+from pathlib import Path
 
-ROOT = Path(__file__).resolve().parent.parent
-LOG_DIR = ROOT / "outputs" / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+from bootstrap_engine import stratified_bootstrap_sums, percentile_ci
+from data_loader import load_dataset
+from fairness_aggregates import (partial_aggregates, partials_from_shards, finalize_group_table,
+                                 finalize_fair_table, suppressed_cells, cohen_d_from_partials)
+from fairness_significance import (cohen_d_significance, cohen_d_counts, significance_table,
+                                   permutation_test, ALPHA, DI_THRESHOLD)
+from groupby_kernel import dimension_name, parse_dimensions
+from instrument import log_run, phase, instrumented
+from lazy_imports import lazy_import
 
-SEED = 42  # set once for reproducibility
-np.random.seed(SEED)
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
-def log_run(script_name: str, note: str = ""):
-    with open(LOG_DIR / "run.log", "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {script_name} | seed={SEED} {note}\n")
 
+SEED = 42  # seeds each run's own np.random.Generator
 
 # ---------- paths ----------
 SCRIPT_DIR = Path(__file__).resolve().parent
 ROOT = SCRIPT_DIR.parent
 DATA_FILE = ROOT / "data" / "StudentsPerformance.csv"
 OUT_DIR = ROOT / "outputs"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 FAIRNESS_CSV = OUT_DIR / "fairness_metrics.csv"
 SUMMARY_TXT  = OUT_DIR / "fairness_summary.txt"
+CIS_CSV      = OUT_DIR / "fairness_cis.csv"
+SIGNIFICANCE_CSV = OUT_DIR / "fairness_significance.csv"
 
-# ---------- load & derive ----------
-df = pd.read_csv(DATA_FILE)
-df["total_score"]   = df["math score"] + df["reading score"] + df["writing score"]
-df["average_score"] = df["total_score"] / 3
-
-def categorize(total):
-    if total < 150:
-        return "Failing"
-    elif total < 210:
-        return "Average"
-    else:
-        return "Excellent"
-
-df["performance_category"] = df["total_score"].apply(categorize)
+N_BOOT = 1000
+DIMENSIONS = ["gender", "race/ethnicity"]
+CATEGORIES = ["Excellent", "Average", "Failing"]
 
 # ---------- helpers ----------
 def cohen_d(x, y):
@@ -55,55 +49,71 @@ def cohen_d(x, y):
         return 0.0
     return (x.mean() - y.mean()) / sp
 
-def group_table(df, dimension):
-    # counts
-    grp = df.groupby(dimension, dropna=False)
-    counts = grp.size().rename("count")
-    mean_total = grp["total_score"].mean().rename("mean_total_score")
-
-    # rates by category
-    cat_counts = df.pivot_table(index=dimension, columns="performance_category",
-                                values="total_score", aggfunc="count").fillna(0)
-    for col in ["Excellent", "Average", "Failing"]:
-        if col not in cat_counts.columns:
-            cat_counts[col] = 0
-
-    # convert to rates
-    rates = cat_counts.div(counts, axis=0).rename(columns={
-        "Excellent": "rate_excellent",
-        "Average"  : "rate_average",
-        "Failing"  : "rate_failing"
-    })
-
-    # disparate impact vs best subgroup (Excellent rate)
-    max_rate = rates["rate_excellent"].max()
-    if max_rate == 0:
-        disp = pd.Series(1.0, index=rates.index, name="disparate_impact_vs_max_excellent")
-    else:
-        disp = (rates["rate_excellent"] / max_rate).rename("disparate_impact_vs_max_excellent")
+@instrumented()
+def group_table(df, dimension, min_cell_size=0):
+    # one factorize + bincount pass (groupby_kernel); dimension may be a column
+    # or a tuple of columns (intersection)
+    return finalize_group_table(partial_aggregates(df, [dimension]), dimension, min_cell_size)
+
+@instrumented()
+def bootstrap_fairness(df, dimensions, n_boot, rng, min_cell_size=0):
+    """
+    Stratified bootstrap of every group_table metric plus the gender Cohen's d.
 
-    out = pd.concat([counts, mean_total, rates, disp], axis=1).reset_index()
-    out.insert(0, "dimension", dimension)
-    out = out.rename(columns={dimension: "subgroup"})
-    return out
+    `dimensions` are single columns. Rows are resampled within each joint
+    subgroup of `dimensions`, so every subgroup keeps its size (and subgroups
+    below min_cell_size stay excluded, as in group_table). Each resample is a vector of row weights, and
+    the weighted counts, sums, sums of squares and category counts of every
+    subgroup come out of one matrix product instead of a pivot_table call.
+    Returns {(dimension, subgroup, metric): array of n_boot samples}.
+    """
+    total = df["total_score"].to_numpy(dtype=np.float64)
+    category = df["performance_category"].to_numpy()
 
-# ---------- compute fairness tables ----------
-by_gender = group_table(df, "gender")
-by_race   = group_table(df, "race/ethnicity")
+    parts, layout = [], []
+    for dim in dimensions:
+        codes, labels = pd.factorize(df[dim], sort=True, use_na_sentinel=False)
+        onehot = (codes[:, None] == np.arange(len(labels))).astype(np.float64)
+        parts += [onehot, onehot * total[:, None], onehot * (total ** 2)[:, None]]
+        parts += [onehot * (category == c)[:, None] for c in CATEGORIES]
+        layout.append((dim, labels))
 
-fair_table = pd.concat([by_gender, by_race], ignore_index=True)
-fair_table.to_csv(FAIRNESS_CSV, index=False)
+    strata = df.groupby(dimensions, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+    sums = stratified_bootstrap_sums(np.hstack(parts), strata, n_boot, rng)
 
-# ---------- effect size for gender (total score) ----------
-female_scores = df.loc[df["gender"] == "female", "total_score"]
-male_scores   = df.loc[df["gender"] == "male", "total_score"]
-d_gender = cohen_d(female_scores, male_scores)
+    samples = {}
+    col = 0
+    for dim, labels in layout:
+        k = len(labels)
+        block = sums[:, col:col + 6 * k].reshape(n_boot, 6, k)
+        col += 6 * k
+        n, s, ss = block[:, 0], block[:, 1], block[:, 2]
+        kept = n[0] >= min_cell_size  # subgroup sizes are fixed by the stratification
 
-# ---------- summary ----------
-lines = []
-lines.append("===== FAIRNESS SUMMARY =====")
-lines.append(f"Rows analyzed: {len(df)}")
-lines.append("")
+        rate_exc = block[:, 3] / n
+        max_rate = rate_exc[:, kept].max(axis=1, keepdims=True) if kept.any() else np.zeros((n_boot, 1))
+        di = np.divide(rate_exc, max_rate, out=np.ones_like(rate_exc), where=max_rate > 0)
+        metrics = {
+            "mean_total_score": s / n,
+            "rate_average": block[:, 4] / n,
+            "rate_excellent": rate_exc,
+            "rate_failing": block[:, 5] / n,
+            "disparate_impact_vs_max_excellent": di,
+        }
+        for metric, arr in metrics.items():
+            for j, label in enumerate(labels):
+                if kept[j]:
+                    samples[(dim, label, metric)] = arr[:, j]
+
+        if dim == "gender" and {"female", "male"} <= set(labels[kept]):
+            f, m = labels.get_loc("female"), labels.get_loc("male")
+            mean = s / n
+            var = (ss - s * mean) / (n - 1)
+            sp = np.sqrt(((n[:, f] - 1) * var[:, f] + (n[:, m] - 1) * var[:, m])
+                         / (n[:, f] + n[:, m] - 2))
+            samples[("gender", "female vs male", "cohen_d_total_score")] = \
+                (mean[:, f] - mean[:, m]) / sp
+    return samples
 
 def top_subgroup(tbl, dim):
     t = tbl[tbl["dimension"] == dim].copy()
@@ -112,36 +122,210 @@ def top_subgroup(tbl, dim):
         return None
     return t.iloc[0].to_dict()
 
-top_gender = top_subgroup(fair_table, "gender")
-top_race   = top_subgroup(fair_table, "race/ethnicity")
-
-if top_gender:
-    lines.append(f"Top gender by Excellent rate: {top_gender['subgroup']} "
-                 f"({top_gender['rate_excellent']:.3f})")
-if top_race:
-    lines.append(f"Top race/ethnicity by Excellent rate: {top_race['subgroup']} "
-                 f"({top_race['rate_excellent']:.3f})")
-
-lines.append("")
-lines.append("Cohen's d (total_score, female vs male): "
-             f"{d_gender:.3f} (positive means female > male)")
-
-# disparate impact quick flags (common heuristic: < 0.8 can be concerning)
-flags = fair_table.loc[fair_table["disparate_impact_vs_max_excellent"] < 0.8,
-                       ["dimension", "subgroup", "disparate_impact_vs_max_excellent"]]
-lines.append("")
-lines.append("Subgroups with disparate impact < 0.80 (vs. best Excellent-rate subgroup):")
-if len(flags) == 0:
-    lines.append("None")
-else:
-    for _, r in flags.iterrows():
-        lines.append(f"- {r['dimension']} = {r['subgroup']}: "
-                     f"{r['disparate_impact_vs_max_excellent']:.3f}")
-
-with open(SUMMARY_TXT, "w", encoding="utf-8") as f:
-    f.write("\n".join(lines))
-
-print(f"✅ Wrote fairness table to: {FAIRNESS_CSV}")
-print(f"✅ Wrote fairness summary to: {SUMMARY_TXT}")
-
-log_run("bias_fairness.py")       
+@instrumented()
+def run(df: pd.DataFrame = None, dimensions=DIMENSIONS, min_cell_size: int = 0, permutations: int = 0,
+        alpha: float = ALPHA):
+    # ---------- load & derive ----------
+    if df is None:
+        df = load_dataset(DATA_FILE)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(SEED)  # used by the fairness bootstrap
+
+    # ---------- compute fairness tables (one pass for every dimension) ----------
+    with phase("bias_fairness.tables", rows=len(df), dimensions=len(dimensions)):
+        partial = partial_aggregates(df, dimensions)
+        fair_table = finalize_fair_table(partial, dimensions, min_cell_size)
+    fair_table.to_csv(FAIRNESS_CSV, index=False)
+
+    # ---------- effect size for gender (total score) ----------
+    female_scores = df.loc[df["gender"] == "female", "total_score"]
+    male_scores   = df.loc[df["gender"] == "male", "total_score"]
+    d_gender = cohen_d(female_scores, male_scores)
+
+    # ---------- significance (closed forms; permutations only on request) ----------
+    with phase("bias_fairness.significance", rows=len(df), permutations=permutations):
+        d_stats = cohen_d_significance(d_gender, female_scores.notna().sum(), male_scores.notna().sum())
+        significance = significance_table(partial, dimensions, min_cell_size)
+        if permutations:
+            pair = pd.concat([female_scores, male_scores])
+            d_stats["permutation"] = permutation_test(pair.to_numpy(dtype=np.float64),
+                                                      np.arange(len(pair)) < len(female_scores),
+                                                      permutations, np.random.default_rng(SEED), alpha)
+    significance.to_csv(SIGNIFICANCE_CSV, index=False)
+
+    # ---------- stratified bootstrap CIs (single-column dimensions) ----------
+    boot_dims = [d for d in dimensions if isinstance(d, str)]
+    point = fair_table.set_index(["dimension", "subgroup"])
+    ci_rows = []
+    if boot_dims:
+        boot = bootstrap_fairness(df, boot_dims, N_BOOT, rng, min_cell_size)
+        for (dim, sub, metric), draws in boot.items():
+            if metric != "cohen_d_total_score" and (dim, sub) not in point.index:
+                continue
+            low, high = percentile_ci(draws, 0.95)
+            estimate = d_gender if metric == "cohen_d_total_score" else point.loc[(dim, sub), metric]
+            ci_rows.append({"dimension": dim, "subgroup": sub, "metric": metric,
+                            "estimate": estimate, "ci_low": low, "ci_high": high})
+    ci_table = pd.DataFrame(ci_rows, columns=["dimension", "subgroup", "metric", "estimate",
+                                              "ci_low", "ci_high"])
+    ci_table.to_csv(CIS_CSV, index=False)
+
+    write_summary(fair_table, d_gender, len(df), ci_table, boot_dims=boot_dims,
+                  suppressed=suppressed_cells(partial, min_cell_size), min_cell_size=min_cell_size,
+                  significance=significance, d_stats=d_stats, alpha=alpha)
+    print(f"✅ Wrote fairness table to: {FAIRNESS_CSV}")
+    print(f"✅ Wrote fairness summary to: {SUMMARY_TXT}")
+    print(f"✅ Wrote fairness bootstrap CIs to: {CIS_CSV}")
+    print(f"✅ Wrote fairness significance to: {SIGNIFICANCE_CSV}")
+
+    log_run("bias_fairness.py", run_note(dimensions, min_cell_size), seed=SEED)
+
+@instrumented()
+def run_sharded(paths, workers: int = 1, dimensions=DIMENSIONS, min_cell_size: int = 0):
+    """
+    Fairness table and Cohen's d over many shard files without concatenating
+    them: per-shard partial aggregates (in parallel) are merged and finalized.
+    Bootstrap CIs need row-level data and are not computed in this mode.
+    """
+    dims = list(dict.fromkeys(["gender", *dimensions]))  # gender is needed for Cohen's d / row count
+    partial = partials_from_shards(paths, workers, dims)
+    fair_table = finalize_fair_table(partial, dimensions, min_cell_size)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    fair_table.to_csv(FAIRNESS_CSV, index=False)
+    d_gender = cohen_d_from_partials(partial)
+    n_rows = int(partial.xs("gender", level="dimension")["count"].sum())
+    d_stats = cohen_d_significance(d_gender, *cohen_d_counts(partial))
+    significance = significance_table(partial, dimensions, min_cell_size)
+    significance.to_csv(SIGNIFICANCE_CSV, index=False)
+
+    write_summary(fair_table, d_gender, n_rows, None, note=f"Sharded run over {len(paths)} files; "
+                  "bootstrap CIs not computed (they need row-level data).",
+                  suppressed=suppressed_cells(partial.loc[[dimension_name(d) for d in dimensions]],
+                                              min_cell_size),
+                  min_cell_size=min_cell_size, significance=significance, d_stats=d_stats)
+    print(f"✅ Wrote fairness table to: {FAIRNESS_CSV}")
+    print(f"✅ Wrote fairness summary to: {SUMMARY_TXT}")
+    print(f"✅ Wrote fairness significance to: {SIGNIFICANCE_CSV}")
+
+    log_run("bias_fairness.py", f"shards={len(paths)} workers={workers} {run_note(dimensions, min_cell_size)}".rstrip(),
+            seed=SEED)
+
+def run_note(dimensions, min_cell_size):
+    if list(dimensions) == DIMENSIONS and min_cell_size == 0:
+        return ""
+    return f"dims={';'.join(dimension_name(d) for d in dimensions)} min_cell_size={min_cell_size}"
+
+def write_summary(fair_table, d_gender, n_rows, ci_table=None, note=None, boot_dims=DIMENSIONS,
+                  suppressed=None, min_cell_size=0, significance=None, d_stats=None, alpha=ALPHA):
+    if ci_table is not None:
+        ci_lookup = ci_table.set_index(["dimension", "subgroup", "metric"])[["ci_low", "ci_high"]]
+    else:
+        ci_lookup = pd.DataFrame(columns=["ci_low", "ci_high"])
+
+    def ci_str(dim, sub, metric):
+        key = (dim, sub, metric)
+        if key not in ci_lookup.index:
+            return ""
+        low, high = ci_lookup.loc[key]
+        return f" [95% CI {low:.3f}, {high:.3f}]"
+
+    if significance is not None:
+        sig_lookup = significance.set_index(["dimension", "subgroup"])
+    else:
+        sig_lookup = pd.DataFrame(columns=["p_equal_rates", "p_di_below_threshold"])
+
+    def p_str(dim, sub):
+        if (dim, sub) not in sig_lookup.index:
+            return ""
+        p_equal, p_below = sig_lookup.loc[(dim, sub), ["p_equal_rates", "p_di_below_threshold"]]
+        return f"; exact p (equal rates) = {p_equal:.3g}, one-sided p (DI < {DI_THRESHOLD:.2f}) = {p_below:.3g}"
+
+    # ---------- summary ----------
+    lines = []
+    lines.append("===== FAIRNESS SUMMARY =====")
+    lines.append(f"Rows analyzed: {n_rows}")
+    lines.append("")
+
+    for dim in fair_table["dimension"].unique():
+        top = top_subgroup(fair_table, dim)
+        if top:
+            lines.append(f"Top {dim} by Excellent rate: {top['subgroup']} "
+                         f"({top['rate_excellent']:.3f})")
+
+    lines.append("")
+    lines.append("Cohen's d (total_score, female vs male): "
+                 f"{d_gender:.3f}{ci_str('gender', 'female vs male', 'cohen_d_total_score')} "
+                 "(positive means female > male)")
+    if d_stats is not None and not np.isnan(d_stats["se"]):
+        lines.append(f"  analytic: SE {d_stats['se']:.3f}, 95% CI [{d_stats['ci_low']:.3f}, "
+                     f"{d_stats['ci_high']:.3f}], p = {d_stats['p_value']:.3g}")
+    if d_stats is not None and "permutation" in d_stats:
+        perm = d_stats["permutation"]
+        lines.append(f"  permutation: p = {perm['p_value']:.3g} ({perm['n_perm']} permutations, "
+                     f"{perm['decision']} at alpha = {alpha:g})")
+
+    # disparate impact quick flags (common heuristic: < 0.8 can be concerning)
+    flags = fair_table.loc[fair_table["disparate_impact_vs_max_excellent"] < 0.8,
+                           ["dimension", "subgroup", "disparate_impact_vs_max_excellent"]]
+    lines.append("")
+    lines.append("Subgroups with disparate impact < 0.80 (vs. best Excellent-rate subgroup):")
+    if len(flags) == 0:
+        lines.append("None")
+    else:
+        for _, r in flags.iterrows():
+            lines.append(f"- {r['dimension']} = {r['subgroup']}: "
+                         f"{r['disparate_impact_vs_max_excellent']:.3f}"
+                         f"{ci_str(r['dimension'], r['subgroup'], 'disparate_impact_vs_max_excellent')}"
+                         f"{p_str(r['dimension'], r['subgroup'])}")
+    if suppressed is not None and len(suppressed):
+        lines.append("")
+        lines.append(f"Subgroups below the minimum cell size (n < {min_cell_size}), not reported:")
+        for _, r in suppressed.iterrows():
+            lines.append(f"- {r['dimension']} = {r['subgroup']} (n={r['count']})")
+    lines.append("")
+    if ci_table is not None and boot_dims:
+        lines.append(f"CIs: stratified bootstrap within {' x '.join(boot_dims)} subgroups, "
+                     f"{N_BOOT} resamples (seed={SEED}); see fairness_cis.csv")
+    if significance is not None:
+        lines.append("p-values: Fisher's exact test vs. the best subgroup and a delta-method test of "
+                     "the DI ratio, per comparison (not adjusted); see fairness_significance.csv")
+    if note:
+        lines.append(note)
+
+    with open(SUMMARY_TXT, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fairness metrics and disparate impact.")
+    parser.add_argument("--shards", nargs="+", metavar="GLOB",
+                        help="aggregate these CSV shards (paths or glob patterns) instead of the main dataset")
+    parser.add_argument("--workers", type=int, default=1, help="process-pool workers for --shards")
+    parser.add_argument("--dims", nargs="+", default=DIMENSIONS, metavar="COL",
+                        help='categorical columns to audit ("all" = every categorical column)')
+    parser.add_argument("--max-order", type=int, default=1,
+                        help="also audit intersections of up to this many --dims columns")
+    parser.add_argument("--min-cell-size", type=int, default=0,
+                        help="leave out subgroups with fewer rows than this")
+    parser.add_argument("--permutations", type=int, default=0, metavar="N",
+                        help="also run a permutation test of Cohen's d with at most N permutations "
+                             "(stops early once the p-value is clearly above or below --alpha)")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="significance level for --permutations")
+    args = parser.parse_args(argv)
+    try:
+        args.dimensions = parse_dimensions(args.dims, args.max_order)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.shards:
+        paths = sorted({p for pattern in args.shards for p in glob.glob(pattern)})
+        run_sharded(paths, args.workers, args.dimensions, args.min_cell_size)
+    else:
+        run(dimensions=args.dimensions, min_cell_size=args.min_cell_size, permutations=args.permutations,
+            alpha=args.alpha)
+
+
+if __name__ == "__main__":
+    main()
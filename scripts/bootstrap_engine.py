@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+# ---------- settings ----------
+# Upper bound on the number of cells (resamples x rows) held in memory at once
+# by one chunk of resample indices/counts. 2**24 cells ~ 128 MB of int64.
+MAX_CHUNK_CELLS = 2**24
+
+
+# ---------- helpers ----------
+def chunk_sizes(n_boot: int, n_rows: int, max_cells: int = MAX_CHUNK_CELLS):
+    """Split n_boot resamples into chunks of at most max_cells index cells."""
+    per_chunk = max(1, max_cells // max(n_rows, 1))
+    full, rest = divmod(n_boot, per_chunk)
+    return [per_chunk] * full + ([rest] if rest else [])
+
+
+def resample_counts(rng: np.random.Generator, n_rows: int, n_resamples: int) -> np.ndarray:
+    """
+    Draw one (n_resamples, n_rows) index matrix and turn it into row
+    multiplicities: counts[b, i] = how often row i appears in resample b.
+    """
+    idx = rng.integers(0, n_rows, size=(n_resamples, n_rows))
+    return _counts_from_indices(idx, n_rows)
+
+
+def stratified_resample_counts(rng: np.random.Generator, strata_rows: list, n_rows: int,
+                               n_resamples: int) -> np.ndarray:
+    """
+    Like resample_counts, but rows are drawn with replacement within each
+    stratum (strata_rows = list of row-index arrays), so every stratum keeps
+    its original size in every resample.
+    """
+    idx = np.empty((n_resamples, n_rows), dtype=np.intp)
+    col = 0
+    for rows in strata_rows:
+        k = len(rows)
+        idx[:, col:col + k] = rows[rng.integers(0, k, size=(n_resamples, k))]
+        col += k
+    return _counts_from_indices(idx, n_rows)
+
+
+def _counts_from_indices(idx: np.ndarray, n_rows: int) -> np.ndarray:
+    n_resamples = idx.shape[0]
+    idx += np.arange(n_resamples)[:, None] * n_rows
+    counts = np.bincount(idx.ravel(), minlength=n_resamples * n_rows)
+    return counts.reshape(n_resamples, n_rows)
+
+
+def split_strata(strata: np.ndarray) -> list:
+    """Row indices of each distinct stratum code, in sorted code order."""
+    strata = np.asarray(strata)
+    order = np.argsort(strata, kind="stable")
+    _, sizes = np.unique(strata[order], return_counts=True)
+    return np.split(order, np.cumsum(sizes)[:-1])
+
+
+def bootstrap_means(values: np.ndarray, n_boot: int, rng: np.random.Generator,
+                    max_cells: int = MAX_CHUNK_CELLS) -> np.ndarray:
+    """
+    Bootstrap the column means of a 2-D (rows x columns) array.
+
+    Every column shares the same resampled rows, so each chunk draws a single
+    index matrix and reduces all columns with one matrix product. Missing
+    values are skipped per column (mean over the non-missing resampled rows).
+    Returns an (n_boot, n_columns) array of resample means.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    n_rows, n_cols = values.shape
+
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    present = present.astype(np.float64)
+
+    out = np.empty((n_boot, n_cols), dtype=np.float64)
+    start = 0
+    for size in chunk_sizes(n_boot, n_rows, max_cells):
+        counts = resample_counts(rng, n_rows, size).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[start:start + size] = (counts @ filled) / (counts @ present)
+        start += size
+    return out
+
+
+def stratified_bootstrap_sums(features: np.ndarray, strata: np.ndarray, n_boot: int,
+                              rng: np.random.Generator,
+                              max_cells: int = MAX_CHUNK_CELLS) -> np.ndarray:
+    """
+    Bootstrap the column sums of a (rows x features) matrix, resampling rows
+    within each stratum.
+
+    Each resample is a vector of row weights (multiplicities), so any
+    statistic built from weighted counts and sums, such as group sizes,
+    category counts, sums and sums of squares, comes from one matrix product
+    per chunk. Returns an (n_boot, n_features) array.
+    """
+    features = np.asarray(features, dtype=np.float64)
+    n_rows = features.shape[0]
+    strata_rows = split_strata(strata)
+
+    out = np.empty((n_boot, features.shape[1]), dtype=np.float64)
+    start = 0
+    for size in chunk_sizes(n_boot, n_rows, max_cells):
+        counts = stratified_resample_counts(rng, strata_rows, n_rows, size)
+        out[start:start + size] = counts.astype(np.float64) @ features
+        start += size
+    return out
+
+
+def _bootstrap_worker(shm_name: str, shape: tuple, dtype: str, n_boot: int,
+                      seed_seq: np.random.SeedSequence, max_cells: int) -> np.ndarray:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        return bootstrap_means(values, n_boot, np.random.default_rng(seed_seq), max_cells)
+    finally:
+        shm.close()
+
+
+def parallel_bootstrap_means(values: np.ndarray, n_boot: int, seed: int, workers: int,
+                             max_cells: int = MAX_CHUNK_CELLS) -> np.ndarray:
+    """
+    Process-pool version of bootstrap_means.
+
+    The n_boot resamples are split across workers; each worker draws from its
+    own generator spawned from SeedSequence(seed), so results are bit-identical
+    for a given (seed, workers) pair. The data is placed in shared memory once
+    and attached by each worker instead of being pickled per task.
+    workers <= 1 runs in-process with np.random.default_rng(seed).
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    if workers <= 1:
+        return bootstrap_means(values, n_boot, np.random.default_rng(seed), max_cells)
+
+    seed_seqs = np.random.SeedSequence(seed).spawn(workers)
+    base, extra = divmod(n_boot, workers)
+    splits = [base + (1 if w < extra else 0) for w in range(workers)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_bootstrap_worker, shm.name, values.shape, values.dtype.str,
+                            n, seed_seq, max_cells)
+                for n, seed_seq in zip(splits, seed_seqs) if n > 0
+            ]
+            parts = [f.result() for f in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+    return np.concatenate(parts, axis=0)
+
+
+def percentile_ci(samples: np.ndarray, level: float = 0.95):
+    """Percentile confidence interval along axis 0."""
+    alpha = (1 - level) / 2
+    low, high = np.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return low, high
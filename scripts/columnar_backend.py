@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bias_fairness import group_table
+from data_loader import load_dataset, SCORE_COLS, CATEGORICAL_COLS, DATA_FILE
+from fairness_aggregates import finalize_fair_table
+from groupby_kernel import as_dimension, parse_dimensions, stats_from_cells
+from sensitivity_analysis import (DIMENSIONS, DEFAULT_FAILING, DEFAULT_EXCELLENT, BASELINE_DESCRIPTION,
+                                  aggregate_metrics, compute_metrics, rates_by_category, summary_row, dimension_key)
+from instrument import log_run, instrumented
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Optional columnar execution backend for the fairness and sensitivity tables.
+# An embedded engine (DuckDB or Polars, in-process, no server) runs one
+# multi-threaded GROUP BY over a Parquet file/glob (or a CSV) and returns the
+# small joint cell table that groupby_kernel.cell_stats builds in memory: per
+# cell, row count, non-missing total_score count, its sum and sum of squares,
+# per-category counts, and count/sum of each score. Everything after that is
+# the pandas code the analyses already use (stats_from_cells, finalize_fair_table,
+# aggregate_metrics), so both paths share one metric definition and only the
+# aggregation differs. Rows are never materialized, so the source may be
+# larger than memory. --check compares every table with the pandas path
+# exactly; with whole-number scores (as in this dataset) the sums are exact
+# in any order.
+
+SEED = 42  # nothing here is random; recorded for the run log
+
+# ---------- paths ----------
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parent
+OUT_DIR = ROOT / "outputs" / "columnar"
+FAIRNESS_CSV = OUT_DIR / "fairness_metrics.csv"
+SENSITIVITY_CSV = OUT_DIR / "sensitivity_summary.csv"
+
+ENGINES = ("duckdb", "polars")
+TOTAL = "__total_score"
+
+
+# ---------- sources ----------
+def is_csv(source) -> bool:
+    return str(source).lower().endswith((".csv", ".csv.gz"))
+
+
+def _import(engine: str):
+    try:
+        return __import__(engine)
+    except ImportError:
+        raise ImportError(f"The {engine} backend needs the optional package {engine}; "
+                          f"install it or choose another --engine") from None
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text) -> str:
+    return "'" + str(text).replace("'", "''") + "'"
+
+
+def _duckdb_source(source) -> str:
+    if not is_csv(source):
+        return f"read_parquet({_literal(source)})"
+    # same types as read_csv_typed: strings for the categoricals, numbers for the scores
+    types = ", ".join([f"{_literal(c)}: 'VARCHAR'" for c in CATEGORICAL_COLS]
+                      + [f"{_literal(c)}: 'DOUBLE'" for c in SCORE_COLS])
+    return f"read_csv({_literal(source)}, header = true, types = {{{types}}})"
+
+
+def _polars_frame(pl, source):
+    if not is_csv(source):
+        return pl.scan_parquet(source)
+    schema = {c: pl.Utf8 for c in CATEGORICAL_COLS}
+    schema.update({c: pl.Float64 for c in SCORE_COLS})
+    return pl.scan_csv(source, schema_overrides=schema)
+
+
+def _collect(lf):
+    try:
+        return lf.collect(engine="streaming")
+    except TypeError:  # Polars before the engine= argument
+        return lf.collect(streaming=True)
+
+
+@instrumented()
+def write_parquet(csv_path, target, engine: str = "duckdb"):
+    """Convert a dataset CSV to Parquet with the engine, streaming (never the whole file in memory)."""
+    Path(target).parent.mkdir(parents=True, exist_ok=True)
+    columns = CATEGORICAL_COLS + SCORE_COLS
+    if engine == "duckdb":
+        duckdb = _import("duckdb")
+        select = ", ".join(_quote(c) for c in columns)
+        duckdb.connect().execute(f"COPY (SELECT {select} FROM {_duckdb_source(csv_path)}) "
+                                 f"TO {_literal(target)} (FORMAT parquet)")
+    else:
+        pl = _import("polars")
+        _polars_frame(pl, csv_path).select(columns).sink_parquet(target)
+
+
+# ---------- cell table ----------
+def _cells_duckdb(source, columns, failing_cutoff, excellent_cutoff) -> pd.DataFrame:
+    duckdb = _import("duckdb")
+    t = _quote(TOTAL)
+    labels = ", ".join(f"CAST({_quote(c)} AS VARCHAR) AS {_quote(c)}" for c in columns)
+    total = " + ".join(f"CAST({_quote(c)} AS DOUBLE)" for c in SCORE_COLS)  # NULL if any score is missing
+    scores = ", ".join(f"count({_quote(c)}) AS {_quote('n ' + c)}, "
+                       f"sum(CAST({_quote(c)} AS DOUBLE)) AS {_quote('sum ' + c)}" for c in SCORE_COLS)
+    sql = f"""
+        SELECT {labels},
+               count(*) AS count,
+               count({t}) AS n_total,
+               sum({t}) AS sum_total,
+               sum({t} * {t}) AS sumsq_total,
+               count(*) FILTER (WHERE {t} >= {excellent_cutoff}) AS n_excellent,
+               count(*) FILTER (WHERE {t} >= {failing_cutoff} AND {t} < {excellent_cutoff}) AS n_average,
+               count(*) FILTER (WHERE {t} < {failing_cutoff}) AS n_failing,
+               {scores}
+        FROM (SELECT *, {total} AS {t} FROM {_duckdb_source(source)})
+        GROUP BY ALL
+    """
+    return duckdb.connect().execute(sql).fetchdf()
+
+
+def _cells_polars(source, columns, failing_cutoff, excellent_cutoff) -> pd.DataFrame:
+    pl = _import("polars")
+    total = pl.col(SCORE_COLS[0]).cast(pl.Float64)
+    for c in SCORE_COLS[1:]:
+        total = total + pl.col(c).cast(pl.Float64)  # null if any score is missing
+    lf = _polars_frame(pl, source).with_columns(*(pl.col(c).cast(pl.Utf8) for c in columns), total.alias(TOTAL))
+    t = pl.col(TOTAL)
+    aggs = [
+        pl.len().alias("count"),
+        t.count().alias("n_total"),
+        t.sum().alias("sum_total"),
+        (t * t).sum().alias("sumsq_total"),
+        (t >= excellent_cutoff).sum().alias("n_excellent"),
+        ((t >= failing_cutoff) & (t < excellent_cutoff)).sum().alias("n_average"),
+        (t < failing_cutoff).sum().alias("n_failing"),
+    ]
+    for c in SCORE_COLS:
+        aggs += [pl.col(c).count().alias(f"n {c}"), pl.col(c).cast(pl.Float64).sum().alias(f"sum {c}")]
+    out = _collect(lf.group_by(columns).agg(aggs))
+    return pd.DataFrame(out.to_dict(as_series=False))  # no pyarrow needed
+
+
+CELL_QUERIES = {"duckdb": _cells_duckdb, "polars": _cells_polars}
+
+
+@instrumented()
+def cell_table(source, columns, engine: str = "duckdb", failing_cutoff: int = DEFAULT_FAILING,
+               excellent_cutoff: int = DEFAULT_EXCELLENT) -> pd.DataFrame:
+    """groupby_kernel.cell_stats(df, columns) plus per-score n/sum columns, computed by the engine."""
+    columns = list(columns)
+    cells = CELL_QUERIES[engine](source, columns, failing_cutoff, excellent_cutoff)
+    stats = [c for c in cells.columns if c not in columns]
+    out = cells[columns].astype(object)
+    out = out.where(out.notna(), np.nan)  # missing labels as NaN, like encode_column
+    return pd.concat([out, cells[stats].fillna(0).astype(np.float64)], axis=1)
+
+
+# ---------- tables ----------
+@instrumented()
+def backend_tables(source, dimensions=DIMENSIONS, min_cell_size: int = 0, engine: str = "duckdb"):
+    """(fairness table, baseline scenario metrics) from one engine query over `source`."""
+    columns = list(dict.fromkeys(c for d in dimensions for c in as_dimension(d)))
+    cells = cell_table(source, columns, engine)
+    fair = finalize_fair_table(stats_from_cells(cells, dimensions), dimensions, min_cell_size)
+
+    totals = cells.drop(columns=columns).sum()
+    n = int(totals["count"])
+    if not n:
+        raise ValueError(f"{source} has no data rows")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = {c: totals[f"sum {c}"] / totals[f"n {c}"] for c in SCORE_COLS}
+        means["total_score"] = totals["sum_total"] / totals["n_total"]
+    categories = pd.Series({
+        "Excellent": totals["n_excellent"] + n - totals["n_total"],  # missing totals band as Excellent
+        "Average": totals["n_average"],
+        "Failing": totals["n_failing"],
+    })
+    metrics = aggregate_metrics(stats_from_cells(cells, dimensions, dropna=True), means, categories, n,
+                                "baseline", dimensions, min_cell_size)
+    metrics["description"] = BASELINE_DESCRIPTION
+    return fair, metrics
+
+
+@instrumented()
+def pandas_tables(df: pd.DataFrame, dimensions=DIMENSIONS, min_cell_size: int = 0):
+    """The same two results from the in-memory path (group_table, compute_metrics, rates_by_category)."""
+    fair = pd.concat([group_table(df, d, min_cell_size) for d in dimensions], ignore_index=True)
+    metrics = compute_metrics(df, DEFAULT_FAILING, DEFAULT_EXCELLENT, "baseline", dimensions, min_cell_size)
+    metrics["description"] = BASELINE_DESCRIPTION
+    metrics["_tables"] = {f"by_{dimension_key(d)}": rates_by_category(df, d, min_cell_size) for d in dimensions}
+    return fair, metrics
+
+
+def compare_tables(expected, actual) -> list:
+    """Every difference between two (fairness table, metrics) results, compared exactly; [] if identical."""
+    (fair_a, m_a), (fair_b, m_b) = expected, actual
+    problems = []
+    try:
+        pd.testing.assert_frame_equal(fair_a, fair_b, check_exact=True)
+    except AssertionError as e:
+        problems.append(f"fairness table: {e}")
+    for key in m_a:
+        if key == "_tables":
+            continue
+        a, b = m_a[key], m_b.get(key)
+        if not (a == b or (pd.isna(a) and pd.isna(b))):
+            problems.append(f"{key}: pandas {a} vs backend {b}")
+    for key, table in m_a["_tables"].items():
+        try:
+            pd.testing.assert_frame_equal(table, m_b["_tables"][key], check_exact=True)
+        except AssertionError as e:
+            problems.append(f"rates {key}: {e}")
+    return problems
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fairness and sensitivity tables from an embedded columnar "
+                                                 "engine over Parquet (or CSV), without loading the rows.")
+    parser.add_argument("--engine", choices=ENGINES, default="duckdb", help="in-process query engine")
+    parser.add_argument("--data", default=str(DATA_FILE), help="Parquet file or glob, or a dataset CSV")
+    parser.add_argument("--to-parquet", metavar="PATH",
+                        help="first write the --data CSV to this Parquet file, then query the Parquet file")
+    parser.add_argument("--dims", nargs="+", default=DIMENSIONS, metavar="COL",
+                        help='categorical columns to audit ("all" = every categorical column)')
+    parser.add_argument("--max-order", type=int, default=1,
+                        help="also audit intersections of up to this many --dims columns")
+    parser.add_argument("--min-cell-size", type=int, default=0,
+                        help="leave out subgroups with fewer rows than this")
+    parser.add_argument("--check", action="store_true",
+                        help="also compute the tables with the pandas path and fail unless they match exactly")
+    parser.add_argument("--reference", type=Path,
+                        help="CSV the pandas path of --check loads (default: --data when it is a CSV)")
+    args = parser.parse_args(argv)
+    try:
+        args.dimensions = parse_dimensions(args.dims, args.max_order)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.to_parquet and not is_csv(args.data):
+        parser.error("--to-parquet converts a CSV; --data is not one")
+    if args.check and args.reference is None:
+        if not is_csv(args.data):
+            parser.error("--check on Parquet data needs --reference CSV")
+        args.reference = Path(args.data)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = args.data
+    if args.to_parquet:
+        write_parquet(args.data, args.to_parquet, args.engine)
+        print(f"✅ Wrote {args.data} as Parquet to: {args.to_parquet}")
+        source = args.to_parquet
+
+    start = time.perf_counter()
+    fair, metrics = backend_tables(source, args.dimensions, args.min_cell_size, args.engine)
+    seconds = time.perf_counter() - start
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    fair.to_csv(FAIRNESS_CSV, index=False)
+    pd.DataFrame([summary_row(metrics, args.dimensions)]).to_csv(SENSITIVITY_CSV, index=False)
+    print(f"✅ {args.engine} computed {metrics['n']} rows in {seconds:.2f}s; wrote {FAIRNESS_CSV} and {SENSITIVITY_CSV}")
+    note = f"engine={args.engine} source={Path(source).name} seconds={seconds:.3f}"
+
+    if args.check:
+        expected = pandas_tables(load_dataset(args.reference), args.dimensions, args.min_cell_size)
+        problems = compare_tables(expected, (fair, metrics))
+        for p in problems:
+            print(f"❌ {p}")
+        log_run("columnar_backend.py", note + f" check={'fail' if problems else 'ok'}", seed=SEED)
+        if problems:
+            sys.exit(1)
+        print(f"✅ {args.engine} tables match the pandas path exactly ({args.reference})")
+        return
+    log_run("columnar_backend.py", note, seed=SEED)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+from instrument import phase
+from decision import FAILING_CUTOFF, EXCELLENT_CUTOFF, BANDS, band_codes
+from lazy_imports import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+# ---------- paths ----------
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parent
+DATA_FILE = ROOT / "data" / "StudentsPerformance.csv"
+
+# ---------- schema ----------
+CATEGORICAL_COLS = [
+    "gender",
+    "race/ethnicity",
+    "parental level of education",
+    "lunch",
+    "test preparation course",
+]
+SCORE_COLS = ["math score", "reading score", "writing score"]
+
+# compact storage: 1 byte per score, 2 per total, 4 per average; string columns are categoricals
+# (dtype names, so that importing this module does not import numpy)
+SCORE_DTYPE = "uint8"       # whole 0-255 scores (0-100 in practice) with nothing missing
+TOTAL_DTYPE = "uint16"      # sum of three uint8 scores (<= 765)
+AVERAGE_DTYPE = "float32"
+
+# cutoffs live in decision.py (shared with the online decision service)
+# alphabetical, like the object column this replaces (keeps pivot/CSV column order)
+CATEGORY_LABELS = ["Average", "Excellent", "Failing"]
+# category code for each np.digitize band: below failing, between, at/above excellent
+_BAND_CODES = [CATEGORY_LABELS.index(c) for c in BANDS]
+
+CACHE_VERSION = 2  # 2: compact score dtypes
+CACHE_DIRNAME = ".cache"
+
+
+# ---------- helpers ----------
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def read_csv_typed(path: Path, **kwargs) -> pd.DataFrame:
+    """Parse the CSV with explicit dtypes: categoricals for strings, numbers for scores."""
+    dtypes = {c: "category" for c in CATEGORICAL_COLS}
+    dtypes.update({c: "float64" for c in SCORE_COLS})
+    df = pd.read_csv(path, dtype=dtypes, usecols=CATEGORICAL_COLS + SCORE_COLS, **kwargs)
+    return _finalize_types(df)[CATEGORICAL_COLS + SCORE_COLS]
+
+
+def _finalize_types(df: pd.DataFrame) -> pd.DataFrame:
+    for c in SCORE_COLS:
+        col = df[c]
+        # scores are whole numbers; keep float only when values are missing/fractional
+        if col.notna().all() and (col % 1 == 0).all():
+            in_range = len(col) == 0 or (col.min() >= 0 and col.max() <= np.iinfo(SCORE_DTYPE).max)
+            df[c] = col.astype(SCORE_DTYPE if in_range else "int64")
+    for c in CATEGORICAL_COLS:
+        cats = df[c].cat.categories
+        if not cats.is_monotonic_increasing:
+            df[c] = df[c].cat.reorder_categories(cats.sort_values())
+    return df
+
+
+def categorize_totals(total, failing_cutoff: int = FAILING_CUTOFF,
+                      excellent_cutoff: int = EXCELLENT_CUTOFF) -> pd.Categorical:
+    """Vectorized Failing (< failing) / Average / Excellent (>= excellent) labels."""
+    # digitize: 0 below failing, 1 between, 2 at/above excellent (NaN lands in 2,
+    # same as the row-wise `if total < cutoff` comparisons)
+    band = band_codes(total, failing_cutoff, excellent_cutoff)
+    return pd.Categorical.from_codes(np.array(_BAND_CODES, dtype=np.int8)[band], categories=CATEGORY_LABELS)
+
+
+def total_scores(df: pd.DataFrame) -> pd.Series:
+    """Sum of the three scores; uint8 scores are widened to uint16 first so the sum cannot wrap."""
+    scores = [df[c] for c in SCORE_COLS]
+    if all(s.dtype == SCORE_DTYPE for s in scores):
+        scores = [s.astype(TOTAL_DTYPE) for s in scores]
+    return scores[0] + scores[1] + scores[2]
+
+
+def average_scores(total: pd.Series) -> pd.Series:
+    return (total / 3).astype(AVERAGE_DTYPE)
+
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add total_score, average_score and performance_category in place."""
+    df["total_score"] = total_scores(df)
+    df["average_score"] = average_scores(df["total_score"])
+    df["performance_category"] = categorize_totals(df["total_score"].to_numpy())
+    return df
+
+
+# ---------- binary cache ----------
+def cache_dir_for(path: Path, digest: str) -> Path:
+    return path.parent / CACHE_DIRNAME / f"{path.stem}-{digest[:16]}"
+
+
+def _write_cache(df: pd.DataFrame, target: Path, digest: str) -> None:
+    tmp = target.with_name(target.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        entry = {"name": name, "file": f"{i}.npy"}
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            entry["categories"] = [str(c) for c in col.cat.categories]
+            np.save(tmp / entry["file"], col.cat.codes.to_numpy())
+        else:
+            np.save(tmp / entry["file"], col.to_numpy())
+        columns.append(entry)
+    meta = {"version": CACHE_VERSION, "source_sha256": digest, "n_rows": len(df), "columns": columns}
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    shutil.rmtree(target, ignore_errors=True)
+    tmp.rename(target)
+    # drop caches built from older versions of the same file
+    for old in target.parent.glob(f"{target.name.rsplit('-', 1)[0]}-*"):
+        if old != target and len(old.name) == len(target.name) and old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _read_cache(target: Path, digest: str):
+    """Return the cached frame, or None if the cache is missing or fails validation."""
+    meta_file = target / "meta.json"
+    if not meta_file.exists():
+        return None
+    try:
+        meta = json.loads(meta_file.read_text(encoding="utf-8"))
+        if meta.get("version") != CACHE_VERSION or meta.get("source_sha256") != digest:
+            return None
+        if [e["name"] for e in meta["columns"]] != CATEGORICAL_COLS + SCORE_COLS:
+            return None
+        data = {}
+        for entry in meta["columns"]:
+            arr = np.load(target / entry["file"], mmap_mode="r")
+            if arr.shape != (meta["n_rows"],):
+                return None
+            if "categories" in entry:
+                data[entry["name"]] = pd.Categorical.from_codes(np.asarray(arr), categories=entry["categories"])
+            else:
+                data[entry["name"]] = np.asarray(arr)
+    except (OSError, ValueError, KeyError):
+        return None
+    return pd.DataFrame(data)
+
+
+def load_raw(path: Path = DATA_FILE, use_cache: bool = True) -> pd.DataFrame:
+    """Typed source columns, read from the binary cache when it matches the file hash."""
+    path = Path(path)
+    if not use_cache:
+        return read_csv_typed(path)
+    digest = file_sha256(path)
+    target = cache_dir_for(path, digest)
+    df = _read_cache(target, digest)
+    if df is None:
+        df = read_csv_typed(path)
+        try:
+            _write_cache(df, target, digest)
+        except OSError:
+            pass  # read-only data dir: fall back to parsing each time
+    return df
+
+
+def load_dataset(path: Path = DATA_FILE, use_cache: bool = True) -> pd.DataFrame:
+    """Load the student dataset with typed columns plus the derived score columns."""
+    with phase("data_loader.load", cached=use_cache) as rec:
+        df = load_raw(path, use_cache)
+        rec["rows"] = len(df)
+    with phase("data_loader.derive", rows=len(df)):
+        return add_derived_columns(df)
+
+
+def iter_chunks(path: Path = DATA_FILE, chunksize: int = 1_000_000):
+    """
+    Stream the CSV in typed chunks with derived columns, for files larger than
+    memory. Chunks keep the global row numbers as their index.
+    """
+    dtypes = {c: "category" for c in CATEGORICAL_COLS}
+    dtypes.update({c: "float64" for c in SCORE_COLS})
+    reader = pd.read_csv(path, dtype=dtypes, usecols=CATEGORICAL_COLS + SCORE_COLS, chunksize=chunksize)
+    for chunk in reader:
+        yield add_derived_columns(_finalize_types(chunk)[CATEGORICAL_COLS + SCORE_COLS])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the dataset once (building its binary cache).")
+    parser.add_argument("--data", type=Path, default=DATA_FILE, help="dataset CSV")
+    parser.add_argument("--no-cache", action="store_true", help="parse the CSV without reading/writing the cache")
+    args = parser.parse_args(argv)
+    df = load_dataset(args.data, use_cache=not args.no_cache)
+    cache = "off" if args.no_cache else cache_dir_for(args.data, file_sha256(args.data))
+    print(f"✅ Loaded {len(df)} rows from {args.data} (cache: {cache})")
+
+
+if __name__ == "__main__":
+    main()
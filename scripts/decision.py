@@ -0,0 +1,292 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+
+# Performance-category decision logic: the single definition of the cutoffs,
+# shared by the analysis scripts (through data_loader) and by online callers.
+# The single-record path is plain Python and this module imports neither
+# pandas nor numpy at load time; numpy is imported by the batch path only.
+#
+#   python scripts/decision.py classify 140 200 250
+#   python scripts/decision.py serve --stdio            # JSON lines in, JSON lines out
+#   python scripts/decision.py serve --http 8080        # POST /classify
+#   python scripts/decision.py bench
+
+FAILING_CUTOFF = 150
+EXCELLENT_CUTOFF = 210
+# band order: below failing, between, at/above excellent
+BANDS = ("Failing", "Average", "Excellent")
+SCORE_KEYS = ("math score", "reading score", "writing score")
+
+BATCH_MIN = 64  # below this many records the plain-Python path is faster than numpy
+
+
+# ---------- single record ----------
+def classify(total: float, failing_cutoff: float = FAILING_CUTOFF,
+             excellent_cutoff: float = EXCELLENT_CUTOFF) -> str:
+    """Failing (< failing) / Average / Excellent (>= excellent); NaN compares as Excellent."""
+    if total < failing_cutoff:
+        return "Failing"
+    if total < excellent_cutoff:
+        return "Average"
+    return "Excellent"
+
+
+def record_total(record: dict) -> float:
+    """total_score of a record with the three scores (dataset or short names) or a total_score."""
+    if "total_score" in record:
+        return float(record["total_score"])
+    return sum(float(record[k] if k in record else record[k.split()[0]]) for k in SCORE_KEYS)
+
+
+def decide(record: dict, failing_cutoff: float = FAILING_CUTOFF,
+           excellent_cutoff: float = EXCELLENT_CUTOFF) -> dict:
+    """Decision for one student record; {"error": ...} if it cannot be scored."""
+    try:
+        total = record_total(record)
+    except (KeyError, TypeError, ValueError) as e:
+        return {"error": f"bad record: {e!r}"}
+    return {"total_score": total, "average_score": total / 3,
+            "performance_category": classify(total, failing_cutoff, excellent_cutoff)}
+
+
+# ---------- batch ----------
+def band_codes(totals, failing_cutoff: float = FAILING_CUTOFF,
+               excellent_cutoff: float = EXCELLENT_CUTOFF):
+    """Vectorized band index per total: 0 Failing, 1 Average, 2 Excellent (NaN -> 2)."""
+    import numpy as np
+    totals = np.asarray(totals)
+    if totals.dtype.kind not in "iuf":
+        totals = totals.astype(np.float64)
+    return np.digitize(totals, [failing_cutoff, excellent_cutoff])
+
+
+def classify_batch(totals, failing_cutoff: float = FAILING_CUTOFF,
+                   excellent_cutoff: float = EXCELLENT_CUTOFF):
+    """Category label per total, as an object array."""
+    import numpy as np
+    return np.array(BANDS, dtype=object)[band_codes(totals, failing_cutoff, excellent_cutoff)]
+
+
+def decide_arrays(math_scores, reading_scores, writing_scores,
+                  failing_cutoff: float = FAILING_CUTOFF, excellent_cutoff: float = EXCELLENT_CUTOFF):
+    """Vectorized decide() over score arrays: (total, average, category labels)."""
+    import numpy as np
+    total = np.asarray(math_scores) + np.asarray(reading_scores) + np.asarray(writing_scores)
+    return total, total / 3, classify_batch(total, failing_cutoff, excellent_cutoff)
+
+
+def decide_batch(records: list, failing_cutoff: float = FAILING_CUTOFF,
+                 excellent_cutoff: float = EXCELLENT_CUTOFF) -> list:
+    """decide() for many records; large batches classify in one np.digitize call."""
+    if len(records) < BATCH_MIN:
+        return [decide(r, failing_cutoff, excellent_cutoff) for r in records]
+    out, ok, totals = [], [], []
+    for i, r in enumerate(records):
+        try:
+            total = record_total(r)
+        except (KeyError, TypeError, ValueError) as e:
+            out.append({"error": f"bad record: {e!r}"})
+            continue
+        out.append({"total_score": total, "average_score": total / 3})
+        ok.append(i)
+        totals.append(total)
+    for i, label in zip(ok, classify_batch(totals, failing_cutoff, excellent_cutoff)):
+        out[i]["performance_category"] = label
+    return out
+
+
+class MicroBatcher:
+    """
+    Collects records submitted by many callers (threads, HTTP requests, stdin
+    lines) and decides them together: a batch closes after max_batch records
+    or max_wait seconds, whichever comes first.
+    """
+
+    def __init__(self, max_batch: int = 1024, max_wait: float = 0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit_async(self, records: list) -> dict:
+        slot = {"records": records, "done": threading.Event(), "result": None}
+        self._queue.put(slot)
+        return slot
+
+    def submit(self, records: list) -> list:
+        slot = self.submit_async(records)
+        slot["done"].wait()
+        return slot["result"]
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0]["records"])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    slot = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(slot)
+                size += len(slot["records"])
+            results = decide_batch([r for slot in batch for r in slot["records"]])
+            start = 0
+            for slot in batch:
+                slot["result"] = results[start:start + len(slot["records"])]
+                start += len(slot["records"])
+                slot["done"].set()
+
+
+# ---------- serving ----------
+def _records(payload) -> list:
+    return payload if isinstance(payload, list) else [payload]
+
+
+def serve_stdio(batcher: MicroBatcher, stdin=sys.stdin, stdout=sys.stdout):
+    """One JSON object (or list of objects) per input line; one JSON line out per input line, in order."""
+    pending = queue.Queue()
+
+    def writer():
+        while True:
+            slot = pending.get()
+            if slot is None:
+                return
+            if "reply" in slot:
+                out = slot["reply"]
+            else:
+                slot["done"].wait()
+                out = slot["result"] if slot["many"] else slot["result"][0]
+            stdout.write(json.dumps(out) + "\n")
+            stdout.flush()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            pending.put({"reply": {"error": f"bad JSON: {e}"}})
+            continue
+        slot = batcher.submit_async(_records(payload))
+        slot["many"] = isinstance(payload, list)
+        pending.put(slot)
+    pending.put(None)
+    thread.join()
+
+
+def serve_http(batcher: MicroBatcher, port: int, host: str = "127.0.0.1"):
+    """POST /classify with a JSON object or list of objects; concurrent requests share batches."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") != "/classify":
+                self.send_error(404)
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError as e:
+                self.send_error(400, f"bad JSON: {e}")
+                return
+            result = batcher.submit(_records(payload))
+            body = json.dumps(result if isinstance(payload, list) else result[0]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 128  # listen backlog; the default 5 resets bursts of clients
+        daemon_threads = True
+
+    server = Server((host, port), Handler)
+    print(f"✅ Serving decisions on http://{host}:{port}/classify", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# ---------- benchmark ----------
+def benchmark(n_single: int = 100_000, batch_sizes=(1_000, 100_000, 1_000_000), repeats: int = 20,
+              seed: int = 42) -> list:
+    """p50/p99 latency per call and rows/second, for the single-record and batch paths."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    scores = rng.integers(0, 101, size=(max(n_single, *batch_sizes), 3))
+    records = [dict(zip(SCORE_KEYS, map(int, row))) for row in scores[:n_single]]
+
+    lat = np.empty(n_single)
+    clock = time.perf_counter_ns
+    for i, rec in enumerate(records):
+        t0 = clock()
+        decide(rec)
+        lat[i] = clock() - t0
+    rows = [{"path": "decide (single record)", "rows": n_single,
+             "p50_us": np.percentile(lat, 50) / 1e3, "p99_us": np.percentile(lat, 99) / 1e3,
+             "rows_per_s": n_single / (lat.sum() / 1e9)}]
+
+    for size in batch_sizes:
+        m, r, w = scores[:size].T
+        lat = np.empty(repeats)
+        for i in range(repeats):
+            t0 = clock()
+            decide_arrays(m, r, w)
+            lat[i] = clock() - t0
+        rows.append({"path": "decide_arrays (batch)", "rows": size,
+                     "p50_us": np.percentile(lat, 50) / 1e3, "p99_us": np.percentile(lat, 99) / 1e3,
+                     "rows_per_s": size / (np.median(lat) / 1e9)})
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Performance-category decisions for students.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("classify", help="classify total scores given on the command line")
+    p.add_argument("totals", nargs="+", type=float)
+    p = sub.add_parser("serve", help="serve decisions over stdin/stdout or HTTP")
+    mode = p.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--stdio", action="store_true", help="JSON lines on stdin, JSON lines on stdout")
+    mode.add_argument("--http", type=int, metavar="PORT", help="HTTP server on localhost:PORT")
+    p.add_argument("--max-batch", type=int, default=1024, help="records per batch at most")
+    p.add_argument("--max-wait-ms", type=float, default=2.0, help="longest a record waits for its batch")
+    p = sub.add_parser("bench", help="latency / throughput micro-benchmark")
+    p.add_argument("--n", type=int, default=100_000, help="single-record calls to time")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "classify":
+        for total in args.totals:
+            print(f"{total:g}\t{classify(total)}")
+    elif args.command == "serve":
+        batcher = MicroBatcher(args.max_batch, args.max_wait_ms / 1000)
+        if args.stdio:
+            serve_stdio(batcher)
+        else:
+            serve_http(batcher, args.http)
+    else:
+        print(f"{'path':<24}{'rows':>10}{'p50 us':>12}{'p99 us':>12}{'rows/s':>14}")
+        for r in benchmark(args.n):
+            print(f"{r['path']:<24}{r['rows']:>10}{r['p50_us']:>12.2f}{r['p99_us']:>12.2f}{r['rows_per_s']:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,187 @@
-import pandas as pd
-import sys
-import os
-from pathlib import Path
-from datetime import datetime
-import numpy as np
+from __future__ import annotations
 
-ROOT = Path(__file__).resolve().parent.parent
-LOG_DIR = ROOT / "outputs" / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+import argparse
+import json
+from pathlib import Path
 
-SEED = 42  # set once for reproducibility
-np.random.seed(SEED)
+from data_loader import load_dataset, CATEGORICAL_COLS, SCORE_COLS
+from decision import FAILING_CUTOFF
+from groupby_kernel import subgroup_stats
+from instrument import log_run, instrumented
+from lazy_imports import lazy_import
 
-def log_run(script_name: str, note: str = ""):
-    with open(LOG_DIR / "run.log", "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {script_name} | seed={SEED} {note}\n")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
+SEED = 42  # nothing here is random; recorded for the run log
 
 # ---------- paths ----------
 SCRIPT_DIR = Path(__file__).resolve().parent
 DATA_FILE = SCRIPT_DIR.parent / "data" / "StudentsPerformance.csv"
 OUT_DIR = SCRIPT_DIR.parent / "outputs"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 OUT_FILE = OUT_DIR / "descriptive_stats.txt"
+JSON_OUT = OUT_DIR / "descriptive_stats.json"
+GROUP_MEANS_CSV = OUT_DIR / "descriptive_group_means.csv"
+
+TOP_K = 5
+RANK_COLS = ["gender", "race/ethnicity", "total_score"]
+UNDER_COLS = ["gender", "parental level of education", "test preparation course", "total_score"]
+
+
+# ---------- summary engine ----------
+def group_means(df: pd.DataFrame, columns=CATEGORICAL_COLS) -> pd.DataFrame:
+    """Row count and mean total_score of every subgroup of every column, from one factorized pass."""
+    st = subgroup_stats(df, columns, dropna=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = st["sum_total"] / st["n_total"]
+    return pd.DataFrame({
+        "dimension": st.index.get_level_values("dimension"),
+        "group": st.index.get_level_values("subgroup"),
+        "count": st["count"].astype(np.int64).to_numpy(),
+        "n_total": st["n_total"].astype(np.int64).to_numpy(),
+        "mean_total": mean.to_numpy(),
+    })
+
+
+@instrumented()
+def summarize(df: pd.DataFrame, k: int = TOP_K) -> dict:
+    """
+    Every descriptive result as pandas objects, each from at most one pass
+    over the rows: top/bottom k via nlargest/nsmallest (partial selection,
+    ties in row order as a stable sort would give), best/worst subject for
+    the k sample rows only, and all grouped means from group_means.
+    """
+    sample = df[SCORE_COLS].head(k)
+    under = df.index[df["total_score"].to_numpy() < FAILING_CUTOFF][:k]
+    return {
+        "records": len(df),
+        "columns": list(df.columns),
+        "nunique": df.nunique(),
+        "describe": df[SCORE_COLS].describe(),
+        "corr": df[SCORE_COLS].corr(),
+        "top": df.nlargest(k, "total_score", keep="first")[RANK_COLS],
+        "bottom": df.nsmallest(k, "total_score", keep="first")[RANK_COLS],
+        "subjects": sample.assign(best_subject=sample.idxmax(axis=1), worst_subject=sample.idxmin(axis=1)),
+        "categories": df["performance_category"].value_counts(),
+        "group_means": group_means(df),
+        "underperforming": df.loc[under, UNDER_COLS],
+    }
+
+
+def _means(summary: dict, column: str) -> pd.Series:
+    t = summary["group_means"]
+    t = t[t["dimension"] == column]
+    return pd.Series(t["mean_total"].to_numpy(), index=pd.Index(t["group"], name=column), name="total_score")
+
+
+def format_text(summary: dict) -> str:
+    lines = []
+
+    def out(*parts):  # one line per former print() call
+        lines.append(" ".join(str(p) for p in parts))
+
+    out("===== Basic Dataset Info =====")
+    out("Number of records:", summary["records"])
+    out("Columns:", summary["columns"])
+    out("\nUnique values per column:\n", summary["nunique"])
+
+    out("\n===== Descriptive Stats for Individual Scores =====")
+    out(summary["describe"])
+
+    out("\n===== Correlation Between Scores =====")
+    out(summary["corr"])
+
+    out("\n===== Top 5 Students by Total Score =====")
+    out(summary["top"])
+
+    out("\n===== Bottom 5 Students by Total Score =====")
+    out(summary["bottom"])
+
+    out("\n===== Best and Worst Subject for Each Student (Sample 5) =====")
+    out(summary["subjects"])
+
+    out("\n===== Score Categories =====")
+    out(summary["categories"])
+
+    out("\n===== Average Total Score by Gender =====")
+    out(_means(summary, "gender"))
+
+    out("\n===== Average Total Score by Parental Education =====")
+    out(_means(summary, "parental level of education").sort_values(ascending=False))
+
+    out("\n===== Average Total Score by Test Prep Course =====")
+    out(_means(summary, "test preparation course"))
+
+    out(f"\n===== Underperforming Students (total_score < {FAILING_CUTOFF}) =====")
+    out(summary["underperforming"])
+    return "\n".join(lines) + "\n"
+
+
+def _jsonable(v):
+    if isinstance(v, dict):
+        return {str(key): _jsonable(x) for key, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [_jsonable(x) for x in v]
+    if isinstance(v, np.integer):
+        return int(v)
+    if isinstance(v, (float, np.floating)):
+        return None if np.isnan(v) else float(v)
+    return v
+
+
+def _records(frame: pd.DataFrame) -> list:
+    return [{"index": i, **row} for i, row in zip(frame.index, frame.to_dict(orient="records"))]
+
+
+def to_json(summary: dict) -> dict:
+    means = summary["group_means"]
+    return _jsonable({
+        "records": summary["records"],
+        "columns": summary["columns"],
+        "unique_values": summary["nunique"].to_dict(),
+        "describe": summary["describe"].to_dict(),
+        "correlation": summary["corr"].to_dict(),
+        "top": _records(summary["top"]),
+        "bottom": _records(summary["bottom"]),
+        "best_worst_sample": _records(summary["subjects"]),
+        "categories": summary["categories"].to_dict(),
+        "group_means": {d: dict(zip(t["group"], t["mean_total"])) for d, t in means.groupby("dimension", sort=False)},
+        "failing_cutoff": FAILING_CUTOFF,
+        "underperforming_sample": _records(summary["underperforming"]),
+    })
+
+
+@instrumented()
+def run(df: pd.DataFrame = None):
+    if df is None:
+        df = load_dataset(DATA_FILE)
+
+    summary = summarize(df)
+    text = format_text(summary)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(OUT_FILE, "w", encoding="utf-8") as f:
+        f.write(text)
+    with open(JSON_OUT, "w", encoding="utf-8") as f:
+        json.dump(to_json(summary), f, indent=2)
+    summary["group_means"].to_csv(GROUP_MEANS_CSV, index=False)
+
+    print(text, end="")
+    print(f"✅ Wrote descriptive stats to: {OUT_FILE}")
+    print(f"✅ Wrote structured results to: {JSON_OUT} and {GROUP_MEANS_CSV}")
+
+    log_run("descriptive_stats.py", seed=SEED)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Descriptive statistics of the student dataset "
+                                                 "(text report, JSON and subgroup means).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    parse_args(argv)
+    run()
+
 
-# ---------- dual output ----------
-class DualOutput:
-    def __init__(self, *files):
-        self.files = files
-    def write(self, msg):
-        for f in self.files:
-            f.write(msg)
-    def flush(self):
-        for f in self.files:
-            try:
-                f.flush()
-            except Exception:
-                pass
-
-_real_stdout = sys.__stdout__
-
-with open(OUT_FILE, "w", encoding="utf-8") as output_file:
-    sys.stdout = DualOutput(_real_stdout, output_file)
-    try:
-        # -------- your analysis --------
-        df = pd.read_csv(DATA_FILE)
-        df["total_score"] = df["math score"] + df["reading score"] + df["writing score"]
-        df["average_score"] = df["total_score"] / 3
-
-        print("===== Basic Dataset Info =====")
-        print("Number of records:", len(df))
-        print("Columns:", list(df.columns))
-        print("\nUnique values per column:\n", df.nunique())
-
-        print("\n===== Descriptive Stats for Individual Scores =====")
-        score_cols = ["math score", "reading score", "writing score"]
-        print(df[score_cols].describe())
-
-        print("\n===== Correlation Between Scores =====")
-        print(df[score_cols].corr())
-
-        print("\n===== Top 5 Students by Total Score =====")
-        print(df.sort_values("total_score", ascending=False).head(5)[["gender", "race/ethnicity", "total_score"]])
-
-        print("\n===== Bottom 5 Students by Total Score =====")
-        print(df.sort_values("total_score").head(5)[["gender", "race/ethnicity", "total_score"]])
-
-        print("\n===== Best and Worst Subject for Each Student (Sample 5) =====")
-        df["best_subject"] = df[score_cols].idxmax(axis=1)
-        df["worst_subject"] = df[score_cols].idxmin(axis=1)
-        print(df[["math score", "reading score", "writing score", "best_subject", "worst_subject"]].head(5))
-
-        print("\n===== Score Categories =====")
-        def categorize(score):
-            if score < 150:
-                return "Failing"
-            elif score < 210:
-                return "Average"
-            else:
-                return "Excellent"
-        df["performance_category"] = df["total_score"].apply(categorize)
-        print(df["performance_category"].value_counts())
-
-        print("\n===== Average Total Score by Gender =====")
-        print(df.groupby("gender")["total_score"].mean())
-
-        print("\n===== Average Total Score by Parental Education =====")
-        print(df.groupby("parental level of education")["total_score"].mean().sort_values(ascending=False))
-
-        print("\n===== Average Total Score by Test Prep Course =====")
-        print(df.groupby("test preparation course")["total_score"].mean())
-
-        print("\n===== Underperforming Students (total_score < 150) =====")
-        print(df[df["total_score"] < 150][["gender", "parental level of education", "test preparation course", "total_score"]].head())
-        # -----------------------------------------
-    finally:
-        sys.stdout = _real_stdout
-
-log_run("descriptive_stats.py")       
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from data_loader import load_dataset
+from groupby_kernel import subgroup_stats, dimension_name, STAT_COLUMNS
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Partial aggregates for the fairness tables. A partial holds, per
+# (dimension, subgroup): row count, non-missing total_score count, sum and
+# sum of squares of total_score, and per-category counts. Partials from any
+# split of the rows (shards, chunks, workers) merge by addition, so merging is
+# associative and order-independent; finalizing reproduces group_table in
+# bias_fairness.py and the gender Cohen's d. Dimensions may be single columns
+# or tuples of columns (intersections, see groupby_kernel).
+
+DIMENSIONS = ["gender", "race/ethnicity"]
+PARTIAL_COLUMNS = STAT_COLUMNS
+
+
+# ---------- build / merge ----------
+def partial_aggregates(df: pd.DataFrame, dimensions=DIMENSIONS) -> pd.DataFrame:
+    """Partial aggregates of one frame, indexed by (dimension, subgroup)."""
+    return subgroup_stats(df, dimensions)
+
+
+def merge_partials(*partials: pd.DataFrame) -> pd.DataFrame:
+    """Combine partials by summing matching (dimension, subgroup) rows."""
+    return (pd.concat(partials)
+              .groupby(level=["dimension", "subgroup"], sort=False, dropna=False)[PARTIAL_COLUMNS]
+              .sum())
+
+
+def shard_partial(path: Path, dimensions=DIMENSIONS) -> pd.DataFrame:
+    return partial_aggregates(load_dataset(path), dimensions)
+
+
+def partials_from_shards(paths, workers: int = 1, dimensions=DIMENSIONS) -> pd.DataFrame:
+    """Compute one partial per shard (in a process pool when workers > 1) and merge them."""
+    paths = [Path(p) for p in paths]
+    if not paths:
+        raise FileNotFoundError("No shard files to aggregate")
+    task = functools.partial(shard_partial, dimensions=dimensions)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(task, paths))
+    else:
+        parts = [task(p) for p in paths]
+    return functools.reduce(merge_partials, parts)
+
+
+# ---------- finalize ----------
+def finalize_group_table(partial: pd.DataFrame, dimension, min_cell_size: int = 0) -> pd.DataFrame:
+    """
+    Same columns and row order as bias_fairness.group_table(df, dimension).
+    Subgroups with fewer than min_cell_size rows are dropped before the
+    disparate-impact reference (best Excellent rate) is chosen.
+    """
+    name = dimension_name(dimension)
+    p = partial.xs(name, level="dimension")
+    p = p[p["count"] >= min_cell_size]
+    p = p.loc[sorted(p.index, key=lambda v: (pd.isna(v), "" if pd.isna(v) else v))]
+    count = p["count"]
+    rate_excellent = p["n_excellent"] / count
+    max_rate = rate_excellent.max()
+    disp = rate_excellent / max_rate if max_rate != 0 else pd.Series(1.0, index=p.index)
+    out = pd.DataFrame({
+        "count": count.astype("int64"),
+        "mean_total_score": p["sum_total"] / p["n_total"],
+        "rate_average": p["n_average"] / count,
+        "rate_excellent": rate_excellent,
+        "rate_failing": p["n_failing"] / count,
+        "disparate_impact_vs_max_excellent": disp,
+    })
+    out.index.name = "subgroup"
+    out = out.reset_index()
+    out.insert(0, "dimension", name)
+    return out
+
+
+def finalize_fair_table(partial: pd.DataFrame, dimensions=DIMENSIONS, min_cell_size: int = 0) -> pd.DataFrame:
+    return pd.concat([finalize_group_table(partial, d, min_cell_size) for d in dimensions],
+                     ignore_index=True)
+
+
+def suppressed_cells(partial: pd.DataFrame, min_cell_size: int) -> pd.DataFrame:
+    """(dimension, subgroup, count) of subgroups below the minimum cell size."""
+    small = partial.loc[partial["count"] < min_cell_size, ["count"]]
+    return small.reset_index().astype({"count": "int64"})
+
+
+def cohen_d_from_partials(partial: pd.DataFrame, a: str = "female", b: str = "male",
+                          dimension: str = "gender") -> float:
+    """Pooled-SD Cohen's d of total_score, subgroup a minus subgroup b."""
+    p = partial.xs(dimension, level="dimension")
+    if a not in p.index or b not in p.index:
+        return np.nan
+    stats = []
+    for g in (a, b):
+        n, s, ss = p.loc[g, ["n_total", "sum_total", "sumsq_total"]]
+        if n < 2:
+            return np.nan
+        mean = s / n
+        stats.append((n, mean, (ss - s * mean) / (n - 1)))
+    (na, ma, va), (nb, mb, vb) = stats
+    sp = np.sqrt(((na - 1) * va + (nb - 1) * vb) / (na + nb - 2))
+    if sp == 0:
+        return 0.0
+    return (ma - mb) / sp
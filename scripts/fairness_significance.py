@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import math
+
+from groupby_kernel import dimension_name
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Significance of the fairness statistics without resampling wherever a
+# closed form exists. Everything but the permutation engine works from the
+# partial aggregates (fairness_aggregates.py), so it also covers sharded runs.
+#   - Cohen's d: large-sample variance (Hedges & Olkin) for the interval and
+#     the pooled two-sample t statistic (normal tail) for the p-value.
+#   - Excellent rates: Wilson score intervals.
+#   - Disparate impact (rate / best subgroup's rate): log-ratio delta-method
+#     interval, a one-sided test of DI < 0.8, and the exact permutation
+#     p-value of equal rates, which for a 0/1 outcome is Fisher's exact test
+#     (hypergeometric tail, no sampling).
+#   - permutation_test: batched Monte Carlo permutations of a mean difference
+#     (equivalent to permuting Cohen's d), stopping as soon as the p-value is
+#     clearly on one side of alpha.
+# p-values are per comparison; the DI reference is the best subgroup, chosen
+# after looking at the data, so treat them as screening values.
+
+LEVEL = 0.95
+DI_THRESHOLD = 0.8
+ALPHA = 0.05
+MAX_PERMUTATIONS = 10_000
+STOP_Z = 3.29  # Wilson bound on the Monte Carlo p-value used for early stopping (~99.9%)
+FIRST_BATCH = 64
+MAX_CHUNK_CELLS = 2**24  # permutations x rows held in memory per batch
+
+SIGNIFICANCE_COLUMNS = ["dimension", "subgroup", "reference", "count", "n_excellent", "rate_excellent",
+                        "rate_ci_low", "rate_ci_high", "disparate_impact", "di_ci_low", "di_ci_high",
+                        "p_equal_rates", "p_di_below_threshold"]
+
+
+# ---------- distributions ----------
+def _z(level: float) -> float:
+    """Two-sided standard normal quantile, e.g. 0.95 -> 1.96 (bisection on erfc)."""
+    lo, hi = 0.0, 40.0
+    target = 1 - level
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        if math.erfc(mid / math.sqrt(2)) > target:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def norm_sf(z):
+    """Upper tail of the standard normal, elementwise."""
+    z = np.asarray(z, dtype=np.float64)
+    out = np.array([0.5 * math.erfc(v / math.sqrt(2)) if not np.isnan(v) else np.nan for v in z.ravel()])
+    return out.reshape(z.shape) if z.ndim else float(out[0])
+
+
+def wilson_interval(k, n, level: float = LEVEL, z: float = None):
+    """Wilson score interval of k successes out of n (arrays allowed); z overrides level."""
+    k, n = np.asarray(k, dtype=np.float64), np.asarray(n, dtype=np.float64)
+    z = _z(level) if z is None else z
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = k / n
+        centre = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+        half = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (1 + z**2 / n)
+    return centre - half, centre + half
+
+
+def fisher_exact_p(k1: int, n1: int, k0: int, n0: int) -> float:
+    """
+    Two-sided exact p-value of equal rates for k1/n1 vs k0/n0: the share of
+    all relabellings of the n1 + n0 rows that are at most as likely as the
+    observed table. The hypergeometric pmf is built from its term ratios with
+    one cumsum, so millions of rows cost one vector pass.
+    """
+    k1, n1, k0, n0 = int(k1), int(n1), int(k0), int(n0)
+    total, n = k1 + k0, n1 + n0
+    if n1 == 0 or n0 == 0 or total in (0, n):
+        return 1.0
+    lo, hi = max(0, total - n0), min(total, n1)
+    k = np.arange(lo, hi, dtype=np.float64)
+    # log pmf(k + 1) - log pmf(k)
+    step = np.log(total - k) + np.log(n1 - k) - np.log(k + 1) - np.log(n0 - total + k + 1)
+    logp = np.concatenate([[0.0], np.cumsum(step)])
+    logp -= logp.max()
+    pmf = np.exp(logp)
+    pmf /= pmf.sum()
+    observed = pmf[k1 - lo]
+    return float(min(1.0, pmf[pmf <= observed * (1 + 1e-7)].sum()))
+
+
+# ---------- Cohen's d ----------
+def cohen_d_significance(d: float, n_a: int, n_b: int, level: float = LEVEL) -> dict:
+    """Standard error, interval and two-sided p-value of a pooled-SD Cohen's d."""
+    if np.isnan(d) or n_a < 2 or n_b < 2:
+        return {"d": d, "se": np.nan, "ci_low": np.nan, "ci_high": np.nan, "p_value": np.nan}
+    n = n_a + n_b
+    se = math.sqrt(n / (n_a * n_b) + d**2 / (2 * n))
+    z = _z(level)
+    t = d * math.sqrt(n_a * n_b / n)  # pooled two-sample t; df = n - 2 is large here
+    return {"d": d, "se": se, "ci_low": d - z * se, "ci_high": d + z * se,
+            "p_value": 2 * norm_sf(abs(t))}
+
+
+def cohen_d_counts(partial: pd.DataFrame, a: str = "female", b: str = "male",
+                   dimension: str = "gender") -> tuple:
+    """Non-missing total_score counts of subgroups a and b, from partial aggregates."""
+    p = partial.xs(dimension, level="dimension")
+    return tuple(int(p.loc[g, "n_total"]) if g in p.index else 0 for g in (a, b))
+
+
+# ---------- disparate impact ----------
+def di_significance(partial: pd.DataFrame, dimension, min_cell_size: int = 0, level: float = LEVEL,
+                    threshold: float = DI_THRESHOLD) -> pd.DataFrame:
+    """
+    Per subgroup of one dimension: Wilson interval of the Excellent rate and,
+    against the best-rate subgroup (as in finalize_group_table), the DI
+    delta-method interval, the exact p-value of equal rates and the one-sided
+    p-value of DI < threshold. Zero counts get the usual 0.5 correction in
+    the log-ratio standard error.
+    """
+    name = dimension_name(dimension)
+    p = partial.xs(name, level="dimension")
+    p = p[p["count"] >= min_cell_size]
+    p = p.loc[sorted(p.index, key=lambda v: (pd.isna(v), "" if pd.isna(v) else v))]
+    n = p["count"].to_numpy(dtype=np.float64)
+    k = p["n_excellent"].to_numpy(dtype=np.float64)
+    out = pd.DataFrame(columns=SIGNIFICANCE_COLUMNS)
+    if len(p) == 0:
+        return out
+    rate = k / n
+    low, high = wilson_interval(k, n, level)
+    ref = int(np.argmax(rate))
+    di = rate / rate[ref] if rate[ref] > 0 else np.ones_like(rate)
+
+    kc = np.where(k == 0, 0.5, k)
+    kr = kc[ref]
+    se = np.sqrt(1 / kc - 1 / n + 1 / kr - 1 / n[ref])
+    se[ref] = np.nan  # the reference against itself
+    z = _z(level)
+    with np.errstate(divide="ignore"):
+        log_di = np.log(np.where(di > 0, di, kc / n / (kr / n[ref])))
+    p_equal = np.array([np.nan if j == ref else fisher_exact_p(k[j], n[j], k[ref], n[ref])
+                        for j in range(len(p))])
+
+    out = pd.DataFrame({
+        "dimension": name,
+        "subgroup": p.index,
+        "reference": p.index[ref],
+        "count": n.astype(np.int64),
+        "n_excellent": k.astype(np.int64),
+        "rate_excellent": rate,
+        "rate_ci_low": low,
+        "rate_ci_high": high,
+        "disparate_impact": di,
+        "di_ci_low": np.exp(log_di - z * se),
+        "di_ci_high": np.exp(log_di + z * se),
+        "p_equal_rates": p_equal,
+        "p_di_below_threshold": 1 - norm_sf((log_di - math.log(threshold)) / se),
+    })
+    return out
+
+
+def significance_table(partial: pd.DataFrame, dimensions, min_cell_size: int = 0,
+                       level: float = LEVEL, threshold: float = DI_THRESHOLD) -> pd.DataFrame:
+    return pd.concat([di_significance(partial, d, min_cell_size, level, threshold) for d in dimensions],
+                     ignore_index=True)
+
+
+# ---------- permutation engine ----------
+def permutation_test(values, in_a, n_perm: int = MAX_PERMUTATIONS, rng: np.random.Generator = None,
+                     alpha: float = ALPHA, max_cells: int = MAX_CHUNK_CELLS) -> dict:
+    """
+    Two-sided permutation test of mean(values[in_a]) - mean(values[~in_a]).
+    With the pooled variance of all rows fixed, the pooled t (and Cohen's d)
+    is monotone in this difference, so the p-value is the one for d too.
+
+    Only the group-a sum changes between permutations. When values take few
+    distinct values (integer scores), a batch of permutations is one
+    multivariate hypergeometric draw of how many copies of each value land in
+    group a, so the cost does not grow with the row count; otherwise each
+    permutation samples group a's rows without replacement. Batches double
+    from FIRST_BATCH up to max_cells cells; after each one the run stops once
+    the Wilson interval (STOP_Z) of the Monte Carlo p-value lies entirely
+    above or below alpha. NaN values are dropped. Returns p_value
+    ((hits + 1) / (perms + 1)), the number of permutations run and the
+    decision.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    values = np.asarray(values, dtype=np.float64)
+    in_a = np.asarray(in_a, dtype=bool)
+    keep = ~np.isnan(values)
+    values, in_a = values[keep], in_a[keep]
+    n, n_a = len(values), int(in_a.sum())
+    if n_a == 0 or n_a == n:
+        return {"p_value": np.nan, "n_perm": 0, "decision": "undefined"}
+    total = values.sum()
+    uniq, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    grouped = len(uniq) * 8 <= n
+
+    if grouped:
+        observed_sum = np.bincount(inverse[in_a], minlength=len(uniq)) @ uniq
+        cap = max(1, max_cells // len(uniq))
+
+        def group_sums(b):
+            return rng.multivariate_hypergeometric(counts, n_a, size=b, method="marginals") @ uniq
+    else:
+        observed_sum = values[in_a].sum()
+        cap = max(1, max_cells // n)
+
+        def group_sums(b):
+            return np.array([values[rng.choice(n, n_a, replace=False)].sum() for _ in range(b)])
+
+    def diff(sum_a):
+        return sum_a / n_a - (total - sum_a) / (n - n_a)
+
+    observed = abs(diff(observed_sum))
+    tol = 1e-9 * max(1.0, observed)
+    hits = done = 0
+    batch = FIRST_BATCH
+    decision = "undecided"
+    while done < n_perm:
+        b = min(batch, cap, n_perm - done)
+        batch *= 2
+        hits += int((np.abs(diff(group_sums(b))) >= observed - tol).sum())
+        done += b
+        low, high = (float(v) for v in wilson_interval(hits, done, z=STOP_Z))
+        if high < alpha:
+            decision = "significant"
+            break
+        if low > alpha:
+            decision = "not significant"
+            break
+    if decision == "undecided":
+        decision = "significant" if (hits + 1) / (done + 1) < alpha else "not significant"
+        decision += " (limit reached)"
+    return {"p_value": (hits + 1) / (done + 1), "n_perm": done, "decision": decision}
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+
+from streaming_stats import KLLSketch
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Compact summaries that the report figures are drawn from, so rendering
+# never sees raw rows: histogram bin counts and edges, box statistics in the
+# matplotlib bxp format (quartiles, whiskers, capped fliers) and bar heights.
+# Summaries come from one vectorized pass over an in-memory frame, or from
+# two streaming passes over CSV chunks for files larger than memory.
+
+HIST_BINS = 20
+WHIS = 1.5
+MAX_FLIERS = 1000  # fliers kept per box; more are thinned evenly by rank
+
+
+# ---------- histograms ----------
+def histogram(values, bins: int = HIST_BINS, value_range=None) -> dict:
+    """Bin counts and edges, as plt.hist(values, bins) would compute them (NaNs dropped)."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    return {"counts": counts.tolist(), "edges": edges.tolist()}
+
+
+# ---------- box statistics ----------
+def thin(sorted_values: np.ndarray, cap: int = MAX_FLIERS) -> np.ndarray:
+    """At most `cap` values, evenly spaced by rank (keeps the min and max)."""
+    if len(sorted_values) <= cap:
+        return sorted_values
+    return sorted_values[np.linspace(0, len(sorted_values) - 1, cap).round().astype(np.int64)]
+
+
+def _box_from_sorted(x: np.ndarray, label: str, max_fliers: int = MAX_FLIERS, rows=None) -> dict:
+    """
+    matplotlib.cbook.boxplot_stats for one sorted, NaN-free array, fliers
+    capped. `rows` (original row numbers of x) puts the fliers back in row
+    order, which is the order matplotlib draws them in.
+    """
+    n = len(x)
+    if n == 0:
+        return {"label": label, "n": 0, "mean": np.nan, "med": np.nan, "q1": np.nan, "q3": np.nan,
+                "iqr": np.nan, "cilo": np.nan, "cihi": np.nan, "whislo": np.nan, "whishi": np.nan,
+                "fliers": []}
+    q1, med, q3 = np.percentile(x, [25, 50, 75])
+    return _box_dict(label, n, x.mean(), q1, med, q3, x, max_fliers, rows)
+
+
+def _box_dict(label, n, mean, q1, med, q3, x, max_fliers, rows=None):
+    iqr = q3 - q1
+    lo, hi = q1 - WHIS * iqr, q3 + WHIS * iqr
+    # x is sorted: whiskers are the most extreme values inside the fences
+    i_lo, i_hi = np.searchsorted(x, lo, side="left"), np.searchsorted(x, hi, side="right")
+    whislo = x[i_lo] if i_lo < len(x) and x[i_lo] <= q1 else q1
+    whishi = x[i_hi - 1] if i_hi > 0 and x[i_hi - 1] >= q3 else q3
+    outside = np.flatnonzero((x < whislo) | (x > whishi))
+    kept = thin(outside, max_fliers)
+    if rows is not None:
+        kept = kept[np.argsort(rows[kept], kind="stable")]
+    half = 1.57 * iqr / np.sqrt(n)
+    return {"label": label, "n": int(n), "mean": float(mean), "med": float(med),
+            "q1": float(q1), "q3": float(q3), "iqr": float(iqr),
+            "cilo": float(med - half), "cihi": float(med + half),
+            "whislo": float(whislo), "whishi": float(whishi),
+            "fliers": x[kept].tolist()}
+
+
+def grouped_box_stats(values, groups, labels, max_fliers: int = MAX_FLIERS) -> list:
+    """
+    Box statistics of `values` per group code (0..len(labels)-1) from one
+    lexsort; each group is then a contiguous sorted slice. NaNs are dropped.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    rows = np.flatnonzero(~np.isnan(values) & (groups >= 0))
+    order = rows[np.lexsort((values[rows], groups[rows]))]
+    values, groups = values[order], groups[order]
+    bounds = np.searchsorted(groups, np.arange(len(labels) + 1))
+    return [_box_from_sorted(values[bounds[i]:bounds[i + 1]], str(label), max_fliers,
+                             order[bounds[i]:bounds[i + 1]])
+            for i, label in enumerate(labels)]
+
+
+# ---------- in-memory ----------
+def summarize(df: pd.DataFrame, score_cols, group_col: str = "gender", box_col: str = "total_score",
+              categories=("Excellent", "Average", "Failing")) -> dict:
+    """Every figure's summary from one frame."""
+    groups = list(df[group_col].dropna().unique())  # order of first appearance, as the figure shows it
+    codes = pd.Categorical(df[group_col], categories=groups).codes
+    cat_counts = df["performance_category"].value_counts().reindex(list(categories), fill_value=0)
+    return {
+        "histograms": {col: histogram(df[col].to_numpy(dtype=np.float64)) for col in score_cols},
+        "box": grouped_box_stats(df[box_col].to_numpy(dtype=np.float64), codes, [str(g) for g in groups]),
+        "categories": {str(k): int(v) for k, v in cat_counts.items()},
+    }
+
+
+# ---------- streaming ----------
+def summarize_chunks(chunks_factory, score_cols, group_col: str = "gender", box_col: str = "total_score",
+                     categories=("Excellent", "Average", "Failing"), sketch_k: int = 200) -> dict:
+    """
+    Same summaries from two passes over chunks (chunks_factory() must return a
+    fresh chunk iterator). Pass 1: per-column min/max (histogram range),
+    per-group KLL sketches and means, category counts. Pass 2: exact bin counts
+    over the fixed edges, whiskers and fliers against the sketched quartiles.
+    Histograms and category counts are exact; quartiles carry the sketch's
+    rank error (about 1.7 / sketch_k).
+    """
+    lo = {c: np.inf for c in score_cols}
+    hi = {c: -np.inf for c in score_cols}
+    groups, sketches, sums, counts = [], {}, {}, {}
+    cat_counts = dict.fromkeys(categories, 0)
+    for chunk in chunks_factory():
+        for c in score_cols:
+            v = chunk[c].to_numpy(dtype=np.float64)
+            if np.isfinite(v).any():
+                lo[c], hi[c] = min(lo[c], np.nanmin(v)), max(hi[c], np.nanmax(v))
+        for g, vals in chunk.groupby(group_col, observed=True, sort=False)[box_col]:
+            if g not in sketches:
+                groups.append(g)
+                sketches[g], sums[g], counts[g] = KLLSketch(sketch_k), 0.0, 0
+            v = vals.to_numpy(dtype=np.float64)
+            v = v[~np.isnan(v)]
+            sketches[g].update(v)
+            sums[g] += v.sum()
+            counts[g] += len(v)
+        vc = chunk["performance_category"].value_counts()
+        for k in categories:
+            cat_counts[k] += int(vc.get(k, 0))
+
+    quart = {g: sketches[g].quantile([0.25, 0.5, 0.75]) for g in groups}
+    hist = {c: np.zeros(HIST_BINS, dtype=np.int64) for c in score_cols}
+    edges = {}
+    inside = {g: [np.inf, -np.inf] for g in groups}  # most extreme values within the fences
+    fliers = {g: np.empty(0) for g in groups}
+    for chunk in chunks_factory():
+        for c in score_cols:
+            rng = (lo[c], hi[c]) if np.isfinite(lo[c]) else None
+            h = histogram(chunk[c].to_numpy(dtype=np.float64), HIST_BINS, rng)
+            hist[c] += np.asarray(h["counts"])
+            edges[c] = h["edges"]
+        for g, vals in chunk.groupby(group_col, observed=True, sort=False)[box_col]:
+            q1, _, q3 = quart[g]
+            f_lo, f_hi = q1 - WHIS * (q3 - q1), q3 + WHIS * (q3 - q1)
+            v = vals.to_numpy(dtype=np.float64)
+            v = v[~np.isnan(v)]
+            within = v[(v >= f_lo) & (v <= f_hi)]
+            if len(within):
+                inside[g] = [min(inside[g][0], within.min()), max(inside[g][1], within.max())]
+            out = np.sort(np.concatenate([fliers[g], v[(v < f_lo) | (v > f_hi)]]))
+            fliers[g] = thin(out, 4 * MAX_FLIERS)
+
+    box = []
+    for g in groups:
+        q1, med, q3 = quart[g]
+        lo_in = inside[g][0] if inside[g][0] <= q1 else q1
+        hi_in = inside[g][1] if inside[g][1] >= q3 else q3
+        # fliers + the two whisker ends reproduce the in-memory rule in _box_dict
+        x = np.sort(np.concatenate([fliers[g], [lo_in, hi_in]]))
+        stats = _box_dict(str(g), counts[g], sums[g] / max(counts[g], 1), q1, med, q3, x, MAX_FLIERS)
+        box.append(stats)
+    return {
+        "histograms": {c: {"counts": hist[c].tolist(), "edges": edges.get(c, [])} for c in score_cols},
+        "box": box,
+        "categories": {str(k): int(v) for k, v in cat_counts.items()},
+    }
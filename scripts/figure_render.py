@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import stage_cache
+from data_loader import file_sha256
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+# Figure rendering for visuals.py. A figure is described by a FigureSpec
+# (kind, labels and a compact summary from figure_aggregates: bin counts, box
+# statistics, bar heights); specs are small plain data, so they pickle cheaply
+# to worker processes. matplotlib is imported only inside render_figure, with the
+# Agg backend and the object-oriented Figure API (no pyplot, no global state).
+# A PNG is re-rendered only when the hash of its spec or of this file changes.
+
+ROOT = Path(__file__).resolve().parent.parent
+FIGURE_MANIFEST = ROOT / "outputs" / "logs" / "figure_manifest.json"
+DPI = 150
+
+
+@dataclass
+class FigureSpec:
+    path: Path
+    kind: str  # "hist", "box" or "bar"
+    title: str
+    xlabel: str
+    ylabel: str
+    data: dict = field(default_factory=dict)     # JSON-serializable summary to draw
+    options: dict = field(default_factory=dict)  # JSON-serializable draw options
+
+
+# ---------- keys ----------
+def spec_key(spec: FigureSpec) -> str:
+    """Content hash of everything drawn into the figure, plus the renderer source."""
+    payload = {"kind": spec.kind, "title": spec.title, "xlabel": spec.xlabel, "ylabel": spec.ylabel,
+               "data": spec.data, "options": spec.options, "dpi": DPI,
+               "renderer": file_sha256(__file__)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ---------- drawing ----------
+def _draw_hist(ax, spec):
+    edges = np.asarray(spec.data["edges"])
+    ax.bar(edges[:-1], spec.data["counts"], width=np.diff(edges), align="edge")
+
+
+def _draw_box(ax, spec):
+    stats = [{**s, "fliers": np.asarray(s["fliers"])} for s in spec.data["stats"]]
+    ax.bxp(stats, showfliers=True)
+
+
+def _draw_bar(ax, spec):
+    ax.bar(spec.options["labels"], spec.data["heights"])
+
+
+DRAWERS = {"hist": _draw_hist, "box": _draw_box, "bar": _draw_bar}
+
+
+def render_figure(spec: FigureSpec) -> Path:
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    DRAWERS[spec.kind](ax, spec)
+    ax.set_title(spec.title)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+    fig.tight_layout()
+    spec.path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(spec.path, dpi=DPI, bbox_inches="tight")
+    return spec.path
+
+
+def _entry(path: Path) -> str:
+    path = Path(path).resolve()
+    return path.relative_to(ROOT).as_posix() if path.is_relative_to(ROOT) else str(path)
+
+
+def render_all(specs: list, workers: int = 1, force: bool = False,
+               manifest_path: Path = FIGURE_MANIFEST):
+    """
+    Render the specs whose PNG is missing, modified or built from different
+    data; independent figures go to a process pool when workers > 1.
+    Returns (rendered paths, reused paths).
+    """
+    manifest = stage_cache.load_manifest(manifest_path)
+    keys = {spec.path: spec_key(spec) for spec in specs}
+    todo = [s for s in specs
+            if force or not stage_cache.is_fresh(manifest, _entry(s.path), keys[s.path], [s.path])]
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            rendered = list(pool.map(render_figure, todo))
+    else:
+        rendered = [render_figure(s) for s in todo]
+    for spec in todo:
+        stage_cache.record(manifest, _entry(spec.path), keys[spec.path], [spec.path])
+    stage_cache.save_manifest(manifest, manifest_path)
+    done = {s.path for s in todo}
+    reused = [s.path for s in specs if s.path not in done]
+    return rendered, reused
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from itertools import combinations
+
+from data_loader import CATEGORICAL_COLS
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Fast group-by for subgroup audits. Every audit column is integer-coded once
+# (categorical codes / factorize), the codes are combined into one joint cell
+# code, and all per-cell statistics come from a single bincount pass over the
+# rows. Any dimension or k-way intersection of the columns is then a sum over
+# the (small) cell table instead of another pass over the rows.
+
+CATEGORIES = ["Excellent", "Average", "Failing"]
+STAT_COLUMNS = ["count", "n_total", "sum_total", "sumsq_total", "n_excellent", "n_average", "n_failing"]
+INTERSECTION_SEP = " x "
+LABEL_SEP = " | "
+
+
+# ---------- dimensions ----------
+def as_dimension(dim) -> tuple:
+    """'gender' -> ('gender',); ('gender', 'lunch') stays a tuple."""
+    return (dim,) if isinstance(dim, str) else tuple(dim)
+
+
+def dimension_name(dim) -> str:
+    return INTERSECTION_SEP.join(as_dimension(dim))
+
+
+def dimension_sets(columns, max_order: int = 1) -> list:
+    """Every single column plus all intersections of up to max_order columns."""
+    out = []
+    for k in range(1, max(1, max_order) + 1):
+        out += [c[0] if k == 1 else c for c in combinations(columns, k)]
+    return out
+
+
+def parse_dimensions(names, max_order: int = 1) -> list:
+    """
+    CLI helper: column names ("all" = every categorical column) expanded to
+    the columns plus their intersections up to max_order.
+    """
+    columns = []
+    for name in names:
+        columns += CATEGORICAL_COLS if name == "all" else [name]
+    unknown = [c for c in columns if c not in CATEGORICAL_COLS]
+    if unknown:
+        raise ValueError(f"Unknown dimension(s) {unknown}; choose from {CATEGORICAL_COLS}")
+    return dimension_sets(list(dict.fromkeys(columns)), max_order)
+
+
+# ---------- encoding ----------
+def encode_column(series: pd.Series):
+    """Sorted integer codes with missing values as their own (last) code."""
+    codes, labels = pd.factorize(series, sort=True, use_na_sentinel=False)
+    return codes.astype(np.int64), np.asarray(labels, dtype=object)
+
+
+def joint_codes(df: pd.DataFrame, columns):
+    """
+    Dense joint cell code per row for `columns`, plus the cell table's
+    per-column labels. Cells are numbered in sorted (lexicographic) order.
+    """
+    encoded = [encode_column(df[c]) for c in columns]
+    if not encoded:
+        return np.zeros(len(df), dtype=np.int64), 1, {}
+    radices = [max(len(labels), 1) for _, labels in encoded]
+    joint = np.ravel_multi_index([codes for codes, _ in encoded], radices)
+    cells, inverse = np.unique(joint, return_inverse=True)
+    cell_codes = np.unravel_index(cells, radices)
+    cell_labels = {c: labels[idx] for c, (_, labels), idx in zip(columns, encoded, cell_codes)}
+    return inverse.ravel(), len(cells), cell_labels
+
+
+# ---------- statistics ----------
+def cell_stats(df: pd.DataFrame, columns, value_col: str = "total_score",
+               category_col: str = "performance_category") -> pd.DataFrame:
+    """
+    One bincount pass: per joint cell of `columns`, the row count, non-missing
+    value count, value sum and sum of squares, and per-category counts of
+    rows with a value.
+    """
+    columns = list(columns)
+    cell, n_cells, labels = joint_codes(df, columns)
+    value = df[value_col].to_numpy(dtype=np.float64)
+    present = ~np.isnan(value)
+    filled = np.where(present, value, 0.0)
+    cat_codes, cat_labels = encode_column(df[category_col])
+
+    stats = {
+        "count": np.bincount(cell, minlength=n_cells).astype(np.float64),
+        "n_total": np.bincount(cell, weights=present, minlength=n_cells),
+        "sum_total": np.bincount(cell, weights=filled, minlength=n_cells),
+        "sumsq_total": np.bincount(cell, weights=filled * filled, minlength=n_cells),
+    }
+    n_cat = max(len(cat_labels), 1)
+    by_cat = np.bincount(cell * n_cat + cat_codes, weights=present,
+                         minlength=n_cells * n_cat).reshape(n_cells, n_cat)
+    for c in CATEGORIES:
+        hit = np.flatnonzero(cat_labels == c)
+        stats[f"n_{c.lower()}"] = by_cat[:, hit[0]] if len(hit) else np.zeros(n_cells)
+    return pd.DataFrame({**labels, **stats})
+
+
+def rollup(cells: pd.DataFrame, dim, dropna: bool = False) -> pd.DataFrame:
+    """
+    Sum the cell table up to one dimension / intersection; index = subgroup
+    label. With dropna, subgroups with a missing label in any column are left out.
+    """
+    cols = list(as_dimension(dim))
+    out = cells.groupby(cols, sort=True, dropna=dropna)[STAT_COLUMNS].sum()
+    if len(cols) > 1:
+        out.index = pd.Index([LABEL_SEP.join(map(str, key)) for key in out.index])
+    out.index.name = "subgroup"
+    return out
+
+
+def subgroup_stats(df: pd.DataFrame, dimensions, dropna: bool = False, **kwargs) -> pd.DataFrame:
+    """
+    Stats for every dimension in `dimensions` (columns or tuples of columns),
+    indexed by (dimension, subgroup), from one pass over the rows.
+    """
+    columns = list(dict.fromkeys(c for d in dimensions for c in as_dimension(d)))
+    return stats_from_cells(cell_stats(df, columns, **kwargs), dimensions, dropna)
+
+
+def stats_from_cells(cells: pd.DataFrame, dimensions, dropna: bool = False) -> pd.DataFrame:
+    """subgroup_stats from an existing cell table (label columns + STAT_COLUMNS, one row per cell)."""
+    dims = [as_dimension(d) for d in dimensions]
+    frames = []
+    for d in dims:
+        r = rollup(cells, d, dropna)
+        r.index = pd.MultiIndex.from_arrays([[dimension_name(d)] * len(r), r.index],
+                                            names=["dimension", "subgroup"])
+        frames.append(r)
+    return pd.concat(frames)
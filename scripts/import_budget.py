@@ -0,0 +1,92 @@
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from instrument import log_run
+
+# Startup budget for the scripts: each module is imported in a fresh
+# interpreter under `python -X importtime`, and the check fails if
+#   - its cumulative import time (best of --repeat) exceeds the budget,
+#   - importing it loads a heavy library (numpy, pandas, matplotlib, ...),
+#     which lazy_imports defers to first use, or
+#   - importing it creates directories in the repository (outputs are only
+#     created when a run writes them).
+# Exits non-zero on any failure, so it can gate a commit or CI job.
+
+SEED = 42  # nothing here is random; recorded for the run log
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parent
+BUDGET_MS = 200.0  # an eager pandas import alone costs about 300 ms
+HEAVY = ("numpy", "pandas", "matplotlib", "yaml", "duckdb", "polars")
+LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| (\S.*)$")  # top-level (unindented) entries only
+
+
+def script_modules() -> list:
+    return sorted(p.stem for p in SCRIPT_DIR.glob("*.py"))
+
+
+def _directories() -> set:
+    return {p for p in ROOT.rglob("*") if p.is_dir() and "__pycache__" not in p.parts and ".git" not in p.parts}
+
+
+def import_once(module: str) -> tuple:
+    """(cumulative import time in ms, heavy libraries it loaded) from one fresh interpreter."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=SCRIPT_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    micros = [int(m.group(1)) for m in map(LINE.match, proc.stderr.splitlines()) if m and m.group(2) == module]
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return micros[-1] / 1000, heavy
+
+
+def check(modules, budget_ms: float = BUDGET_MS, repeat: int = 5) -> list:
+    """One result dict per module: best import time, heavy libraries loaded, directories created, ok."""
+    results = []
+    for module in modules:
+        before = _directories()
+        times, heavy = [], []
+        for _ in range(max(1, repeat)):
+            ms, heavy = import_once(module)
+            times.append(ms)
+        created = sorted(str(p.relative_to(ROOT)) for p in _directories() - before)
+        best = min(times)
+        results.append({"module": module, "ms": best, "heavy": heavy, "created": created,
+                         "ok": best <= budget_ms and not heavy and not created})
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if importing a script is slow, loads a heavy library "
+                                                 "or creates directories.")
+    parser.add_argument("modules", nargs="*", help="modules to check (default: every script in scripts/)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS,
+                        help="maximum cumulative import time per module (-X importtime, best of --repeat)")
+    parser.add_argument("--repeat", type=int, default=5, help="imports per module; the fastest counts")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = check(args.modules or script_modules(), args.budget_ms, args.repeat)
+    for r in results:
+        problems = []
+        if r["ms"] > args.budget_ms:
+            problems.append(f"over the {args.budget_ms:.0f} ms budget")
+        if r["heavy"]:
+            problems.append(f"imports {', '.join(r['heavy'])}")
+        if r["created"]:
+            problems.append(f"creates {', '.join(r['created'])}")
+        mark = "✅" if r["ok"] else "❌"
+        print(f"{mark} {r['module']:<24} {r['ms']:7.1f} ms" + (f"  ({'; '.join(problems)})" if problems else ""))
+    failed = [r["module"] for r in results if not r["ok"]]
+    log_run("import_budget.py", f"modules={len(results)} failed={len(failed)} budget_ms={args.budget_ms}", seed=SEED)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
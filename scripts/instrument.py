@@ -0,0 +1,172 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+# Shared run logging and per-phase instrumentation. log_run appends the
+# one-line run record to outputs/logs/run.log; phase()/instrumented() record
+# wall time, CPU time of the calling thread, peak RSS, optional tracemalloc
+# peak and row counts per named phase as JSON lines in outputs/logs/phases.jsonl.
+# Optional profiling: with ANALYSIS_PROFILE=cprofile (or pyinstrument, if
+# installed) every outermost phase is profiled and the profile is kept under
+# outputs/logs/profiles/ when the phase took at least ANALYSIS_PROFILE_THRESHOLD
+# seconds. ANALYSIS_TRACEMALLOC=1 turns on tracemalloc peaks (slower).
+
+ROOT = Path(__file__).resolve().parent.parent
+LOG_DIR = ROOT / "outputs" / "logs"
+RUN_LOG = LOG_DIR / "run.log"
+PHASE_LOG = LOG_DIR / "phases.jsonl"
+PROFILE_DIR = LOG_DIR / "profiles"
+
+CONFIG = {
+    "tracemalloc": os.environ.get("ANALYSIS_TRACEMALLOC", "") not in ("", "0"),
+    "profile": os.environ.get("ANALYSIS_PROFILE") or None,  # None, "cprofile" or "pyinstrument"
+    "profile_threshold": float(os.environ.get("ANALYSIS_PROFILE_THRESHOLD", "5")),
+}
+RUN_ID = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def configure(tracemalloc: bool = None, profile: str = None, profile_threshold: float = None):
+    """Override the environment defaults (e.g. from a --profile CLI flag)."""
+    for key, value in (("tracemalloc", tracemalloc), ("profile", profile),
+                       ("profile_threshold", profile_threshold)):
+        if value is not None:
+            CONFIG[key] = value
+
+
+# ---------- run log ----------
+def log_run(script_name: str, note: str = "", seed: int = 42):
+    with _lock:
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        with open(RUN_LOG, "a", encoding="utf-8") as f:
+            f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {script_name} | seed={seed} {note}\n")
+
+
+def log_message(script_name: str, msg: str):
+    with _lock:
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        with open(RUN_LOG, "a", encoding="utf-8") as f:
+            f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {script_name} | {msg}\n")
+
+
+# ---------- phases ----------
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB elsewhere
+
+
+def _start_profiler():
+    kind = CONFIG["profile"]
+    try:
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        if kind:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+    except (ImportError, ValueError, RuntimeError):
+        pass  # profiler missing, or another profiler is active (concurrent phases)
+    return None
+
+
+def _stop_profiler(profiler, name: str, keep: bool):
+    if profiler is None:
+        return None
+    if CONFIG["profile"] == "pyinstrument":
+        profiler.stop()
+        out = PROFILE_DIR / f"{name}-{RUN_ID}.html"
+        if keep:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            out.write_text(profiler.output_html(), encoding="utf-8")
+    else:
+        profiler.disable()
+        out = PROFILE_DIR / f"{name}-{RUN_ID}.prof"
+        if keep:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(out)
+    return str(out.relative_to(ROOT)) if keep else None
+
+
+@contextmanager
+def phase(name: str, rows: int = None, **fields):
+    """
+    Time and measure the enclosed block as one phase. Yields the record dict,
+    so the block can fill in values known only at the end (e.g. rec["rows"]).
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    use_tm = CONFIG["tracemalloc"]
+    if use_tm:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if stack:  # fold the parent's peak so far into it before resetting
+            stack[-1]["_tm"] = max(stack[-1]["_tm"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    rec = {"phase": name, "rows": rows, **fields, "_tm": 0}
+    profiler = _start_profiler() if not stack else None
+    stack.append(rec)
+    rss0 = _peak_rss_mb()
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    try:
+        yield rec
+    finally:
+        wall, cpu = time.perf_counter() - wall0, time.thread_time() - cpu0
+        stack.pop()
+        rss = _peak_rss_mb()
+        tm_peak = None
+        if use_tm:
+            tm_peak = max(rec.pop("_tm"), tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1]["_tm"] = max(stack[-1]["_tm"], tm_peak)
+        else:
+            rec.pop("_tm")
+        entry = {"ts": datetime.now().isoformat(timespec="seconds"), "run_id": RUN_ID,
+                 "thread": threading.current_thread().name, **rec,
+                 "wall_s": round(wall, 6), "cpu_s": round(cpu, 6),
+                 "rss_peak_mb": round(rss, 1), "rss_peak_growth_mb": round(rss - rss0, 1)}
+        if tm_peak is not None:
+            entry["tracemalloc_peak_mb"] = round(tm_peak / 2**20, 2)
+        prof = _stop_profiler(profiler, name, wall >= CONFIG["profile_threshold"])
+        if prof:
+            entry["profile"] = prof
+        with _lock:
+            LOG_DIR.mkdir(parents=True, exist_ok=True)
+            with open(PHASE_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+
+def instrumented(name: str = None):
+    """Decorator form of phase(); rows = len of the first argument when it has a shape."""
+    def wrap(func):
+        # file stem rather than __module__, which is "__main__" for the script being run
+        label = name or f"{Path(func.__code__.co_filename).stem}.{func.__name__}"
+
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            shape = getattr(args[0], "shape", None) if args else None
+            rows = shape[0] if shape else None
+            with phase(label, rows=rows):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
@@ -0,0 +1,29 @@
+import importlib
+import sys
+import types
+
+# Deferred imports for the heavy libraries (numpy, pandas). A module binds
+#
+#   np = lazy_import("numpy")
+#
+# at the top as usual, but numpy is imported only when an attribute of `np`
+# is first used, i.e. when a function actually runs. Importing a script (for
+# --help, for its constants, or as a library) therefore costs only the
+# standard library. Annotations are kept unevaluated with
+# `from __future__ import annotations`, so `-> pd.DataFrame` does not count
+# as a use. The real import goes through importlib, so it holds the normal
+# import lock and is safe from threads.
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module until it is first used; then imports it and adopts its namespace."""
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)  # later lookups skip __getattr__
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """The module itself if it is already imported, else a stand-in that imports it on first use."""
+    return sys.modules.get(name) or _LazyModule(name)
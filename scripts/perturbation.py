@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bootstrap_engine import chunk_sizes
+from data_loader import load_dataset, CATEGORICAL_COLS, SCORE_COLS
+from decision import band_codes
+from groupby_kernel import as_dimension, encode_column
+from sensitivity_analysis import DIMENSIONS, DEFAULT_FAILING, DEFAULT_EXCELLENT, dimension_key
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Monte Carlo perturbation scenarios for the sensitivity analysis. A spec
+# (YAML, or JSON without PyYAML) lists scenarios; each applies steps in order
+# to every replicate:
+#   noise:       {sd, columns, clip: [0, 100], round: true}  measurement noise per score
+#   drop:        {fraction, where}      each matching row is dropped with probability fraction
+#   reweight:    {weight, where, fraction: 1}  matching rows (a random fraction of them) get weight
+#   resample:    {where}                Poisson(1) bootstrap weights for the matching rows
+#   label_shift: {column, from, to, fraction, effect}  move a fraction of `from` rows to `to`,
+#                adding `effect` points per score ("auto": mean difference of to vs from in the data)
+# `where` is {column: value or [values]}; without it a step covers every row.
+# Replicates are generated in batches as (replicates x rows) arrays: drops and
+# weights are row weights, and every summary metric comes from weighted
+# bincounts, so no replicate frame is ever built. Scenarios fan out over a
+# process pool; scenario i draws from child i of SeedSequence(seed), so
+# results do not depend on the worker count.
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parent
+DEFAULT_SPEC = SCRIPT_DIR / "perturbations.yaml"
+OUT_DIR = ROOT / "outputs"
+REPLICATES_CSV = OUT_DIR / "sensitivity_montecarlo.csv"
+DISTRIBUTION_CSV = OUT_DIR / "sensitivity_montecarlo_summary.csv"
+
+REPLICATES = 200
+MAX_CHUNK_CELLS = 2**22  # replicates x rows per batch (several float64 arrays of this size are live)
+STEPS = {"noise", "drop", "reweight", "resample", "label_shift"}
+QUANTILES = [0.025, 0.5, 0.975]
+
+
+# ---------- spec ----------
+def load_spec(path: Path) -> dict:
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        spec = json.loads(text)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(f"PyYAML is needed to read {path}; install pyyaml or use a .json spec") from None
+        spec = yaml.safe_load(text)
+    return parse_spec(spec)
+
+
+def parse_spec(spec: dict) -> dict:
+    """Validate a spec and fill in defaults; raises ValueError on unknown steps or columns."""
+    scenarios = []
+    for i, sc in enumerate(spec.get("scenarios") or []):
+        name = sc.get("name") or f"scenario_{i + 1}"
+        steps = []
+        for step in sc.get("perturb") or []:
+            if not isinstance(step, dict) or len(step) != 1:
+                raise ValueError(f"{name}: each perturb step is a one-key mapping, got {step!r}")
+            (kind, params), = step.items()
+            if kind not in STEPS:
+                raise ValueError(f"{name}: unknown step {kind!r}; choose from {sorted(STEPS)}")
+            params = dict(params or {})
+            unknown = [c for c in (params.get("where") or {}) if c not in CATEGORICAL_COLS]
+            unknown += [c for c in params.get("columns", []) if c not in SCORE_COLS]
+            if kind == "label_shift" and params.get("column") not in CATEGORICAL_COLS:
+                unknown.append(params.get("column"))
+            if unknown:
+                raise ValueError(f"{name}: unknown column(s) {unknown}")
+            steps.append((kind, params))
+        scenarios.append({
+            "name": name,
+            "description": sc.get("description", ""),
+            "failing_cutoff": sc.get("failing_cutoff", DEFAULT_FAILING),
+            "excellent_cutoff": sc.get("excellent_cutoff", DEFAULT_EXCELLENT),
+            "steps": steps,
+        })
+    if not scenarios:
+        raise ValueError("The spec has no scenarios")
+    return {"replicates": int(spec.get("replicates", REPLICATES)), "seed": int(spec.get("seed", 42)),
+            "scenarios": scenarios}
+
+
+# ---------- base arrays ----------
+class PerturbationBase:
+    """Score arrays and integer-coded categorical columns of the base frame, shared by every replicate."""
+
+    def __init__(self, df: pd.DataFrame, dimensions=DIMENSIONS):
+        self.n = len(df)
+        self.scores = {c: df[c].to_numpy(dtype=np.float64) for c in SCORE_COLS}
+        self.codes, self.labels = {}, {}
+        for c in CATEGORICAL_COLS:
+            self.codes[c], self.labels[c] = encode_column(df[c])
+        self.dims = []
+        for dim in dimensions:
+            cols = as_dimension(dim)
+            radices = [max(len(self.labels[c]), 1) for c in cols]
+            strides = np.cumprod([1] + radices[::-1])[:-1][::-1]
+            grid = np.indices(radices).reshape(len(cols), -1)  # cell -> per-column code, lexicographic
+            valid = np.all([~pd.isna(self.labels[c][g]) for c, g in zip(cols, grid)], axis=0)
+            self.dims.append({"key": dimension_key(dim), "cols": cols, "strides": strides,
+                              "n_cells": int(np.prod(radices)), "valid": valid})
+
+    def match(self, where: dict) -> np.ndarray:
+        """Rows whose labels match every {column: value or [values]} entry."""
+        mask = np.ones(self.n, dtype=bool)
+        for col, values in (where or {}).items():
+            values = {str(v) for v in (values if isinstance(values, list) else [values])}
+            wanted = [i for i, label in enumerate(self.labels[col]) if str(label) in values]
+            mask &= np.isin(self.codes[col], wanted)
+        return mask
+
+    def code_of(self, col: str, label) -> int:
+        hits = [i for i, v in enumerate(self.labels[col]) if str(v) == str(label)]
+        if not hits:
+            raise ValueError(f"{label!r} is not a value of {col!r}")
+        return hits[0]
+
+
+# ---------- replicates ----------
+def _apply_steps(base: PerturbationBase, steps: list, b: int, rng: np.random.Generator):
+    """Perturbed scores, row weights and codes for a batch of b replicates ((b, n) or shared (n,) arrays)."""
+    scores = dict(base.scores)
+    codes = dict(base.codes)
+    weights = None
+    for kind, p in steps:
+        rows = base.match(p.get("where")) if p.get("where") else True
+        if kind == "noise":
+            lo, hi = p.get("clip", [0, 100])
+            for c in p.get("columns", SCORE_COLS):
+                noisy = scores[c] + rng.normal(0.0, float(p["sd"]), size=(b, base.n))
+                if p.get("round", True):
+                    noisy = np.rint(noisy)
+                np.clip(noisy, lo, hi, out=noisy)
+                scores[c] = noisy if rows is True else np.where(rows, noisy, scores[c])
+            continue
+        if kind == "label_shift":
+            col = p["column"]
+            src, dst = base.code_of(col, p["from"]), base.code_of(col, p["to"])
+            switch = (base.codes[col] == src) & rows & (rng.random((b, base.n)) < float(p.get("fraction", 1.0)))
+            codes[col] = np.where(switch, dst, codes[col])
+            effect = p.get("effect") or {}
+            if effect == "auto":
+                effect = {c: np.nanmean(base.scores[c][base.codes[col] == dst])
+                             - np.nanmean(base.scores[c][base.codes[col] == src]) for c in SCORE_COLS}
+            for c, delta in effect.items():
+                scores[c] = np.where(switch, np.clip(scores[c] + float(delta), 0, 100), scores[c])
+            continue
+        if kind == "drop":
+            w = np.where(rows & (rng.random((b, base.n)) < float(p["fraction"])), 0.0, 1.0)
+        elif kind == "reweight":
+            chosen = rows & (rng.random((b, base.n)) < float(p.get("fraction", 1.0)))
+            w = np.where(chosen, float(p["weight"]), 1.0)
+        else:  # resample
+            w = np.where(rows, rng.poisson(1.0, size=(b, base.n)), 1.0)
+        weights = w if weights is None else weights * w
+    return scores, codes, weights
+
+
+def replicate_metrics(base: PerturbationBase, scores: dict, codes: dict, weights, b: int,
+                      failing_cutoff: float, excellent_cutoff: float, min_cell_size: int = 0) -> dict:
+    """
+    The sensitivity_summary.csv metrics of b replicates at once (weighted rows),
+    with the same rules as scenario_metrics: NaN scores are skipped in means,
+    categories count rows with a total, the size filter counts all rows.
+    """
+    w = np.ones((b, base.n)) if weights is None else np.broadcast_to(weights, (b, base.n))
+    out = {"n": w.sum(axis=1)}
+
+    def weighted_mean(values):
+        present = ~np.isnan(values)
+        if present.all():
+            return (values * w).sum(axis=1) / out["n"], w
+        w_present = np.where(present, w, 0.0)
+        return np.where(present, values * w, 0.0).sum(axis=1) / w_present.sum(axis=1), w_present
+
+    total = 0.0
+    for c, key in zip(SCORE_COLS, ("mean_math", "mean_reading", "mean_writing")):
+        s = np.broadcast_to(scores[c], (b, base.n))
+        out[key] = weighted_mean(s)[0]
+        total = total + s
+    total = np.broadcast_to(total, (b, base.n))
+    out["mean_total"], w_rated = weighted_mean(total)
+
+    band = band_codes(total, failing_cutoff, excellent_cutoff)  # 0 Failing, 1 Average, 2 Excellent
+    rep = np.arange(b)[:, None]
+    overall = np.bincount((rep * 3 + band).ravel(), weights=w.ravel(), minlength=3 * b).reshape(b, 3)
+    overall = overall / overall.sum(axis=1, keepdims=True)
+    out.update({"rate_overall_excellent": overall[:, 2], "rate_overall_average": overall[:, 1],
+                "rate_overall_failing": overall[:, 0]})
+
+    for dim in base.dims:
+        k = dim["n_cells"]
+        cell = sum(np.broadcast_to(codes[c], (b, base.n)) * s for c, s in zip(dim["cols"], dim["strides"]))
+        flat = (rep * k + cell).ravel()
+        size = np.bincount(flat, weights=w.ravel(), minlength=b * k).reshape(b, k)
+        by_cat = np.bincount(flat * 3 + band.ravel(), weights=w_rated.ravel(),
+                             minlength=3 * b * k).reshape(b, k, 3)
+        n_rated = by_cat.sum(axis=2)
+        keep = dim["valid"] & (n_rated > 0) & (size >= min_cell_size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(keep, by_cat[:, :, 2] / n_rated, np.nan)
+            best = np.nanmax(np.where(keep, rate, -np.inf), axis=1, keepdims=True)
+            di = np.where(best > 0, rate / best, np.where(keep, 1.0, np.nan))
+            out[f"min_DI_{dim['key']}"] = np.where(keep.any(axis=1), np.nanmin(np.where(keep, di, np.inf), axis=1),
+                                                    np.nan)
+    return out
+
+
+def run_scenario(base: PerturbationBase, scenario: dict, replicates: int, seed_seq: np.random.SeedSequence,
+                 min_cell_size: int = 0) -> pd.DataFrame:
+    """All replicates of one scenario, one row each, generated in batches."""
+    rng = np.random.default_rng(seed_seq)
+    frames, start = [], 0
+    for b in chunk_sizes(replicates, base.n, MAX_CHUNK_CELLS):
+        scores, codes, weights = _apply_steps(base, scenario["steps"], b, rng)
+        m = replicate_metrics(base, scores, codes, weights, b, scenario["failing_cutoff"],
+                              scenario["excellent_cutoff"], min_cell_size)
+        frame = pd.DataFrame(m)
+        frame.insert(0, "replicate", np.arange(start, start + b))
+        frames.append(frame)
+        start += b
+    out = pd.concat(frames, ignore_index=True)
+    out.insert(0, "scenario", scenario["name"])
+    out.insert(2, "failing_cutoff", scenario["failing_cutoff"])
+    out.insert(3, "excellent_cutoff", scenario["excellent_cutoff"])
+    return out
+
+
+# ---------- process pool ----------
+_BASE = None
+
+
+def _init_worker(path, dimensions):
+    global _BASE
+    _BASE = PerturbationBase(load_dataset(path), dimensions)
+
+
+def _pool_task(args):
+    scenario, replicates, seed_seq, min_cell_size = args
+    return run_scenario(_BASE, scenario, replicates, seed_seq, min_cell_size)
+
+
+def run_spec(spec: dict, df: pd.DataFrame = None, data_path: Path = None, workers: int = 1,
+             dimensions=DIMENSIONS, min_cell_size: int = 0, replicates: int = None) -> pd.DataFrame:
+    """
+    Every scenario's replicate metrics. With workers > 1 the scenarios run in
+    a process pool whose workers each load the dataset from data_path once.
+    """
+    replicates = replicates or spec["replicates"]
+    seeds = np.random.SeedSequence(spec["seed"]).spawn(len(spec["scenarios"]))
+    tasks = [(sc, replicates, ss, min_cell_size) for sc, ss in zip(spec["scenarios"], seeds)]
+    if workers > 1 and data_path is not None:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data_path, dimensions)) as pool:
+            frames = list(pool.map(_pool_task, tasks))
+    else:
+        base = PerturbationBase(df if df is not None else load_dataset(data_path), dimensions)
+        frames = [run_scenario(base, *task) for task in tasks]
+    return pd.concat(frames, ignore_index=True)
+
+
+def distribution_summary(replicates: pd.DataFrame) -> pd.DataFrame:
+    """Mean, SD and 2.5/50/97.5% quantiles of every metric per scenario."""
+    metrics = [c for c in replicates.columns
+               if c not in ("scenario", "replicate", "failing_cutoff", "excellent_cutoff")]
+    long = replicates.melt(id_vars=["scenario"], value_vars=metrics, var_name="metric")
+    g = long.groupby(["scenario", "metric"], sort=False)["value"]
+    out = g.agg(["mean", "std"])
+    q = g.quantile(QUANTILES).unstack()
+    q.columns = [f"q{round(x * 1000):03d}" for x in QUANTILES]
+    return out.join(q).reset_index()
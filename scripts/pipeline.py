@@ -0,0 +1,199 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Callable
+
+import bias_fairness
+import descriptive_stats
+import sanity_checks
+import sensitivity_analysis
+import uncertainty_bootstrap
+import visuals
+import instrument
+import stage_cache
+from data_loader import load_dataset, file_sha256, DATA_FILE
+from decision import FAILING_CUTOFF, EXCELLENT_CUTOFF
+from instrument import log_message, phase
+
+SEED = 42  # stages seed themselves; recorded here for the run log
+
+
+# ---------- stages ----------
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[dict], object]  # receives the results of earlier stages by name
+    deps: tuple = ()
+    # memoization: stages with a module are skipped when their key and outputs are unchanged
+    module: ModuleType = None
+    outputs: tuple = ()
+    params: dict = field(default_factory=dict)
+
+
+def build_stages(data_file: Path = DATA_FILE, bootstrap_workers: int = 1, figure_workers: int = 1,
+                 force: bool = False) -> list:
+    cutoffs = {"failing_cutoff": FAILING_CUTOFF, "excellent_cutoff": EXCELLENT_CUTOFF}
+    return [
+        Stage("load", lambda r: load_dataset(data_file)),
+        Stage("descriptive_stats", lambda r: descriptive_stats.run(r["load"]), ("load",),
+              module=descriptive_stats,
+              outputs=(descriptive_stats.OUT_FILE, descriptive_stats.JSON_OUT, descriptive_stats.GROUP_MEANS_CSV),
+              params={"seed": descriptive_stats.SEED, **cutoffs}),
+        Stage("sanity_checks", lambda r: sanity_checks.run(r["load"]), ("load",),
+              module=sanity_checks,
+              outputs=(sanity_checks.SUMMARY_TXT, sanity_checks.OUTLIERS_CSV, sanity_checks.CAT_COUNTS_CSV),
+              params={"seed": sanity_checks.SEED}),
+        Stage("bias_fairness", lambda r: bias_fairness.run(r["load"]), ("load",),
+              module=bias_fairness,
+              outputs=(bias_fairness.FAIRNESS_CSV, bias_fairness.SUMMARY_TXT, bias_fairness.CIS_CSV,
+                       bias_fairness.SIGNIFICANCE_CSV),
+              params={"seed": bias_fairness.SEED, "n_boot": bias_fairness.N_BOOT, **cutoffs}),
+        Stage("uncertainty_bootstrap",
+              lambda r: uncertainty_bootstrap.run(r["load"], workers=bootstrap_workers), ("load",),
+              module=uncertainty_bootstrap, outputs=(uncertainty_bootstrap.OUT_FILE,),
+              params={"seed": uncertainty_bootstrap.SEED, "n_boot": uncertainty_bootstrap.N_BOOT,
+                      "workers": bootstrap_workers}),
+        Stage("sensitivity_analysis", lambda r: sensitivity_analysis.run(r["load"]), ("load",),
+              module=sensitivity_analysis,
+              outputs=(sensitivity_analysis.TXT_OUT, sensitivity_analysis.CSV_OUT),
+              params={"seed": sensitivity_analysis.SEED,
+                      "failing_cutoff": sensitivity_analysis.DEFAULT_FAILING,
+                      "excellent_cutoff": sensitivity_analysis.DEFAULT_EXCELLENT}),
+        Stage("visuals", lambda r: visuals.run(r["load"], workers=figure_workers, force=force), ("load",),
+              module=visuals, outputs=tuple(visuals.OUTPUT_FILES),
+              params={"seed": visuals.SEED, **cutoffs}),
+    ]
+
+
+def plan(stages: list, data_hash: str, manifest: dict, force: bool = False):
+    """
+    Decide which stages must run. A memoized stage is reused when its key
+    (data hash + source hashes of it and its local imports + params) matches
+    the manifest and its recorded outputs are untouched; stages without a
+    module (e.g. load) run only if something that needs them runs.
+    Returns (stages to run, names reused, {name: key}).
+    """
+    keys = {s.name: stage_cache.stage_key(data_hash, stage_cache.local_sources(s.module), s.params)
+            for s in stages if s.module is not None}
+    reused = {s.name for s in stages
+              if s.module is not None and not force
+              and stage_cache.is_fresh(manifest, s.name, keys[s.name], s.outputs)}
+
+    by_name = {s.name: s for s in stages}
+    needed = {s.name for s in stages if s.module is not None and s.name not in reused}
+    stack = list(needed)
+    while stack:
+        for dep in by_name[stack.pop()].deps:
+            if dep not in needed:
+                needed.add(dep)
+                stack.append(dep)
+    return [s for s in stages if s.name in needed], sorted(reused), keys
+
+
+def _timed(stage: Stage, results: dict):
+    with phase(f"pipeline.{stage.name}") as rec:
+        start = time.perf_counter()
+        out = stage.func(results)
+        elapsed = time.perf_counter() - start
+        rec["rows"] = getattr(out, "shape", (None,))[0]
+    return out, elapsed
+
+
+def run_pipeline(stages: list, jobs: int = 4) -> dict:
+    """
+    Run stages as a dependency DAG on a thread pool.
+
+    A stage starts once all of its deps have finished; independent stages run
+    concurrently (up to `jobs`).
+    All stages share the in-memory results of their deps, so the dataset is
+    loaded once. Returns {stage name: wall seconds}.
+    """
+    pending = {s.name: s for s in stages}
+    results, timings = {}, {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for stage in list(pending.values()):
+                if not all(d in results for d in stage.deps):
+                    continue
+                if len(running) >= max(1, jobs):
+                    break
+                del pending[stage.name]
+                running[pool.submit(_timed, stage, results)] = stage
+            if not running:
+                raise RuntimeError(f"Stages with unmet dependencies: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage = running.pop(fut)
+                results[stage.name], timings[stage.name] = fut.result()
+    return timings
+
+
+def run_memoized(stages: list, data_file: Path, jobs: int = 4, force: bool = False):
+    """
+    plan() the stages against the manifest, run what is stale and record it.
+    Returns (timings, recomputed stage names, reused stage names, data hash).
+    """
+    data_hash = file_sha256(data_file)
+    manifest = stage_cache.load_manifest(stage_cache.MANIFEST_FILE)
+    to_run, reused, keys = plan(stages, data_hash, manifest, force)
+    timings = run_pipeline(to_run, jobs)
+    for stage in to_run:
+        if stage.module is not None:
+            stage_cache.record(manifest, stage.name, keys[stage.name], stage.outputs)
+    stage_cache.save_manifest(manifest, stage_cache.MANIFEST_FILE)
+    recomputed = [s.name for s in to_run if s.module is not None]
+    return timings, recomputed, reused, data_hash
+
+
+def log_timings(timings: dict, total: float, data_hash: str, recomputed: list, reused: list):
+    parts = " ".join(f"{name}={sec:.2f}s" for name, sec in timings.items())
+    log_message("pipeline.py", f"seed={SEED} data={data_hash[:12]} "
+                               f"recomputed=[{', '.join(recomputed)}] reused=[{', '.join(reused)}]")
+    log_message("pipeline.py", f"seed={SEED} {parts} total={total:.2f}s run_id={instrument.RUN_ID}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run every analysis over one in-memory dataset.")
+    parser.add_argument("--data", type=Path, default=DATA_FILE, help="dataset CSV")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1),
+                        help="maximum number of stages running at once")
+    parser.add_argument("--bootstrap-workers", type=int, default=1,
+                        help="process-pool workers for the bootstrap stage")
+    parser.add_argument("--figure-workers", type=int, default=1,
+                        help="process-pool workers for rendering figures")
+    parser.add_argument("--force", action="store_true",
+                        help="recompute every stage even if its inputs and code are unchanged")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None,
+                        help="profile slow stages (default: $ANALYSIS_PROFILE)")
+    parser.add_argument("--profile-threshold", type=float, default=None,
+                        help="keep profiles of stages slower than this many seconds (default: 5)")
+    parser.add_argument("--tracemalloc", action="store_true", default=None,
+                        help="record tracemalloc peaks per phase (slower)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    instrument.configure(args.tracemalloc, args.profile, args.profile_threshold)
+    stages = build_stages(args.data, args.bootstrap_workers, args.figure_workers, args.force)
+
+    start = time.perf_counter()
+    timings, recomputed, reused, data_hash = run_memoized(stages, args.data, args.jobs, args.force)
+    total = time.perf_counter() - start
+
+    print("\n===== Stage wall times =====")
+    for name, sec in timings.items():
+        print(f"{name:<24}{sec:8.2f}s")
+    for name in reused:
+        print(f"{name:<24}  reused")
+    print(f"{'total':<24}{total:8.2f}s")
+    log_timings(timings, total, data_hash, recomputed, reused)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,154 +1,392 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-from datetime import datetime
+from __future__ import annotations
 
-ROOT = Path(__file__).resolve().parent.parent
-LOG_DIR = ROOT / "outputs" / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+import argparse
+from pathlib import Path
 
-SEED = 42  # set once for reproducibility
-np.random.seed(SEED)
+from data_loader import load_dataset, iter_chunks, CATEGORICAL_COLS
+from streaming_stats import KLLSketch, ColumnMoments, CoMoments, DuplicateCounter
+from groupby_kernel import as_dimension, joint_codes, LABEL_SEP
+from instrument import log_run, instrumented
+from lazy_imports import lazy_import
 
-def log_run(script_name: str, note: str = ""):
-    with open(LOG_DIR / "run.log", "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {script_name} | seed={SEED} {note}\n")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
+SEED = 42  # seeds the KLL sketches of --stream
 
 # ---------- paths ----------
 SCRIPT_DIR = Path(__file__).resolve().parent
 ROOT = SCRIPT_DIR.parent
 DATA_FILE = ROOT / "data" / "StudentsPerformance.csv"
 OUT_DIR = ROOT / "outputs"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 SUMMARY_TXT = OUT_DIR / "sanity_checks.txt"
 OUTLIERS_CSV = OUT_DIR / "outliers_indices.csv"
 CAT_COUNTS_CSV = OUT_DIR / "categorical_value_counts.csv"
 
-# ---------- load & derive ----------
-df = pd.read_csv(DATA_FILE)
+OUTLIER_METHODS = {"iqr": 1.5, "mad": 3.5}  # method -> default multiplier k
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+
+# ---------- outliers ----------
+def _lerp(a, b, t):
+    """numpy's linear interpolation between order statistics (same rounding as np.percentile)."""
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def grouped_quantiles(values: np.ndarray, qs, codes: np.ndarray = None, n_groups: int = 1) -> np.ndarray:
+    """
+    Linear-interpolation quantiles (NaN skipped, as Series.quantile) of every
+    column of a 2-D matrix, per group: shape (len(qs), n_groups, n_columns).
+    Ungrouped, this is one np.percentile call over axis 0. Grouped, each
+    column is sorted once by (group, value) and every group's order
+    statistics are gathered at once; groups without values get NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    qs = np.asarray(qs, dtype=np.float64)
+    if codes is None:
+        pct = np.nanpercentile if np.isnan(values).any() else np.percentile
+        return pct(values, qs * 100, axis=0)[:, None, :]
+    n, m = values.shape
+    starts = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=n_groups))[:-1]])
+    out = np.empty((len(qs), n_groups, m))
+    for j in range(m):
+        col = values[:, j]
+        x = col[np.lexsort((col, codes))]  # NaN last within each group
+        counts = np.bincount(codes, weights=~np.isnan(col), minlength=n_groups).astype(np.int64)
+        pos = qs[:, None] * (counts - 1)
+        lo = np.floor(pos)
+        hi = np.minimum(lo + 1, counts - 1)
+        a = x[np.clip(starts + lo.astype(np.int64), 0, n - 1)]
+        b = x[np.clip(starts + hi.astype(np.int64), 0, n - 1)]
+        out[:, :, j] = np.where(counts > 0, _lerp(a, b, pos - lo), np.nan)
+    return out
+
 
-# Derived columns (mirror your descriptive_stats.py)
-df["total_score"]   = df["math score"] + df["reading score"] + df["writing score"]
-df["average_score"] = df["total_score"] / 3
+def outlier_bounds(values: np.ndarray, method: str = "iqr", k: float = None,
+                   codes: np.ndarray = None, n_groups: int = 1):
+    """
+    Lower/upper bounds per (group, column), each of shape (n_groups, n_columns).
+    iqr: Q1 - k*IQR, Q3 + k*IQR. mad: median -/+ k * 1.4826 * MAD, i.e. a
+    modified z-score above k.
+    """
+    k = OUTLIER_METHODS[method] if k is None else k
+    if method == "iqr":
+        q1, q3 = grouped_quantiles(values, [0.25, 0.75], codes, n_groups)
+        iqr = q3 - q1
+        return q1 - k * iqr, q3 + k * iqr
+    med = grouped_quantiles(values, [0.5], codes, n_groups)[0]
+    dev = np.abs(values - (med[0] if codes is None else med[codes]))
+    spread = k * MAD_SCALE * grouped_quantiles(dev, [0.5], codes, n_groups)[0]
+    return med - spread, med + spread
 
-# ---------- helpers ----------
-def iqr_outliers(series: pd.Series):
-    q1 = series.quantile(0.25)
-    q3 = series.quantile(0.75)
-    iqr = q3 - q1
-    lower = q1 - 1.5 * iqr
-    upper = q3 + 1.5 * iqr
+
+def iqr_outliers(series: pd.Series, k: float = OUTLIER_METHODS["iqr"]):
+    lower, upper = (float(b[0, 0]) for b in outlier_bounds(series.to_numpy(dtype=np.float64)[:, None], "iqr", k))
     mask = (series < lower) | (series > upper)
     return mask, (lower, upper)
 
+
+@instrumented()
+def find_outliers(df: pd.DataFrame, columns, method: str = "iqr", k: float = None, group_by=None):
+    """
+    Outlier screen of every column, optionally within the subgroups of
+    group_by (a column or tuple of columns), in one vectorized pass over the
+    (rows x columns) matrix. Returns the long outlier table (column, index,
+    value, plus group when grouped), ordered by column then row, and a
+    bounds table with one row per (column, group) and its outlier count.
+    """
+    values = df[columns].to_numpy(dtype=np.float64)
+    m = len(columns)
+    if group_by:
+        cols = as_dimension(group_by)
+        codes, n_groups, labels = joint_codes(df, cols)
+        names = np.array([LABEL_SEP.join(str(labels[c][i]) for c in cols) for i in range(n_groups)], dtype=object)
+    else:
+        codes, n_groups, names = None, 1, np.array([None], dtype=object)
+    lower, upper = outlier_bounds(values, method, k, codes, n_groups)
+    if codes is None:
+        mask = (values < lower) | (values > upper)
+    else:
+        mask = (values < lower[codes]) | (values > upper[codes])
+    col_idx, row_idx = np.nonzero(mask.T)  # column-major: by column, then row
+    table = pd.DataFrame({"column": np.asarray(columns, dtype=object)[col_idx],
+                          "index": df.index[row_idx],
+                          "value": values[row_idx, col_idx].astype(np.result_type(*df[columns].dtypes))})
+    group_idx = np.zeros(len(row_idx), dtype=np.int64) if codes is None else codes[row_idx]
+    if group_by:
+        table.insert(2, "group", names[group_idx])
+    counts = np.bincount(group_idx * m + col_idx, minlength=n_groups * m).reshape(n_groups, m)
+    bounds = pd.DataFrame({"group": np.tile(names, m), "column": np.repeat(np.asarray(columns, dtype=object), n_groups),
+                           "lower": lower.T.ravel(), "upper": upper.T.ravel(), "outliers": counts.T.ravel()})
+    return table, bounds
+
+
+def outlier_lines(bounds: pd.DataFrame, method: str = "iqr", k: float = None, group_by=None) -> list:
+    lines = [f"===== OUTLIERS VIA {method.upper()} ====="]
+    if k is not None or method != "iqr" or group_by:
+        scale = "IQR" if method == "iqr" else "scaled MAD"
+        where = f", within {' x '.join(as_dimension(group_by))} subgroups" if group_by else ""
+        lines.append(f"(k = {OUTLIER_METHODS[method] if k is None else k} x {scale}{where})")
+    for r in bounds.itertuples():
+        label = r.column if r.group is None else f"{r.column} [{r.group}]"
+        lines.append(f"{label}: outliers = {r.outliers}, bounds = ({r.lower:.2f}, {r.upper:.2f})")
+    return lines
+
 score_cols = ["math score", "reading score", "writing score", "total_score", "average_score"]
 
-categorical_cols = [
-    c for c in df.columns
-    if c not in score_cols and df[c].dtype == "object"
-]
-
-# ---------- checks ----------
-lines = []
-
-# Shape & dtypes
-lines.append("===== SHAPE & DTYPES =====")
-lines.append(f"Rows: {len(df)}, Columns: {len(df.columns)}")
-dtype_info = df.dtypes.to_string()
-lines.append(dtype_info)
-lines.append("")
-
-# Missingness
-lines.append("===== MISSINGNESS =====")
-missing = df.isna().sum()
-missing_pct = (missing / len(df) * 100).round(2)
-miss_df = pd.DataFrame({"missing_count": missing, "missing_pct": missing_pct})
-lines.append(miss_df.to_string())
-lines.append("")
-
-# Duplicates
-lines.append("===== DUPLICATES =====")
-dup_count = df.duplicated().sum()
-lines.append(f"Duplicate rows: {dup_count}")
-lines.append("")
-
-# Score range validation (expected 0–100 for individual scores)
-lines.append("===== SCORE RANGE VALIDATION (0-100) =====")
-for col in ["math score", "reading score", "writing score"]:
-    below = (df[col] < 0).sum()
-    above = (df[col] > 100).sum()
-    lines.append(f"{col}: below 0 = {below}, above 100 = {above}")
-lines.append("")
-
-# Descriptive stats quick view
-lines.append("===== DESCRIPTIVE SUMMARY (SCORES) =====")
-lines.append(df[score_cols].describe().to_string())
-lines.append("")
-
-# Correlations among scores
-lines.append("===== CORRELATIONS (SCORES) =====")
-lines.append(df[score_cols].corr().round(3).to_string())
-lines.append("")
-
-# Outliers via IQR
-lines.append("===== OUTLIERS VIA IQR =====")
-outlier_rows = []
-for col in score_cols:
-    mask, (lower, upper) = iqr_outliers(df[col])
-    n_out = int(mask.sum())
-    lines.append(f"{col}: outliers = {n_out}, bounds = ({lower:.2f}, {upper:.2f})")
-    if n_out > 0:
-        tmp = df.loc[mask, [col]].copy()
-        tmp.insert(0, "column", col)
-        tmp.insert(1, "index", tmp.index)
-        outlier_rows.append(tmp.rename(columns={col: "value"}))
-lines.append("")
-
-# Save outlier indices
-if outlier_rows:
-    outliers_df = pd.concat(outlier_rows, ignore_index=True)
+@instrumented()
+def run(df: pd.DataFrame = None, outlier_method: str = "iqr", outlier_k: float = None, outlier_by=None):
+    # ---------- load & derive ----------
+    if df is None:
+        df = load_dataset(DATA_FILE)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    categorical_cols = [c for c in CATEGORICAL_COLS if c in df.columns]
+
+    # ---------- checks ----------
+    lines = []
+
+    # Shape & dtypes
+    lines.append("===== SHAPE & DTYPES =====")
+    lines.append(f"Rows: {len(df)}, Columns: {len(df.columns)}")
+    dtype_info = df.dtypes.to_string()
+    lines.append(dtype_info)
+    lines.append("")
+
+    # Missingness
+    lines.append("===== MISSINGNESS =====")
+    missing = df.isna().sum()
+    missing_pct = (missing / len(df) * 100).round(2)
+    miss_df = pd.DataFrame({"missing_count": missing, "missing_pct": missing_pct})
+    lines.append(miss_df.to_string())
+    lines.append("")
+
+    # Duplicates
+    lines.append("===== DUPLICATES =====")
+    dup_count = df.duplicated().sum()
+    lines.append(f"Duplicate rows: {dup_count}")
+    lines.append("")
+
+    # Score range validation (expected 0–100 for individual scores)
+    lines.append("===== SCORE RANGE VALIDATION (0-100) =====")
+    for col in ["math score", "reading score", "writing score"]:
+        below = (df[col] < 0).sum()
+        above = (df[col] > 100).sum()
+        lines.append(f"{col}: below 0 = {below}, above 100 = {above}")
+    lines.append("")
+
+    # Descriptive stats quick view
+    lines.append("===== DESCRIPTIVE SUMMARY (SCORES) =====")
+    lines.append(df[score_cols].describe().to_string())
+    lines.append("")
+
+    # Correlations among scores
+    lines.append("===== CORRELATIONS (SCORES) =====")
+    lines.append(df[score_cols].corr().round(3).to_string())
+    lines.append("")
+
+    # Outliers (all columns, and groups, in one pass)
+    outliers_df, bounds = find_outliers(df, score_cols, outlier_method, outlier_k, outlier_by)
+    lines.extend(outlier_lines(bounds, outlier_method, outlier_k, outlier_by))
+    lines.append("")
     outliers_df.to_csv(OUTLIERS_CSV, index=False)
-else:
-    pd.DataFrame(columns=["column", "index", "value"]).to_csv(OUTLIERS_CSV, index=False)
-
-# Categorical value counts (robust column naming)
-lines.append("===== CATEGORICAL VALUE COUNTS =====")
-cat_counts_frames = []
-for c in categorical_cols:
-    vc = df[c].value_counts(dropna=False)
-    lines.append(f"\n-- {c} --")
-    lines.append(vc.to_string())
-
-    # Build a tidy frame for CSV
-    t = vc.rename("count").to_frame()
-    t = t.assign(column=c)
-    t = t.reset_index()  # creates a column typically named 'index' or the Series name
-    # normalize to have 'value' column
-    if "index" in t.columns and "value" not in t.columns:
-        t = t.rename(columns={"index": "value"})
-    # final tidy cols
-    # find the value column if it's still not named 'value' for some reason
-    if "value" not in t.columns:
-        candidate = next((col for col in t.columns if col not in ("count", "column")), None)
-        if candidate:
-            t = t.rename(columns={candidate: "value"})
-        else:
-            t["value"] = np.nan
-    t = t[["column", "value", "count"]]
-    cat_counts_frames.append(t)
-
-if cat_counts_frames:
-    cat_counts = pd.concat(cat_counts_frames, ignore_index=True)
-    cat_counts.to_csv(CAT_COUNTS_CSV, index=False)
-
-# ---------- write summary ----------
-with open(SUMMARY_TXT, "w", encoding="utf-8") as f:
-    f.write("\n".join(lines))
-
-print(f"✅ Wrote sanity summary to: {SUMMARY_TXT}")
-print(f"✅ Wrote outlier indices to: {OUTLIERS_CSV}")
-print(f"✅ Wrote categorical value counts to: {CAT_COUNTS_CSV}")
-
-log_run("sanity_checks.py")        
\ No newline at end of file
+
+    # Categorical value counts (robust column naming)
+    lines.append("===== CATEGORICAL VALUE COUNTS =====")
+    cat_counts_frames = []
+    for c in categorical_cols:
+        vc = df[c].value_counts(dropna=False)
+        lines.append(f"\n-- {c} --")
+        lines.append(vc.to_string())
+
+        # Build a tidy frame for CSV
+        t = vc.rename("count").to_frame()
+        t = t.assign(column=c)
+        t = t.reset_index()  # creates a column typically named 'index' or the Series name
+        # normalize to have 'value' column
+        if "index" in t.columns and "value" not in t.columns:
+            t = t.rename(columns={"index": "value"})
+        # final tidy cols
+        # find the value column if it's still not named 'value' for some reason
+        if "value" not in t.columns:
+            candidate = next((col for col in t.columns if col not in ("count", "column")), None)
+            if candidate:
+                t = t.rename(columns={candidate: "value"})
+            else:
+                t["value"] = np.nan
+        t = t[["column", "value", "count"]]
+        cat_counts_frames.append(t)
+
+    if cat_counts_frames:
+        cat_counts = pd.concat(cat_counts_frames, ignore_index=True)
+        cat_counts.to_csv(CAT_COUNTS_CSV, index=False)
+
+    # ---------- write summary ----------
+    with open(SUMMARY_TXT, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+    print(f"✅ Wrote sanity summary to: {SUMMARY_TXT}")
+    print(f"✅ Wrote outlier indices to: {OUTLIERS_CSV}")
+    print(f"✅ Wrote categorical value counts to: {CAT_COUNTS_CSV}")
+
+    note = ""
+    if outlier_method != "iqr" or outlier_k is not None or outlier_by:
+        note = f"outliers={outlier_method} k={outlier_k} by={outlier_by}"
+    log_run("sanity_checks.py", note, seed=SEED)
+
+
+@instrumented()
+def run_streaming(path: Path = DATA_FILE, chunksize: int = 1_000_000, sketch_k: int = 200):
+    """
+    Same checks and output files as run(), computed chunk by chunk with bounded memory.
+
+    Missingness, range violations, categorical counts, means/std/min/max and
+    correlations are exact running aggregates. Quartiles (describe, IQR bounds)
+    come from KLL sketches (see streaming_stats.KLLSketch for the error bound);
+    duplicates are counted from 64-bit row hashes. Outlier rows are collected
+    in a second pass once the IQR bounds are known.
+    """
+    # ---------- pass 1: aggregates ----------
+    n_rows = 0
+    columns, dtypes = None, {}
+    missing = None
+    range_viol = {c: [0, 0] for c in ["math score", "reading score", "writing score"]}
+    cat_counts = {}
+    moments = ColumnMoments(len(score_cols))
+    comoments = CoMoments(len(score_cols))
+    sketches = [KLLSketch(sketch_k, seed=SEED + j) for j in range(len(score_cols))]
+    dups = DuplicateCounter()
+
+    for chunk in iter_chunks(path, chunksize):
+        if columns is None:
+            columns = list(chunk.columns)
+            missing = pd.Series(0, index=columns)
+        for c in columns:
+            dt = chunk[c].dtype
+            if c not in dtypes or isinstance(dt, pd.CategoricalDtype):
+                dtypes.setdefault(c, dt)
+            elif dt != dtypes[c]:
+                dtypes[c] = np.result_type(dtypes[c], dt)
+        n_rows += len(chunk)
+        missing += chunk.isna().sum()
+        dups.update(chunk[CATEGORICAL_COLS + ["math score", "reading score", "writing score"]])
+        for col, counts in range_viol.items():
+            counts[0] += int((chunk[col] < 0).sum())
+            counts[1] += int((chunk[col] > 100).sum())
+        values = chunk[score_cols].to_numpy(dtype=np.float64)
+        moments.update(values)
+        comoments.update(values)
+        for j, sketch in enumerate(sketches):
+            sketch.update(values[:, j])
+        for c in CATEGORICAL_COLS:
+            vc = chunk[c].value_counts(dropna=False)
+            cat_counts[c] = vc if c not in cat_counts else cat_counts[c].add(vc, fill_value=0)
+
+    # ---------- summary text ----------
+    lines = []
+    lines.append("===== SHAPE & DTYPES =====")
+    lines.append(f"Rows: {n_rows}, Columns: {len(columns)}")
+    lines.append(pd.Series(dtypes).to_string())
+    lines.append("")
+
+    lines.append("===== MISSINGNESS =====")
+    missing_pct = (missing / n_rows * 100).round(2)
+    lines.append(pd.DataFrame({"missing_count": missing, "missing_pct": missing_pct}).to_string())
+    lines.append("")
+
+    lines.append("===== DUPLICATES =====")
+    lines.append(f"Duplicate rows: {dups.duplicates}")
+    lines.append("")
+
+    lines.append("===== SCORE RANGE VALIDATION (0-100) =====")
+    for col, (below, above) in range_viol.items():
+        lines.append(f"{col}: below 0 = {below}, above 100 = {above}")
+    lines.append("")
+
+    quartiles = np.array([s.quantile([0.25, 0.5, 0.75]) for s in sketches]).T
+    describe = pd.DataFrame(
+        [moments.n, moments.mean, moments.std, moments.min, *quartiles, moments.max],
+        index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"],
+        columns=score_cols,
+    )
+    lines.append("===== DESCRIPTIVE SUMMARY (SCORES) =====")
+    lines.append(describe.to_string())
+    lines.append(f"(streaming: quartiles from KLL sketches, k={sketch_k})")
+    lines.append("")
+
+    lines.append("===== CORRELATIONS (SCORES) =====")
+    corr = pd.DataFrame(comoments.corr(), index=score_cols, columns=score_cols)
+    lines.append(corr.round(3).to_string())
+    lines.append("")
+
+    # ---------- pass 2: outliers against sketch-based IQR bounds ----------
+    q1, q3 = quartiles[0], quartiles[2]
+    lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    found = []
+    for chunk in iter_chunks(path, chunksize):
+        values = chunk[score_cols].to_numpy(dtype=np.float64)
+        col_idx, row_idx = np.nonzero(((values < lower) | (values > upper)).T)
+        found.append(pd.DataFrame({"col_idx": col_idx, "index": chunk.index[row_idx],
+                                   "value": values[row_idx, col_idx].astype(np.result_type(*chunk[score_cols].dtypes))}))
+    hits = pd.concat(found, ignore_index=True).sort_values("col_idx", kind="stable")
+    outliers_df = pd.DataFrame({"column": np.asarray(score_cols, dtype=object)[hits["col_idx"].to_numpy()],
+                                "index": hits["index"].to_numpy(), "value": hits["value"].to_numpy()})
+    bounds = pd.DataFrame({"group": None, "column": score_cols, "lower": lower, "upper": upper,
+                           "outliers": np.bincount(hits["col_idx"], minlength=len(score_cols))})
+    lines.extend(outlier_lines(bounds))
+    lines.append("")
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    outliers_df.to_csv(OUTLIERS_CSV, index=False)
+
+    # ---------- categorical counts ----------
+    lines.append("===== CATEGORICAL VALUE COUNTS =====")
+    cat_frames = []
+    for c in CATEGORICAL_COLS:
+        vc = cat_counts[c].astype("int64").sort_values(ascending=False, kind="stable")
+        vc = vc.rename("count").rename_axis(c)
+        lines.append(f"\n-- {c} --")
+        lines.append(vc.to_string())
+        cat_frames.append(pd.DataFrame({"column": c, "value": vc.index, "count": vc.to_numpy()}))
+    pd.concat(cat_frames, ignore_index=True).to_csv(CAT_COUNTS_CSV, index=False)
+
+    with open(SUMMARY_TXT, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+    print(f"✅ Wrote sanity summary to: {SUMMARY_TXT}")
+    print(f"✅ Wrote outlier indices to: {OUTLIERS_CSV}")
+    print(f"✅ Wrote categorical value counts to: {CAT_COUNTS_CSV}")
+
+    log_run("sanity_checks.py", f"streaming chunksize={chunksize}", seed=SEED)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Data sanity checks.")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the CSV in chunks with bounded memory (for files larger than RAM)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="rows per chunk in --stream mode")
+    parser.add_argument("--sketch-k", type=int, default=200,
+                        help="KLL sketch size for streamed quartiles (rank error ~1.7/k)")
+    parser.add_argument("--outlier-method", choices=sorted(OUTLIER_METHODS), default="iqr",
+                        help="outlier bounds: iqr (Tukey fences) or mad (median +/- k scaled MADs)")
+    parser.add_argument("--outlier-k", type=float, default=None,
+                        help="bound multiplier (default 1.5 for iqr, 3.5 for mad)")
+    parser.add_argument("--outlier-by", nargs="+", default=None, metavar="COL",
+                        help="compute bounds within the subgroups of these categorical columns")
+    args = parser.parse_args(argv)
+    if args.stream and (args.outlier_method != "iqr" or args.outlier_k is not None or args.outlier_by):
+        parser.error("--stream supports only the default ungrouped IQR bounds")
+    unknown = [c for c in args.outlier_by or [] if c not in CATEGORICAL_COLS]
+    if unknown:
+        parser.error(f"unknown --outlier-by column(s): {unknown}; choose from {CATEGORICAL_COLS}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.stream:
+        run_streaming(DATA_FILE, args.chunksize, args.sketch_k)
+    else:
+        run(outlier_method=args.outlier_method, outlier_k=args.outlier_k,
+            outlier_by=tuple(args.outlier_by) if args.outlier_by else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,50 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-from datetime import datetime
+from __future__ import annotations
 
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
 
-ROOT = Path(__file__).resolve().parent.parent
-LOG_DIR = ROOT / "outputs" / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+from data_loader import load_dataset, total_scores, SCORE_COLS
+from decision import classify, band_codes, FAILING_CUTOFF, EXCELLENT_CUTOFF
+from groupby_kernel import (subgroup_stats, joint_codes, as_dimension, dimension_name,
+                            parse_dimensions, LABEL_SEP, INTERSECTION_SEP)
+from instrument import log_run, instrumented
+from lazy_imports import lazy_import
 
-SEED = 42  # set once for reproducibility
-np.random.seed(SEED)
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
-def log_run(script_name: str, note: str = ""):
-    with open(LOG_DIR / "run.log", "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {script_name} | seed={SEED} {note}\n")
 
+SEED = 42  # seeds each run's own np.random.Generator
 
 # ---------- paths ----------
 SCRIPT_DIR = Path(__file__).resolve().parent
 ROOT = SCRIPT_DIR.parent
 DATA_FILE = ROOT / "data" / "StudentsPerformance.csv"
 OUT_DIR = ROOT / "outputs"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 TXT_OUT = OUT_DIR / "sensitivity_analysis.txt"
 CSV_OUT = OUT_DIR / "sensitivity_summary.csv"
+SWEEP_CSV = OUT_DIR / "sensitivity_sweep.csv"
 
-DEFAULT_FAILING = 150
-DEFAULT_EXCELLENT = 210
+DEFAULT_FAILING = FAILING_CUTOFF
+DEFAULT_EXCELLENT = EXCELLENT_CUTOFF
+DIMENSIONS = ["gender", "race/ethnicity"]
+SHORT_NAMES = {"race/ethnicity": "race"}
+BASELINE_DESCRIPTION = f"Full dataset; cutoffs = Failing<{DEFAULT_FAILING}, Excellent≥{DEFAULT_EXCELLENT}"
 
 # ---------- helpers ----------
-def add_derived(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["total_score"]   = df["math score"] + df["reading score"] + df["writing score"]
-    df["average_score"] = df["total_score"] / 3
-    return df
-
 def categorize(total: float, failing_cutoff: int, excellent_cutoff: int) -> str:
-    if total < failing_cutoff:
-        return "Failing"
-    elif total < excellent_cutoff:
-        return "Average"
-    else:
-        return "Excellent"
+    return classify(total, failing_cutoff, excellent_cutoff)
+
+def dimension_key(dim) -> str:
+    """Short column-name form of a dimension: race/ethnicity -> race, ("gender", "lunch") -> gender_x_lunch."""
+    return "_x_".join(SHORT_NAMES.get(c, c).replace(" ", "_") for c in as_dimension(dim))
 
-def apply_categories(df: pd.DataFrame, failing_cutoff: int, excellent_cutoff: int) -> pd.DataFrame:
-    df = df.copy()
-    df["performance_category"] = df["total_score"].apply(
-        lambda t: categorize(t, failing_cutoff, excellent_cutoff)
-    )
-    return df
+def dimension_title(dim) -> str:
+    return INTERSECTION_SEP.join(SHORT_NAMES.get(c, c) for c in as_dimension(dim)).capitalize()
 
-def rates_by_category(df: pd.DataFrame, group_col: str = None) -> pd.DataFrame:
+def rates_by_category(df: pd.DataFrame, group_col=None, min_cell_size: int = 0) -> pd.DataFrame:
     if group_col is None:
         counts = df["performance_category"].value_counts().reindex(
             ["Excellent", "Average", "Failing"], fill_value=0
@@ -64,96 +57,234 @@ def rates_by_category(df: pd.DataFrame, group_col: str = None) -> pd.DataFrame:
         out.insert(0, "group", "OVERALL")
         return out
     else:
-        pv = df.pivot_table(
-            index=group_col,
-            columns="performance_category",
-            values="total_score",
-            aggfunc="count"
-        ).fillna(0)
-        for col in ["Excellent", "Average", "Failing"]:
-            if col not in pv.columns:
-                pv[col] = 0
-        pv["total"] = pv.sum(axis=1)
-        out = pd.DataFrame({
-            "group": pv.index.astype(str),
-            "rate_excellent": pv["Excellent"] / pv["total"],
-            "rate_average":   pv["Average"]   / pv["total"],
-            "rate_failing":   pv["Failing"]   / pv["total"],
-        }).reset_index(drop=True)
-        return out
+        # group_col may be a column or a tuple of columns (intersection);
+        # subgroups with a missing label or fewer than min_cell_size rows are left out
+        st = subgroup_stats(df, [group_col], dropna=True).xs(dimension_name(group_col), level="dimension")
+        return subgroup_rates(st, min_cell_size)
+
+def subgroup_rates(st: pd.DataFrame, min_cell_size: int = 0) -> pd.DataFrame:
+    """rates_by_category's per-subgroup table from one dimension's subgroup stats (groupby_kernel)."""
+    total = st["n_excellent"] + st["n_average"] + st["n_failing"]
+    st = st[(total > 0) & (st["count"] >= min_cell_size)]
+    total = total[st.index]
+    out = pd.DataFrame({
+        "group": st.index.astype(str),
+        "rate_excellent": st["n_excellent"] / total,
+        "rate_average":   st["n_average"]   / total,
+        "rate_failing":   st["n_failing"]   / total,
+    }).reset_index(drop=True)
+    return out
 
 def disparate_impact_to_max(rate_series: pd.Series) -> pd.Series:
     m = rate_series.max()
     return rate_series / m if m > 0 else pd.Series(1.0, index=rate_series.index)
 
-def compute_metrics(df: pd.DataFrame, failing_cutoff: int, excellent_cutoff: int, label: str) -> dict:
-    d = add_derived(df)
-    d = apply_categories(d, failing_cutoff, excellent_cutoff)
-
+# ---------- scenarios ----------
+@dataclass
+class Scenario:
+    """A row selection over the shared base frame plus a cutoff pair; never a copy of the data."""
+    label: str
+    rows: np.ndarray = None  # boolean mask or row indices into the base; None = every row
+    failing_cutoff: int = DEFAULT_FAILING
+    excellent_cutoff: int = DEFAULT_EXCELLENT
+    description: str = ""
+
+
+class ScenarioBase:
+    """
+    What every scenario needs from the base frame, derived once: the score
+    arrays, total_score, and per dimension each row's joint cell code
+    (groupby_kernel) with the cell labels. A scenario then selects rows from
+    these arrays and counts with one bincount per dimension.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions=DIMENSIONS):
+        self.n = len(df)
+        self.scores = {c: df[c].to_numpy() for c in SCORE_COLS}
+        self.total = total_scores(df).to_numpy()
+        self.cells = {}
+        for dim in dimensions:
+            cols = as_dimension(dim)
+            cell, n_cells, labels = joint_codes(df, cols)
+            valid = np.ones(n_cells, dtype=bool)  # subgroups with a missing label are left out
+            for c in cols:
+                valid &= ~pd.isna(labels[c])
+            names = np.array([LABEL_SEP.join(str(labels[c][i]) for c in cols) for i in range(n_cells)],
+                             dtype=object)
+            self.cells[dimension_name(dim)] = (cell, n_cells, valid, names)
+
+
+def _mean(values: np.ndarray) -> float:
+    """pandas Series.mean semantics (NaN skipped) on a plain array."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if values.dtype.kind == "f":
+            present = ~np.isnan(values)
+            return np.where(present, values, 0.0).sum() / present.sum()
+        return values.sum(dtype=np.float64) / len(values)
+
+
+def scenario_metrics(base: ScenarioBase, scenario: Scenario, dimensions=DIMENSIONS,
+                     min_cell_size: int = 0) -> dict:
+    rows = slice(None) if scenario.rows is None else scenario.rows
+    total = base.total[rows]
+    # band per row: 0 Failing, 1 Average, 2 Excellent (NaN totals land in Excellent, as in categorize_totals)
+    band = band_codes(total, scenario.failing_cutoff, scenario.excellent_cutoff)
     metrics = {
-        "scenario": label,
-        "n": len(d),
-        "mean_math": d["math score"].mean(),
-        "mean_reading": d["reading score"].mean(),
-        "mean_writing": d["writing score"].mean(),
-        "mean_total": d["total_score"].mean(),
-        "failing_cutoff": failing_cutoff,
-        "excellent_cutoff": excellent_cutoff,
+        "scenario": scenario.label,
+        "n": len(total),
+        "mean_math": _mean(base.scores["math score"][rows]),
+        "mean_reading": _mean(base.scores["reading score"][rows]),
+        "mean_writing": _mean(base.scores["writing score"][rows]),
+        "mean_total": _mean(total),
+        "failing_cutoff": scenario.failing_cutoff,
+        "excellent_cutoff": scenario.excellent_cutoff,
     }
 
     # Overall category rates
-    overall_rates = rates_by_category(d, None).set_index("category")["rate"].to_dict()
+    counts = np.bincount(band, minlength=3)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overall = counts / counts.sum()
     metrics.update({
-        "rate_overall_excellent": overall_rates.get("Excellent", 0.0),
-        "rate_overall_average":   overall_rates.get("Average", 0.0),
-        "rate_overall_failing":   overall_rates.get("Failing", 0.0),
+        "rate_overall_excellent": overall[2],
+        "rate_overall_average":   overall[1],
+        "rate_overall_failing":   overall[0],
     })
 
-    # Subgroup rates & DI
-    by_gender = rates_by_category(d, "gender").set_index("group")
-    by_race   = rates_by_category(d, "race/ethnicity").set_index("group")
-
-    di_gender = disparate_impact_to_max(by_gender["rate_excellent"])
-    di_race   = disparate_impact_to_max(by_race["rate_excellent"])
+    # Subgroup rates & DI: categories count rows with a total_score, the size filter counts all rows
+    present = ~np.isnan(total) if total.dtype.kind == "f" else None
+    metrics["_tables"] = {}
+    for dim in dimensions:
+        key = dimension_key(dim)
+        cell, n_cells, valid, names = base.cells[dimension_name(dim)]
+        cell = cell[rows]
+        size = np.bincount(cell, minlength=n_cells)
+        by_cat = np.bincount(cell * 3 + band, weights=present, minlength=3 * n_cells).reshape(n_cells, 3)
+        n_rated = by_cat.sum(axis=1)
+        keep = valid & (n_rated > 0) & (size >= min_cell_size)
+        by_dim = pd.DataFrame({
+            "group": names[keep],
+            "rate_excellent": by_cat[keep, 2] / n_rated[keep],
+            "rate_average":   by_cat[keep, 1] / n_rated[keep],
+            "rate_failing":   by_cat[keep, 0] / n_rated[keep],
+        })
+        metrics[f"min_DI_{key}"] = disparate_impact_to_max(by_dim["rate_excellent"]).min()
+        metrics["_tables"][f"by_{key}"] = by_dim
+    return metrics
 
-    metrics["min_DI_gender"] = di_gender.min()
-    metrics["min_DI_race"]   = di_race.min()
 
-    metrics["_tables"] = {
-        "by_gender": by_gender.reset_index(),
-        "by_race": by_race.reset_index(),
+def aggregate_metrics(stats: pd.DataFrame, means: dict, category_counts: pd.Series, n: int, label: str,
+                      dimensions=DIMENSIONS, min_cell_size: int = 0) -> dict:
+    """
+    scenario_metrics of every row at the default cutoffs, from aggregates
+    instead of rows: subgroup stats indexed by (dimension, subgroup) as
+    groupby_kernel builds them (dropna=True for intersections), the mean of
+    each score column and total_score, overall performance_category counts
+    and the row count.
+    """
+    counts = category_counts.reindex(["Excellent", "Average", "Failing"], fill_value=0)
+    metrics = {
+        "scenario": label,
+        "n": n,
+        "mean_math": means["math score"],
+        "mean_reading": means["reading score"],
+        "mean_writing": means["writing score"],
+        "mean_total": means["total_score"],
+        "failing_cutoff": DEFAULT_FAILING,
+        "excellent_cutoff": DEFAULT_EXCELLENT,
+        "rate_overall_excellent": counts["Excellent"] / n,
+        "rate_overall_average":   counts["Average"] / n,
+        "rate_overall_failing":   counts["Failing"] / n,
+        "_tables": {},
     }
+    for dim in dimensions:
+        st = stats.xs(dimension_name(dim), level="dimension")
+        st = st[[not pd.isna(v) for v in st.index]]
+        by_dim = subgroup_rates(st, min_cell_size)
+        metrics[f"min_DI_{dimension_key(dim)}"] = disparate_impact_to_max(by_dim["rate_excellent"]).min()
+        metrics["_tables"][f"by_{dimension_key(dim)}"] = by_dim
     return metrics
 
+@instrumented()
+def compute_metrics(df: pd.DataFrame, failing_cutoff: int, excellent_cutoff: int, label: str,
+                    dimensions=DIMENSIONS, min_cell_size: int = 0) -> dict:
+    return scenario_metrics(ScenarioBase(df, dimensions), Scenario(label, None, failing_cutoff, excellent_cutoff),
+                            dimensions, min_cell_size)
+
 def format_pct(x: float) -> str:
     return f"{100*x:.1f}%"
 
-# ---------- load baseline data ----------
-df_raw = pd.read_csv(DATA_FILE)
-df_raw = add_derived(df_raw)
-
-# ---------- scenarios ----------
-scenarios = [
-    ("baseline", df_raw.copy(), DEFAULT_FAILING, DEFAULT_EXCELLENT, "Full dataset; cutoffs = Failing<150, Excellent≥210"),
-    ("remove_top_5pct", df_raw[df_raw["total_score"] <= df_raw["total_score"].quantile(0.95)].copy(),
-        DEFAULT_FAILING, DEFAULT_EXCELLENT, "Removed top 5% total_score"),
-    ("remove_bottom_5pct", df_raw[df_raw["total_score"] >= df_raw["total_score"].quantile(0.05)].copy(),
-        DEFAULT_FAILING, DEFAULT_EXCELLENT, "Removed bottom 5% total_score"),
-    ("excellent_220", df_raw.copy(), DEFAULT_FAILING, 220, "Threshold shift: Excellent≥220 (stricter)"),
-    ("excellent_200", df_raw.copy(), DEFAULT_FAILING, 200, "Threshold shift: Excellent≥200 (lenient)")
-]
-
-# ---------- compute ----------
-all_metrics = []
-for label, df_s, fail_c, exc_c, desc in scenarios:
-    m = compute_metrics(df_s, fail_c, exc_c, label)
-    m["description"] = desc
-    all_metrics.append(m)
-
-# ---------- CSV summary ----------
-rows = []
-for m in all_metrics:
-    rows.append({
+# ---------- cutoff sweep ----------
+def _below_counts(values: np.ndarray, cutoffs: np.ndarray) -> np.ndarray:
+    """How many values are < each cutoff (one sort + searchsorted)."""
+    return np.searchsorted(np.sort(values), cutoffs, side="left")
+
+@instrumented()
+def sweep_cutoffs(df: pd.DataFrame, failing_cutoffs, excellent_cutoffs,
+                  group_cols=DIMENSIONS, min_cell_size: int = 0) -> pd.DataFrame:
+    """
+    Evaluate every (failing, excellent) cutoff pair with failing <= excellent.
+
+    total_score is sorted once overall and once per subgroup; the number of
+    rows below each cutoff is a searchsorted lookup, so every scenario's
+    category counts are differences of those lookups. Subgroups come from
+    the kernel's joint codes, so group_cols may include intersections.
+    Returns one row per cutoff pair with overall rates, per-subgroup rates
+    and min DI per grouping column, matching compute_metrics for the same
+    cutoffs.
+    """
+    fail_grid, exc_grid = np.meshgrid(np.asarray(failing_cutoffs), np.asarray(excellent_cutoffs),
+                                      indexing="ij")
+    keep = fail_grid <= exc_grid
+    fail_c, exc_c = fail_grid[keep], exc_grid[keep]
+    cutoffs, inv = np.unique(np.concatenate([fail_c, exc_c]), return_inverse=True)
+    fail_i, exc_i = inv[:len(fail_c)], inv[len(fail_c):]
+
+    def rates(values):
+        below = _below_counts(values, cutoffs)
+        n = len(values)
+        if n == 0:
+            return np.full((3, len(fail_c)), np.nan)
+        n_fail = below[fail_i]
+        n_exc = n - below[exc_i]
+        return np.vstack([n_exc, n - n_exc - n_fail, n_fail]) / n
+
+    total = df["total_score"].to_numpy()
+    overall = rates(total)
+    out = {
+        "failing_cutoff": fail_c,
+        "excellent_cutoff": exc_c,
+        "rate_overall_excellent": overall[0],
+        "rate_overall_average": overall[1],
+        "rate_overall_failing": overall[2],
+    }
+    min_di = {}
+    for col in group_cols:
+        cols = as_dimension(col)
+        cell, n_cells, labels = joint_codes(df, cols)
+        # total_score grouped by cell: one stable sort, then contiguous slices
+        order = np.argsort(cell, kind="stable")
+        grouped = total[order]
+        bounds = np.searchsorted(cell[order], np.arange(n_cells + 1))
+        sizes = np.diff(bounds)
+        exc_rates = []
+        for i in range(n_cells):
+            key = [labels[c][i] for c in cols]
+            if any(pd.isna(k) for k in key) or sizes[i] < min_cell_size:
+                continue
+            r = rates(grouped[bounds[i]:bounds[i + 1]])
+            exc_rates.append(r[0])
+            for name, row in zip(("excellent", "average", "failing"), r):
+                out[f"rate_{name}[{dimension_name(col)}={LABEL_SEP.join(map(str, key))}]"] = row
+        exc_rates = np.vstack(exc_rates)
+        max_rate = exc_rates.max(axis=0)
+        di = np.divide(exc_rates, max_rate, out=np.ones_like(exc_rates), where=max_rate > 0)
+        min_di[f"min_DI_{dimension_key(col)}"] = di.min(axis=0)
+    out.update(min_di)
+    return pd.DataFrame(out)
+
+def summary_row(m: dict, dimensions=DIMENSIONS) -> dict:
+    """One row of sensitivity_summary.csv from a scenario's metrics (plus its description)."""
+    return {
         "scenario": m["scenario"],
         "description": m["description"],
         "n": m["n"],
@@ -166,61 +297,151 @@ for m in all_metrics:
         "rate_overall_excellent": round(m["rate_overall_excellent"], 4),
         "rate_overall_average": round(m["rate_overall_average"], 4),
         "rate_overall_failing": round(m["rate_overall_failing"], 4),
-        "min_DI_gender": round(m["min_DI_gender"], 4),
-        "min_DI_race": round(m["min_DI_race"], 4),
-    })
-pd.DataFrame(rows).to_csv(CSV_OUT, index=False)
-
-# ---------- human-readable TXT ----------
-lines = []
-lines.append("===== SENSITIVITY / ROBUSTNESS ANALYSIS =====\n")
-lines.append("Scenarios compared:")
-for r in rows:
-    lines.append(f"- {r['scenario']}: {r['description']} (n={r['n']})")
-lines.append("")
-
-baseline = next(m for m in all_metrics if m["scenario"] == "baseline")
-
-def delta_str(b, x):
-    d = x - b
-    sign = "+" if d >= 0 else "-"
-    return f"{sign}{abs(d):.3f}"
-
-for m in all_metrics:
-    lines.append(f"--- Scenario: {m['scenario']} ---")
-    lines.append(f"Description: {m['description']}")
-    lines.append(f"Rows: {m['n']}, Cutoffs: Failing<{m['failing_cutoff']}, Excellent≥{m['excellent_cutoff']}")
-    lines.append(f"Means -> math:{m['mean_math']:.2f}  reading:{m['mean_reading']:.2f}  writing:{m['mean_writing']:.2f}  total:{m['mean_total']:.2f}")
-
-    lines.append("Overall category rates:")
-    lines.append(f"  Excellent: {format_pct(m['rate_overall_excellent'])} (Δ vs baseline {delta_str(baseline['rate_overall_excellent'], m['rate_overall_excellent'])})")
-    lines.append(f"  Average:   {format_pct(m['rate_overall_average'])} (Δ vs baseline {delta_str(baseline['rate_overall_average'], m['rate_overall_average'])})")
-    lines.append(f"  Failing:   {format_pct(m['rate_overall_failing'])} (Δ vs baseline {delta_str(baseline['rate_overall_failing'], m['rate_overall_failing'])})")
-
-    lines.append("Fairness (Disparate Impact min across subgroups):")
-    lines.append(f"  Gender DI min: {m['min_DI_gender']:.3f} (flag if < 0.80)")
-    lines.append(f"  Race   DI min: {m['min_DI_race']:.3f} (flag if < 0.80)")
-
-    lines.append("\n  By gender (rate_excellent, rate_average, rate_failing):")
-    gtab = m["_tables"]["by_gender"][["group","rate_excellent","rate_average","rate_failing"]]
-    for _, r in gtab.iterrows():
-        lines.append(f"    {r['group']:<10}  Exc:{r['rate_excellent']:.3f}  Avg:{r['rate_average']:.3f}  Fail:{r['rate_failing']:.3f}")
-
-    lines.append("\n  By race/ethnicity (rate_excellent, rate_average, rate_failing):")
-    rtab = m["_tables"]["by_race"][["group","rate_excellent","rate_average","rate_failing"]]
-    for _, r in rtab.iterrows():
-        lines.append(f"    {r['group']:<10}  Exc:{r['rate_excellent']:.3f}  Avg:{r['rate_average']:.3f}  Fail:{r['rate_failing']:.3f}")
-    lines.append("\n")
-
-lines.append("===== INTERPRETATION HINTS =====")
-lines.append("- If conclusions remain stable across scenarios, recommendations are robust.")
-lines.append("- If Excellent rate or fairness DI swings a lot under small changes, flag as medium/high-risk.")
-lines.append("- Use the CSV summary for tables in the stakeholder report.")
-
-with open(TXT_OUT, "w", encoding="utf-8") as f:
-    f.write("\n".join(lines))
-
-print(f"✅ Wrote sensitivity text report to: {TXT_OUT}")
-print(f"✅ Wrote sensitivity summary CSV to: {CSV_OUT}")
-
-log_run("sensitivity_analysis.py")        
\ No newline at end of file
+        **{f"min_DI_{dimension_key(d)}": round(m[f"min_DI_{dimension_key(d)}"], 4) for d in dimensions},
+    }
+
+@instrumented()
+def run_scenarios(df_raw: pd.DataFrame, dimensions=DIMENSIONS, min_cell_size: int = 0):
+    # ---------- scenarios (masks over one shared base) ----------
+    base = ScenarioBase(df_raw, dimensions)
+    total = pd.Series(base.total)
+    scenarios = [
+        Scenario("baseline", None, DEFAULT_FAILING, DEFAULT_EXCELLENT, BASELINE_DESCRIPTION),
+        Scenario("remove_top_5pct", (total <= total.quantile(0.95)).to_numpy(),
+                 DEFAULT_FAILING, DEFAULT_EXCELLENT, "Removed top 5% total_score"),
+        Scenario("remove_bottom_5pct", (total >= total.quantile(0.05)).to_numpy(),
+                 DEFAULT_FAILING, DEFAULT_EXCELLENT, "Removed bottom 5% total_score"),
+        Scenario("excellent_220", None, DEFAULT_FAILING, 220, "Threshold shift: Excellent≥220 (stricter)"),
+        Scenario("excellent_200", None, DEFAULT_FAILING, 200, "Threshold shift: Excellent≥200 (lenient)")
+    ]
+
+    # ---------- compute ----------
+    all_metrics = []
+    for scenario in scenarios:
+        m = scenario_metrics(base, scenario, dimensions, min_cell_size)
+        m["description"] = scenario.description
+        all_metrics.append(m)
+
+    # ---------- CSV summary ----------
+    rows = [summary_row(m, dimensions) for m in all_metrics]
+    pd.DataFrame(rows).to_csv(CSV_OUT, index=False)
+
+    # ---------- human-readable TXT ----------
+    lines = []
+    lines.append("===== SENSITIVITY / ROBUSTNESS ANALYSIS =====\n")
+    lines.append("Scenarios compared:")
+    for r in rows:
+        lines.append(f"- {r['scenario']}: {r['description']} (n={r['n']})")
+    lines.append("")
+
+    baseline = next(m for m in all_metrics if m["scenario"] == "baseline")
+
+    def delta_str(b, x):
+        d = x - b
+        sign = "+" if d >= 0 else "-"
+        return f"{sign}{abs(d):.3f}"
+
+    for m in all_metrics:
+        lines.append(f"--- Scenario: {m['scenario']} ---")
+        lines.append(f"Description: {m['description']}")
+        lines.append(f"Rows: {m['n']}, Cutoffs: Failing<{m['failing_cutoff']}, Excellent≥{m['excellent_cutoff']}")
+        lines.append(f"Means -> math:{m['mean_math']:.2f}  reading:{m['mean_reading']:.2f}  writing:{m['mean_writing']:.2f}  total:{m['mean_total']:.2f}")
+
+        lines.append("Overall category rates:")
+        lines.append(f"  Excellent: {format_pct(m['rate_overall_excellent'])} (Δ vs baseline {delta_str(baseline['rate_overall_excellent'], m['rate_overall_excellent'])})")
+        lines.append(f"  Average:   {format_pct(m['rate_overall_average'])} (Δ vs baseline {delta_str(baseline['rate_overall_average'], m['rate_overall_average'])})")
+        lines.append(f"  Failing:   {format_pct(m['rate_overall_failing'])} (Δ vs baseline {delta_str(baseline['rate_overall_failing'], m['rate_overall_failing'])})")
+
+        lines.append("Fairness (Disparate Impact min across subgroups):")
+        for d in dimensions:
+            lines.append(f"  {dimension_title(d):<6} DI min: {m[f'min_DI_{dimension_key(d)}']:.3f} (flag if < 0.80)")
+
+        for d in dimensions:
+            lines.append(f"\n  By {dimension_name(d)} (rate_excellent, rate_average, rate_failing):")
+            tab = m["_tables"][f"by_{dimension_key(d)}"][["group","rate_excellent","rate_average","rate_failing"]]
+            for _, r in tab.iterrows():
+                lines.append(f"    {r['group']:<10}  Exc:{r['rate_excellent']:.3f}  Avg:{r['rate_average']:.3f}  Fail:{r['rate_failing']:.3f}")
+        lines.append("\n")
+
+    lines.append("===== INTERPRETATION HINTS =====")
+    lines.append("- If conclusions remain stable across scenarios, recommendations are robust.")
+    lines.append("- If Excellent rate or fairness DI swings a lot under small changes, flag as medium/high-risk.")
+    lines.append("- Use the CSV summary for tables in the stakeholder report.")
+
+    with open(TXT_OUT, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+    print(f"✅ Wrote sensitivity text report to: {TXT_OUT}")
+    print(f"✅ Wrote sensitivity summary CSV to: {CSV_OUT}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sensitivity / robustness analysis of category cutoffs.")
+    parser.add_argument("--sweep", action="store_true",
+                        help="evaluate a full grid of Failing/Excellent cutoffs instead of the fixed scenarios")
+    parser.add_argument("--sweep-min", type=int, default=0, help="smallest cutoff in the sweep grid")
+    parser.add_argument("--sweep-max", type=int, default=300, help="largest cutoff in the sweep grid")
+    parser.add_argument("--sweep-step", type=int, default=1, help="spacing of the sweep grid")
+    parser.add_argument("--dims", nargs="+", default=DIMENSIONS, metavar="COL",
+                        help='categorical columns to audit ("all" = every categorical column)')
+    parser.add_argument("--max-order", type=int, default=1,
+                        help="also audit intersections of up to this many --dims columns")
+    parser.add_argument("--min-cell-size", type=int, default=0,
+                        help="leave out subgroups with fewer rows than this")
+    parser.add_argument("--perturb", nargs="?", const="default", metavar="SPEC",
+                        help="run the Monte Carlo perturbation scenarios of a YAML/JSON spec "
+                             "(default: scripts/perturbations.yaml) instead of the fixed scenarios")
+    parser.add_argument("--replicates", type=int, default=None,
+                        help="replicates per perturbation scenario (overrides the spec)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to fan perturbation scenarios out over")
+    args = parser.parse_args(argv)
+    try:
+        args.dimensions = parse_dimensions(args.dims, args.max_order)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+@instrumented()
+def run(df: pd.DataFrame = None, sweep: bool = False, sweep_min: int = 0, sweep_max: int = 300,
+        sweep_step: int = 1, dimensions=DIMENSIONS, min_cell_size: int = 0, perturb=None,
+        replicates: int = None, workers: int = 1):
+    # ---------- load baseline data ----------
+    data_path = DATA_FILE if df is None else None
+    if df is None:
+        df = load_dataset(DATA_FILE)
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    if perturb:
+        import perturbation  # imports this module, so only when asked for
+        spec = perturbation.load_spec(perturbation.DEFAULT_SPEC if perturb == "default" else perturb)
+        table = perturbation.run_spec(spec, df, data_path, workers, dimensions, min_cell_size, replicates)
+        table.to_csv(perturbation.REPLICATES_CSV, index=False)
+        perturbation.distribution_summary(table).to_csv(perturbation.DISTRIBUTION_CSV, index=False)
+        print(f"✅ Wrote {len(table)} perturbation replicates to: {perturbation.REPLICATES_CSV}")
+        print(f"✅ Wrote their distributions to: {perturbation.DISTRIBUTION_CSV}")
+        log_run("sensitivity_analysis.py", f"perturb={perturb} replicates={table['replicate'].max() + 1} "
+                f"workers={workers}", seed=SEED)
+        return
+
+    if sweep:
+        grid = np.arange(sweep_min, sweep_max + 1, sweep_step)
+        table = sweep_cutoffs(df, grid, grid, dimensions, min_cell_size)
+        table.to_csv(SWEEP_CSV, index=False)
+        print(f"✅ Wrote cutoff sweep ({len(table)} scenarios) to: {SWEEP_CSV}")
+        log_run("sensitivity_analysis.py", f"sweep={sweep_min}..{sweep_max} step={sweep_step}", seed=SEED)
+        return
+
+    run_scenarios(df, dimensions, min_cell_size)
+    note = ""
+    if list(dimensions) != DIMENSIONS or min_cell_size:
+        note = f"dims={';'.join(dimension_name(d) for d in dimensions)} min_cell_size={min_cell_size}"
+    log_run("sensitivity_analysis.py", note, seed=SEED)
+
+def main(argv=None):
+    args = parse_args(argv)
+    run(sweep=args.sweep, sweep_min=args.sweep_min, sweep_max=args.sweep_max, sweep_step=args.sweep_step,
+        dimensions=args.dimensions, min_cell_size=args.min_cell_size, perturb=args.perturb,
+        replicates=args.replicates, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
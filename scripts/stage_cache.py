@@ -0,0 +1,80 @@
+import hashlib
+import json
+import sys
+from pathlib import Path
+from types import ModuleType
+
+from data_loader import file_sha256
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPT_DIR.parent
+MANIFEST_FILE = ROOT / "outputs" / "logs" / "stage_manifest.json"
+
+
+# ---------- keys ----------
+def local_sources(module: ModuleType) -> list:
+    """Source files of `module` and every scripts/ module it (transitively) imports."""
+    seen, stack = set(), [module]
+    while stack:
+        mod = stack.pop()
+        path = Path(getattr(mod, "__file__", None) or "").resolve()
+        if path.parent != SCRIPT_DIR or path in seen:
+            continue
+        seen.add(path)
+        for value in vars(mod).values():
+            if isinstance(value, ModuleType):
+                stack.append(value)
+            else:
+                owner = sys.modules.get(getattr(value, "__module__", None) or "")
+                if owner is not None:
+                    stack.append(owner)
+    return sorted(seen)
+
+
+def stage_key(data_hash: str, sources: list, params: dict) -> str:
+    """Content hash of everything a stage's outputs depend on."""
+    payload = {
+        "data": data_hash,
+        "sources": {Path(p).name: file_sha256(p) for p in sources},
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ---------- manifest ----------
+def _rel(path: Path) -> str:
+    path = Path(path).resolve()
+    return str(path.relative_to(ROOT)) if path.is_relative_to(ROOT) else str(path)
+
+
+def load_manifest(path: Path = MANIFEST_FILE) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict, path: Path = MANIFEST_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def is_fresh(manifest: dict, name: str, key: str, outputs: list) -> bool:
+    """True if the stage last ran with this key and its outputs are still exactly as written."""
+    entry = manifest.get(name)
+    if not entry or entry.get("key") != key or not outputs:
+        return False
+    recorded = entry.get("outputs", {})
+    for out in outputs:
+        rel = _rel(out)
+        if rel not in recorded or not Path(out).exists() or file_sha256(out) != recorded[rel]:
+            return False
+    return True
+
+
+def record(manifest: dict, name: str, key: str, outputs: list):
+    manifest[name] = {
+        "key": key,
+        "outputs": {_rel(out): file_sha256(out) for out in outputs if Path(out).exists()},
+    }
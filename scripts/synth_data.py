@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from data_loader import load_raw, DATA_FILE, CATEGORICAL_COLS, SCORE_COLS
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Synthetic StudentsPerformance-shaped data at any size, for benchmarks.
+# Categorical columns are drawn from the empirical joint distribution of the
+# five columns (so every marginal and every cross-tab is reproduced); the three
+# scores are the source data's per-cell linear-model means (one-hot main
+# effects) plus multivariate normal residuals with the fitted 3x3 covariance,
+# rounded and clipped to 0-100, which keeps the score correlations and the
+# subgroup gaps. Rows are generated and written in chunks, so 50M rows never
+# need to fit in memory.
+
+ROOT = Path(__file__).resolve().parent.parent
+SYNTH_DIR = ROOT / "data" / ".cache" / "synthetic"
+CHUNK_ROWS = 1_000_000
+
+
+def parse_size(text: str) -> int:
+    """'10k' -> 10_000, '1M' -> 1_000_000, '50m' -> 50_000_000, '2500' -> 2500."""
+    text = str(text).strip().lower().replace("_", "")
+    scale = {"k": 10**3, "m": 10**6, "g": 10**9}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+# ---------- fit ----------
+def fit_profile(path: Path = DATA_FILE) -> dict:
+    df = load_raw(path)
+    cells = (df.groupby(CATEGORICAL_COLS, observed=True).size()
+               .rename("n").reset_index())
+    codes = np.column_stack([df[c].cat.codes.to_numpy() for c in CATEGORICAL_COLS])
+    cell_codes = np.column_stack([pd.Categorical(cells[c], categories=df[c].cat.categories).codes
+                                  for c in CATEGORICAL_COLS])
+
+    def design(code_matrix):
+        # intercept + one-hot main effects (first level of each column dropped)
+        parts = [np.ones((len(code_matrix), 1))]
+        for j, c in enumerate(CATEGORICAL_COLS):
+            k = len(df[c].cat.categories)
+            parts.append((code_matrix[:, [j]] == np.arange(1, k)).astype(np.float64))
+        return np.hstack(parts)
+
+    scores = df[SCORE_COLS].to_numpy(dtype=np.float64)
+    keep = ~np.isnan(scores).any(axis=1)
+    beta, *_ = np.linalg.lstsq(design(codes[keep]), scores[keep], rcond=None)
+    resid = scores[keep] - design(codes[keep]) @ beta
+    return {
+        "categories": {c: [str(v) for v in df[c].cat.categories] for c in CATEGORICAL_COLS},
+        "cell_codes": cell_codes,
+        "cell_prob": cells["n"].to_numpy() / cells["n"].sum(),
+        "cell_mean": design(cell_codes) @ beta,
+        "cov": np.cov(resid, rowvar=False),
+    }
+
+
+# ---------- generate ----------
+def generate(profile: dict, n_rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    cell = rng.choice(len(profile["cell_prob"]), size=n_rows, p=profile["cell_prob"])
+    data = {c: pd.Categorical.from_codes(profile["cell_codes"][cell, j], categories=profile["categories"][c])
+            for j, c in enumerate(CATEGORICAL_COLS)}
+    noise = rng.multivariate_normal(np.zeros(len(SCORE_COLS)), profile["cov"], size=n_rows, method="cholesky")
+    scores = np.clip(np.rint(profile["cell_mean"][cell] + noise), 0, 100).astype(np.int64)
+    data.update({c: scores[:, j] for j, c in enumerate(SCORE_COLS)})
+    return pd.DataFrame(data)
+
+
+def write_csv(out: Path, n_rows: int, seed: int = 42, profile: dict = None,
+              chunk_rows: int = CHUNK_ROWS) -> Path:
+    """Write n_rows synthetic rows to `out` chunk by chunk (same seed -> same file)."""
+    profile = profile or fit_profile()
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tmp = out.with_name(out.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for i, ss in enumerate(seeds):
+            rows = min(chunk_rows, n_rows - i * chunk_rows)
+            generate(profile, rows, np.random.default_rng(ss)).to_csv(f, index=False, header=(i == 0))
+    tmp.replace(out)
+    return out
+
+
+def synthetic_file(n_rows: int, seed: int = 42, profile: dict = None) -> Path:
+    """Path of the cached synthetic file for (n_rows, seed), generating it if missing."""
+    out = SYNTH_DIR / f"students_{n_rows}_seed{seed}.csv"
+    if not out.exists():
+        write_csv(out, n_rows, seed, profile)
+    return out
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic StudentsPerformance-shaped data.")
+    parser.add_argument("--rows", default="10k", help="row count, e.g. 10k, 1M, 50M")
+    parser.add_argument("--out", type=Path, help=f"output CSV (default: {SYNTH_DIR.relative_to(ROOT)}/...)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--source", type=Path, default=DATA_FILE, help="dataset the distributions are fitted to")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    n_rows = parse_size(args.rows)
+    out = args.out or SYNTH_DIR / f"students_{n_rows}_seed{args.seed}.csv"
+    write_csv(out, n_rows, args.seed, fit_profile(args.source))
+    print(f"✅ Wrote {n_rows:,} synthetic rows to: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,66 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-from datetime import datetime
+from __future__ import annotations
 
-ROOT = Path(__file__).resolve().parent.parent
-LOG_DIR = ROOT / "outputs" / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+import argparse
+import os
+from pathlib import Path
 
-SEED = 42  # set once for reproducibility
-np.random.seed(SEED)
+from bootstrap_engine import parallel_bootstrap_means, percentile_ci
+from data_loader import load_dataset
+from instrument import log_run, phase, instrumented
+from lazy_imports import lazy_import
 
-def log_run(script_name: str, note: str = ""):
-    with open(LOG_DIR / "run.log", "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {script_name} | seed={SEED} {note}\n")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
+SEED = 42  # set once for reproducibility
 
 # ---------- paths ----------
 DATA_FILE = Path(__file__).resolve().parent.parent / "data" / "StudentsPerformance.csv"
 OUT_FILE = Path(__file__).resolve().parent.parent / "outputs" / "uncertainty_cis.csv"
 
-# ---------- load data ----------
-df = pd.read_csv(DATA_FILE)
+N_BOOT = 1000
+cols_to_check = ["math score", "reading score", "writing score", "total_score", "average_score"]
 
-# Add derived columns (same as in descriptive_stats.py)
-df["total_score"] = df["math score"] + df["reading score"] + df["writing score"]
-df["average_score"] = df["total_score"] / 3
 
-# ---------- bootstrap confidence intervals ----------
-n_boot = 1000
-cols_to_check = ["math score", "reading score", "writing score", "total_score", "average_score"]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for score means.")
+    parser.add_argument("--n-boot", type=int, default=N_BOOT, help="number of bootstrap resamples")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed for the resampling generator(s)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process-pool workers (1 = in-process; 0 = all cores); "
+                             "CIs are reproducible for a given seed and worker count")
+    return parser.parse_args(argv)
+
+
+@instrumented()
+def run(df: pd.DataFrame = None, n_boot: int = N_BOOT, seed: int = SEED, workers: int = 1):
+    # ---------- load data ----------
+    if df is None:
+        df = load_dataset(DATA_FILE)
+
+    # ---------- bootstrap confidence intervals ----------
+    # one shared resample index matrix per chunk covers every column
+    values = df[cols_to_check].to_numpy(dtype=np.float64)
+    with phase("uncertainty_bootstrap.resample", rows=len(values), n_boot=n_boot, workers=workers):
+        boot_means = parallel_bootstrap_means(values, n_boot, seed, workers)
+    ci_low, ci_high = percentile_ci(boot_means, 0.95)
+
+    results = {}
+    for j, col in enumerate(cols_to_check):
+        results[col] = {"mean": np.nanmean(values[:, j]), "ci_low": ci_low[j], "ci_high": ci_high[j]}
+
+    # ---------- save results ----------
+    OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(results).T.to_csv(OUT_FILE)
+    print("✅ Saved bootstrap CI results to:", OUT_FILE)
+
+    log_run("uncertainity_bootstrap.py", f"n_boot={n_boot} workers={workers}", seed=seed)
+
 
-results = {}
-for col in cols_to_check:
-    data = df[col].dropna().values
-    means = [np.mean(np.random.choice(data, size=len(data), replace=True)) for _ in range(n_boot)]
-    ci_low, ci_high = np.percentile(means, [2.5, 97.5])
-    results[col] = {"mean": np.mean(data), "ci_low": ci_low, "ci_high": ci_high}
+def main(argv=None):
+    args = parse_args(argv)
+    run(n_boot=args.n_boot, seed=args.seed, workers=args.workers or os.cpu_count() or 1)
 
-# ---------- save results ----------
-pd.DataFrame(results).T.to_csv(OUT_FILE)
-print("✅ Saved bootstrap CI results to:", OUT_FILE)
 
-log_run("uncertainity_bootstrap.py")      
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,112 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+from __future__ import annotations
+
+import argparse
+import json
 from pathlib import Path
-from datetime import datetime
+
+from data_loader import load_dataset, iter_chunks
+from figure_aggregates import summarize, summarize_chunks
+from figure_render import FigureSpec, render_all
+from instrument import LOG_DIR, log_message, phase, instrumented
+from lazy_imports import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
 
 # -------- paths --------
 SCRIPT_DIR = Path(__file__).resolve().parent
 ROOT = SCRIPT_DIR.parent
 DATA_FILE = ROOT / "data" / "StudentsPerformance.csv"
 FIG_DIR = ROOT / "report" / "figures"
-LOG_DIR = ROOT / "outputs" / "logs"
-FIG_DIR.mkdir(parents=True, exist_ok=True)
-LOG_DIR.mkdir(parents=True, exist_ok=True)
+OUT_DIR = ROOT / "outputs"
 
 SEED = 42  # for reproducibility (if any random sampling later)
-np.random.seed(SEED)
 
 def log(msg: str):
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
-    with open(LOG_DIR / "run.log", "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] visuals.py | {msg}\n")
-
-def savefig(path: Path):
-    plt.tight_layout()
-    plt.savefig(path, dpi=150, bbox_inches="tight")
-    plt.close()
+    log_message("visuals.py", msg)
 
-# -------- load & derive --------
-df = pd.read_csv(DATA_FILE)
 score_cols = ["math score", "reading score", "writing score"]
-df["total_score"] = df["math score"] + df["reading score"] + df["writing score"]
-df["average_score"] = df["total_score"] / 3
-
-def categorize(total):
-    if total < 150:
-        return "Failing"
-    elif total < 210:
-        return "Average"
+FIGURE_FILES = [FIG_DIR / f"hist_{col.replace(' ', '_')}.png" for col in score_cols] + [
+    FIG_DIR / "box_total_by_gender.png",
+    FIG_DIR / "bar_performance_category.png",
+]
+SUMMARY_JSON = OUT_DIR / "figure_summaries.json"
+HIST_CSV     = OUT_DIR / "figure_histograms.csv"
+BOX_CSV      = OUT_DIR / "figure_box_stats.csv"
+OUTPUT_FILES = FIGURE_FILES + [SUMMARY_JSON, HIST_CSV, BOX_CSV]
+
+def figure_specs(summary: dict) -> list:
+    # -------- FIGURE 1: Histograms of scores --------
+    specs = [FigureSpec(FIG_DIR / f"hist_{col.replace(' ', '_')}.png", "hist",
+                        f"Distribution of {col.title()}", col.title(), "Count",
+                        data=summary["histograms"][col])
+             for col in score_cols]
+
+    # -------- FIGURE 2: Boxplot of total_score by gender --------
+    specs.append(FigureSpec(FIG_DIR / "box_total_by_gender.png", "box",
+                            "Total Score by Gender", "Gender", "Total Score",
+                            data={"stats": summary["box"]}))
+
+    # -------- FIGURE 3: Bar chart of performance category distribution --------
+    cats = summary["categories"]
+    specs.append(FigureSpec(FIG_DIR / "bar_performance_category.png", "bar",
+                            "Performance Category Distribution", "Category", "Number of Students",
+                            data={"heights": list(cats.values())}, options={"labels": list(cats)}))
+    return specs
+
+def write_summaries(summary: dict):
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(SUMMARY_JSON, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    hist_rows = [{"column": col, "bin_left": left, "bin_right": right, "count": n}
+                 for col, h in summary["histograms"].items()
+                 for left, right, n in zip(h["edges"][:-1], h["edges"][1:], h["counts"])]
+    pd.DataFrame(hist_rows).to_csv(HIST_CSV, index=False)
+    box_rows = [{k: v for k, v in b.items() if k != "fliers"} | {"n_fliers_shown": len(b["fliers"])}
+                for b in summary["box"]]
+    pd.DataFrame(box_rows).to_csv(BOX_CSV, index=False)
+
+@instrumented()
+def run(df: pd.DataFrame = None, workers: int = 1, force: bool = False, stream: bool = False,
+        chunksize: int = 1_000_000):
+    # -------- aggregate (figures never see raw rows) --------
+    if stream:
+        with phase("visuals.summarize", streaming=True):
+            summary = summarize_chunks(lambda: iter_chunks(DATA_FILE, chunksize), score_cols)
     else:
-        return "Excellent"
-df["performance_category"] = df["total_score"].apply(categorize)
-
-# -------- FIGURE 1: Histograms of scores --------
-for col in score_cols:
-    plt.figure()
-    plt.hist(df[col].dropna().values, bins=20)
-    plt.title(f"Distribution of {col.title()}")
-    plt.xlabel(col.title())
-    plt.ylabel("Count")
-    savefig(FIG_DIR / f"hist_{col.replace(' ', '_')}.png")
-log("Saved histograms for math/reading/writing")
-
-# -------- FIGURE 2: Boxplot of total_score by gender --------
-plt.figure()
-groups = [g for g in df["gender"].dropna().unique()]
-data = [df.loc[df["gender"] == g, "total_score"].dropna().values for g in groups]
-plt.boxplot(data, labels=[str(g) for g in groups], showfliers=True)
-plt.title("Total Score by Gender")
-plt.xlabel("Gender")
-plt.ylabel("Total Score")
-savefig(FIG_DIR / "box_total_by_gender.png")
-log("Saved boxplot of total_score by gender")
-
-# -------- FIGURE 3: Bar chart of performance category distribution --------
-cat_counts = df["performance_category"].value_counts().reindex(["Excellent","Average","Failing"], fill_value=0)
-plt.figure()
-plt.bar(cat_counts.index.astype(str), cat_counts.values)
-plt.title("Performance Category Distribution")
-plt.xlabel("Category")
-plt.ylabel("Number of Students")
-savefig(FIG_DIR / "bar_performance_category.png")
-log("Saved bar chart of performance categories")
-
-print(f"✅ Figures written to: {FIG_DIR}")
-print(f"📝 Log written to: {LOG_DIR / 'run.log'}")
+        if df is None:
+            df = load_dataset(DATA_FILE)
+        with phase("visuals.summarize", rows=len(df)):
+            summary = summarize(df, score_cols)
+    write_summaries(summary)
+
+    with phase("visuals.render", workers=workers) as rec:
+        rendered, reused = render_all(figure_specs(summary), workers, force)
+        rec.update(rendered=len(rendered), reused=len(reused))
+    for path in rendered:
+        log(f"Saved {path.name}")
+    if reused:
+        log(f"Reused {len(reused)} unchanged figure(s): {', '.join(p.name for p in reused)}")
+
+    print(f"✅ Figures written to: {FIG_DIR} ({len(rendered)} rendered, {len(reused)} unchanged)")
+    print(f"✅ Figure summaries written to: {SUMMARY_JSON}, {HIST_CSV}, {BOX_CSV}")
+    print(f"📝 Log written to: {LOG_DIR / 'run.log'}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render the report figures.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="render independent figures in this many processes")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every figure even if its data is unchanged")
+    parser.add_argument("--stream", action="store_true",
+                        help="aggregate the CSV chunk by chunk (bounded memory; quartiles are sketched)")
+    parser.add_argument("--chunksize", type=int, default=1_000_000, help="rows per chunk with --stream")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    run(workers=args.workers, force=args.force, stream=args.stream, chunksize=args.chunksize)
+
+
+if __name__ == "__main__":
+    main()